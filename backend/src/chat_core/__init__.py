@@ -1,6 +1,45 @@
 """App initialisation logic"""
+import time
+
 from flask import Flask
-from chat_core.routes import chatbot_api
+
+from chat_core import metrics
+from chat_core.config import PRELOAD_ENGINES
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+
+def init_db():
+    """
+    Creates the database and ORM tables if missing.
+
+    Importing the app never touches the database; the shared storage is
+    bootstrapped on first use. Run this once per deployment (or from a
+    release step) to bootstrap it ahead of the first request instead.
+
+    Returns
+    -------
+    Storage
+        The bootstrapped process-wide storage.
+    """
+    from chat_core.database import get_storage
+
+    return get_storage()
+
+
+def init_db_main() -> int:
+    """
+    Command-line entry point of `chat-init-db`: bootstraps the database.
+
+    Returns
+    -------
+    int
+        Exit status 0; failures raise.
+    """
+    init_db()
+    logger.info("Database ready.")
+    return 0
 
 
 def create_app():
@@ -8,13 +47,27 @@ def create_app():
     Factory function to create and configure the Flask application instance.
 
     Registers all application blueprints and initializes extensions as needed.
+    With `CHAT_PRELOAD_ENGINES` set, deployed chatbots are opened here, before
+    a pre-fork server forks its workers. The time spent importing the routes,
+    preloading and in total is logged and exported as `chat_startup_seconds`.
 
     Returns
     -------
     Flask
         A configured Flask app instance.
     """
+    started = time.perf_counter()
+    from chat_core.routes import chatbot_api, preload_engines
+    metrics.STARTUP_SECONDS.set(time.perf_counter() - started, "import")
+
     app = Flask(__name__)
-    # init_db()
     app.register_blueprint(chatbot_api, url_prefix="/api")
+    if PRELOAD_ENGINES:
+        preload_started = time.perf_counter()
+        preload_engines()
+        metrics.STARTUP_SECONDS.set(time.perf_counter() - preload_started, "preload")
+
+    total = time.perf_counter() - started
+    metrics.STARTUP_SECONDS.set(total, "total")
+    logger.info("App created in %.3fs.", total)
     return app
@@ -0,0 +1,342 @@
+"""
+Red-team campaigns against deployed chatbots.
+
+A campaign sends every prompt of a testset (the `user_input` of its Dataset
+rows) to one or more deployed chatbots. Prompts are streamed from the database
+in chunks and sent from a bounded thread pool. An optional rate limit is
+shared by all workers. Each response is recorded as a `CampaignResult` and
+buffered results are bulk-inserted. The campaign row keeps a report per
+chatbot with throughput, latency percentiles and the retrieval hit rate (how
+often the retrieved answer is the prompt's own reference).
+
+Campaigns run from the API (`POST /api/campaigns`, as a background job) or
+from the command line:
+
+    python -m chat_core.campaign --meta-id <uuid> --chatbot <uuid> [--chatbot <uuid> ...]
+
+Classes
+-------
+RateLimiter
+    Spaces out calls from many threads to a maximum rate.
+CampaignRunner
+    Runs a testset against chatbots and records the results.
+
+Functions
+---------
+run_campaign
+    Runs a campaign on the API's engine registry and returns its report.
+main
+    Command-line entry point.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from chat_core.config import CAMPAIGN_WORKERS, CAMPAIGN_RATE_LIMIT, CAMPAIGN_FLUSH_SIZE
+from chat_core.database import get_storage
+from chat_core.database.fetch import iter_dataset_by_meta_id
+from chat_core.database.models import Campaign, CampaignResult
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls evenly to at most `rate` per second.
+
+    Parameters
+    ----------
+    rate : float
+        Maximum calls per second. 0 or less disables the limit.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until the caller may proceed."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CampaignRunner:
+    """
+    Runs the prompts of a testset against deployed chatbots.
+
+    Parameters
+    ----------
+    get_engine : callable
+        Called as `get_engine(chatbot_id)` to obtain a trained engine, e.g.
+        `EngineRegistry.get`. Should raise `LookupError` for chatbots that
+        cannot be served, or `RuntimeError` for those still being trained.
+    storage : Storage, optional
+        Where the campaign and its results are written. Defaults to the
+        shared storage.
+    workers : int, optional
+        Threads sending prompts concurrently.
+    rate_limit : float, optional
+        Maximum prompts per second across all workers (0 for no limit).
+    flush_size : int, optional
+        Results buffered before each bulk insert.
+    """
+
+    def __init__(self, get_engine, storage=None, workers: int = CAMPAIGN_WORKERS,
+                 rate_limit: float = CAMPAIGN_RATE_LIMIT, flush_size: int = CAMPAIGN_FLUSH_SIZE):
+        self.get_engine = get_engine
+        self.storage = storage if storage is not None else get_storage()
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.flush_size = flush_size
+
+    def run(self, meta_id, chatbot_ids, campaign_id=None, prompts=None, progress=None) -> dict:
+        """
+        Sends every prompt of a testset to each chatbot and records the results.
+
+        Parameters
+        ----------
+        meta_id : UUID or str
+            Testset (MetaDataset) whose rows are the prompts.
+        chatbot_ids : list of UUID or str
+            Deployed chatbots to attack.
+        campaign_id : UUID or str, optional
+            Id of the campaign row to create. Generated if omitted.
+        prompts : iterable of list of (row_id, user_input, reference), optional
+            Prompt chunks to send instead of streaming the testset.
+        progress : Job, optional
+            Background job that receives `prompts_sent` and `results_written`
+            updates and the time spent in the "run" and "write" stages.
+
+        Returns
+        -------
+        dict
+            The campaign report: totals and, under "chatbots", one summary
+            per chatbot id (see `_summarize`).
+        """
+        campaign_id = uuid.UUID(str(campaign_id)) if campaign_id else uuid.uuid4()
+        chatbot_ids = [str(chatbot_id) for chatbot_id in chatbot_ids]
+        self.storage.insert(
+            pd.DataFrame([{"id": campaign_id, "meta_dataset_id": meta_id, "status": "running"}]),
+            name="campaigns",
+            orm_class=Campaign,
+            fixed_fields={"chatbot_ids": chatbot_ids}
+        )
+
+        engines, failed = {}, {}
+        for chatbot_id in chatbot_ids:
+            try:
+                engines[chatbot_id] = self.get_engine(chatbot_id)
+            except (LookupError, RuntimeError) as e:
+                logger.warning("[CAMPAIGN] Skipping chatbot %s: %s", chatbot_id, e)
+                failed[chatbot_id] = str(e)
+
+        stats = {chatbot_id: {"latencies": [], "hits": 0, "errors": 0} for chatbot_id in engines}
+        buffer, sent, written = [], 0, 0
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="campaign"
+            ) as pool:
+                for chunk in (prompts if prompts is not None else iter_dataset_by_meta_id(meta_id)):
+                    with _stage(progress, "run"):
+                        futures = [
+                            pool.submit(self._ask, engine, chatbot_id, row)
+                            for row in chunk for chatbot_id, engine in engines.items()
+                        ]
+                        for future in as_completed(futures):
+                            result = future.result()
+                            bot = stats[result["chatbot_id"]]
+                            bot["latencies"].append(result["latency_ms"])
+                            bot["hits"] += bool(result["hit"])
+                            bot["errors"] += result["error"] is not None
+                            buffer.append(result)
+                    sent += len(futures)
+                    if len(buffer) >= self.flush_size:
+                        written += self._flush(buffer, campaign_id, progress)
+                        buffer = []
+                    if progress is not None:
+                        progress.update(prompts_sent=sent, results_written=written)
+            written += self._flush(buffer, campaign_id, progress)
+        except Exception:
+            self._finish(campaign_id, "failed", None)
+            raise
+        seconds = time.perf_counter() - start
+
+        report = {
+            "campaign_id": str(campaign_id),
+            "prompts_sent": sent,
+            "results_written": written,
+            "seconds": round(seconds, 3),
+            "throughput": round(sent / seconds, 2) if seconds else 0.0,
+            "chatbots": {
+                **{chatbot_id: _summarize(bot, seconds) for chatbot_id, bot in stats.items()},
+                **{chatbot_id: {"error": error} for chatbot_id, error in failed.items()}
+            }
+        }
+        if progress is not None:
+            progress.update(prompts_sent=sent, results_written=written)
+        self._finish(campaign_id, "succeeded", report)
+        logger.info(
+            "[CAMPAIGN] %s: %d prompts to %d chatbots in %.2fs (%.1f prompts/s).",
+            campaign_id, sent, len(engines), seconds, report["throughput"]
+        )
+        return report
+
+    def _ask(self, engine, chatbot_id: str, row) -> dict:
+        """Sends one prompt to one engine and returns the result row."""
+        row_id, user_input, reference = row
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        response, distance, hit, error = None, None, None, None
+        try:
+            result = engine.respond_batch([user_input], k=1)[0]
+            response = result["answer"]
+            if result["matches"]:
+                distance = result["matches"][0]["distance"]
+            hit = bool(result["matches"]) and result["matches"][0]["answer"] == reference
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return {
+            "chatbot_id": chatbot_id,
+            "dataset_id": row_id,
+            "response": response,
+            "distance": distance,
+            "hit": hit,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "error": error,
+        }
+
+    def _flush(self, buffer: list, campaign_id, progress) -> int:
+        """Bulk-inserts buffered results and returns the number written."""
+        if not buffer:
+            return 0
+        with _stage(progress, "write"):
+            stats = self.storage.bulk_insert(
+                pd.DataFrame(buffer),
+                "campaign_results",
+                CampaignResult,
+                fixed_fields={"campaign_id": campaign_id}
+            )
+        return stats["rows"] if stats else 0
+
+    def _finish(self, campaign_id, status: str, report):
+        """Records the final status and report on the campaign row."""
+        with self.storage.session() as session:
+            campaign = session.get(Campaign, campaign_id)
+            if campaign is None:
+                return
+            campaign.status = status
+            campaign.report = report
+            campaign.finished_at = datetime.now(timezone.utc)
+            session.commit()
+
+
+def _stage(progress, name: str):
+    """Times a campaign stage on the caller's job, if one was given."""
+    return progress.stage(name) if progress is not None else nullcontext()
+
+
+def _summarize(bot: dict, seconds: float) -> dict:
+    """
+    Summarizes the results of one chatbot.
+
+    Returns
+    -------
+    dict
+        Prompt, error and hit counts, hit rate, throughput over the campaign
+        and p50/p95/p99/mean latency in milliseconds.
+    """
+    latencies = np.asarray(bot["latencies"], dtype=np.float64)
+    prompts = len(latencies)
+    answered = prompts - bot["errors"]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if prompts else (0.0, 0.0, 0.0)
+    return {
+        "prompts": prompts,
+        "errors": bot["errors"],
+        "hits": bot["hits"],
+        "hit_rate": round(bot["hits"] / answered, 4) if answered else 0.0,
+        "throughput": round(prompts / seconds, 2) if seconds else 0.0,
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latencies.mean()), 3) if prompts else 0.0,
+        },
+    }
+
+
+def run_campaign(meta_id, chatbot_ids, workers: int = CAMPAIGN_WORKERS,
+                 rate_limit: float = CAMPAIGN_RATE_LIMIT) -> dict:
+    """
+    Runs a campaign on the API's engine registry and returns its report.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        Testset (MetaDataset) providing the prompts.
+    chatbot_ids : list of UUID or str
+        Deployed chatbots to send the prompts to.
+    workers : int, optional
+        Concurrent prompt senders.
+    rate_limit : float, optional
+        Maximum prompts per second (0 for no limit).
+
+    Returns
+    -------
+    dict
+        The campaign report, as returned by `CampaignRunner.run`.
+    """
+    # Serve from the same registry and loader as the API.
+    from chat_core.routes import engine_registry
+
+    runner = CampaignRunner(engine_registry.get, workers=workers, rate_limit=rate_limit)
+    return runner.run(uuid.UUID(str(meta_id)), chatbot_ids)
+
+
+def main(argv=None) -> int:
+    """
+    Runs a campaign from the command line and prints its report as JSON.
+
+    Returns
+    -------
+    int
+        Exit status 0; failures raise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Run a red-team campaign against deployed chatbots."
+    )
+    parser.add_argument("--meta-id", required=True,
+                        help="Testset (MetaDataset) providing the prompts.")
+    parser.add_argument("--chatbot", action="append", required=True, dest="chatbot_ids",
+                        help="Deployed chatbot id; repeat for several chatbots.")
+    parser.add_argument("--workers", type=int, default=CAMPAIGN_WORKERS,
+                        help="Concurrent prompt senders.")
+    parser.add_argument("--rate-limit", type=float, default=CAMPAIGN_RATE_LIMIT,
+                        help="Maximum prompts per second (0 for no limit).")
+    args = parser.parse_args(argv)
+
+    report = run_campaign(
+        args.meta_id, args.chatbot_ids, workers=args.workers, rate_limit=args.rate_limit
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
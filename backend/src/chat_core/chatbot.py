@@ -3,58 +3,599 @@ Chatbot Deployment Logic
 
 This module defines the ChatbotEngine class, responsible for training
 and serving responses using a simple retrieval-based approach. It leverages
-FAISS for similarity search over embedded user inputs and LangChain's schema.
+FAISS for similarity search over embedded user inputs, with an exact or
+approximate index type per chatbot (see `chat_core.indexes`).
 
 Classes
 -------
 ChatbotEngine
-    Loads a dataset, builds a vector store, and responds to user queries
+    Loads a dataset, builds a vector index, and responds to user queries
     by retrieving the most relevant example from the dataset.
 """
-from typing import List
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import List, Tuple
 
-from langchain.vectorstores import FAISS
-from langchain.schema import Document
+import faiss
+import numpy as np
 
-from core.utils.clients import ModelClient
-from core.commons.storage.database.loader import load_dataset
+from chat_core.cache import TTLCache
+from chat_core.config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_EMBEDDING_CACHE_SIZE
+from chat_core.database.fetch import get_training_pairs_by_meta_id
+from chat_core.embeddings import (
+    CachedEmbedder, describe_embedding_model, get_embedding_cache, get_embedding_service
+)
+from chat_core.evaluation import ORIGINAL, RetrievalScores, latency_summary, perturb
+from chat_core.index_store import (
+    AnswerStore, AnswerStoreBuilder, MappedStrings, save_artifact, load_artifact
+)
+from chat_core.indexes import (
+    build_index, index_bytes, resolve_index_type, supports_removal, tune_index
+)
+from chat_core.metrics import timed, timer
+
+# Measured bytes per cached query embedding besides the vector: key, array header and LRU slot.
+_QUERY_CACHE_ENTRY_OVERHEAD = 360
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for answer caching: case-folded with collapsed whitespace."""
+    return " ".join(query.split()).casefold()
+
+
+@contextmanager
+def _stage(progress, name: str):
+    """Times a training stage into the metrics and on the caller's job, if one was given."""
+    with timer(f"engine.{name}"), (progress.stage(name) if progress is not None else nullcontext()):
+        yield
+
+
+def _embedded_counter(progress, offset: int = 0):
+    """
+    Returns a callback reporting embedded rows to the caller's job, if one was
+    given, counting `offset` rows already embedded before this call.
+    """
+    if progress is None:
+        return None
+    return lambda rows: progress.update(rows_embedded=offset + rows)
 
 
 class ChatbotEngine:
     """
     Engine for training and responding to user queries using FAISS vector search.
+
+    Index position `i` holds the embedding of the i-th training question,
+    `answers[i]` is the reference answer returned when it is the best match and
+    `row_ids[i]` is the id of the Dataset row it came from. Answers live in an
+    `AnswerStore`, which keeps each distinct answer once; the training
+    questions are not kept once they are embedded.
+
+    Queries go through two caches: normalized query text to answer, and exact
+    query text to its embedding. Both are bounded by size and age and are
+    cleared whenever the index changes.
+
+    Embeddings come from the process-wide `EmbeddingService`, so all engines
+    share one model client and concurrent queries are embedded in micro-batches.
+
+    Parameters
+    ----------
+    index_type : str, optional
+        FAISS index type to train: "auto" (by testset size) or one of
+        `chat_core.indexes.INDEX_TYPES`. Defaults to `INDEX_TYPE`.
     """
-    def __init__(self):
-        self.client = ModelClient.load()
-        self.embedding_model = self.client.get_embeddings()
-        self.vectorstore = None
-        self.dataset = []
+    def __init__(self, index_type: str = None):
+        self.embedding_model = get_embedding_service()
+        self.embedder = CachedEmbedder(self.embedding_model, get_embedding_cache())
+        self.index_type = index_type
+        self.index = None
+        self.answers = AnswerStore.build([])
+        self.row_ids = []
+        self.answer_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self.query_embedding_cache = TTLCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_CACHE_TTL)
+
+    @property
+    def embedding_model_id(self) -> str:
+        """Identity of the embedding model used for indexing and queries."""
+        return describe_embedding_model(self.embedding_model)
 
-    def train(self, meta_id: str) -> int:
+    def train(self, meta_id: str, dataset: List[Tuple[str, str]] = None,
+              row_ids: List[str] = None, progress=None) -> int:
         """
-        Loads dataset, converts user_inputs into vector store.
+        Loads dataset, converts user_inputs into a vector index.
+
+        Parameters
+        ----------
+        meta_id : str
+            Testset (MetaDataset) to train on.
+        dataset : list of (user_input, reference), optional
+            Rows already loaded by the caller. Loaded from `meta_id` if omitted.
+        row_ids : list of str, optional
+            Dataset row id of each entry in `dataset`. Required for later
+            incremental updates with `apply_changes`.
+        progress : Job, optional
+            Background job that receives `rows_embedded` updates and the
+            time spent in the "embed" and "index" stages.
+
+        Returns
+        -------
+        int
+            Number of indexed rows.
         """
-        self.dataset = load_dataset(meta_id)  # List[(user_input, reference)]
-        documents: List[Document] = []
+        self.clear_caches()
+        dataset = dataset if dataset is not None else get_training_pairs_by_meta_id(meta_id)
+        self.row_ids = [str(row_id) for row_id in row_ids] if row_ids is not None else []
+        if not dataset:
+            self.index, self.answers = None, AnswerStore.build([])
+            return 0
+
+        with _stage(progress, "embed"):
+            vectors = self.embedder.embed_documents(
+                [user_input for user_input, _ in dataset],
+                on_progress=_embedded_counter(progress)
+            )
+        with _stage(progress, "index"):
+            index = build_index(vectors, self.index_type)
 
-        for user_input, reference in self.dataset:
-            documents.append(Document(
-                page_content=user_input,
-                metadata={"answer": reference}
-            ))
+        self.index = index
+        self.answers = AnswerStore.build(reference for _, reference in dataset)
+        return index.ntotal
 
-        self.vectorstore = FAISS.from_documents(documents, self.embedding_model)
-        return len(documents)
+    def train_from_chunks(self, chunks, progress=None) -> int:
+        """
+        Builds the vector index from a stream of row chunks.
+
+        Each chunk is embedded and added to the index before the next one is
+        read, and the training questions are not kept, so peak memory does not
+        grow with the testset beyond the index and answers themselves.
+
+        Vectors are collected in a flat index while streaming, since the size
+        of the testset (and so the "auto" index type) is only known at the
+        end. An approximate index is then built from it, briefly holding both.
+
+        Parameters
+        ----------
+        chunks : iterable of list of (row_id, user_input, reference)
+            Dataset rows, e.g. from `iter_dataset_by_meta_id`.
+        progress : Job, optional
+            Background job that receives `rows_embedded` updates and the
+            time spent in the "embed" and "index" stages.
+
+        Returns
+        -------
+        int
+            Number of indexed rows.
+        """
+        self.clear_caches()
+        self.index, self.row_ids = None, []
+        answers = AnswerStoreBuilder()
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            with _stage(progress, "embed"):
+                vectors = self.embedder.embed_documents(
+                    [user_input for _, user_input, _ in chunk],
+                    on_progress=_embedded_counter(progress, offset=len(self.row_ids))
+                )
+            with _stage(progress, "index"):
+                if self.index is None:
+                    self.index = faiss.IndexFlatL2(vectors.shape[1])
+                self.index.add(vectors)
+            answers.extend(reference for _, _, reference in chunk)
+            self.row_ids.extend(str(row_id) for row_id, _, _ in chunk)
+
+        self.answers = answers.build()
+        if self.index is None:
+            return 0
+        if resolve_index_type(self.index_type, self.index.ntotal) != "flat":
+            with _stage(progress, "index"):
+                vectors = self.index.reconstruct_n(0, self.index.ntotal)
+                self.index = None
+                self.index = build_index(vectors, self.index_type)
+        return self.index.ntotal
+
+    def apply_changes(self, changed: List[Tuple[str, str, str]], removed_ids, progress=None) -> int:
+        """
+        Updates the trained index in place with the rows that changed since training.
+
+        Only the changed rows are embedded, so the cost scales with the size of
+        the change rather than the size of the testset. Rows that are already
+        indexed and appear in `changed` are replaced.
+
+        Parameters
+        ----------
+        changed : list of (row_id, user_input, reference)
+            New or modified Dataset rows.
+        removed_ids : iterable of str
+            Ids of Dataset rows that were deleted.
+        progress : Job, optional
+            Background job that receives `rows_embedded` updates and stage timings.
+
+        Returns
+        -------
+        int
+            Number of indexed rows after the update.
+
+        Raises
+        ------
+        ValueError
+            If the engine is untrained, its index has no row ids, or rows must
+            be removed from an index type that cannot remove them in place (HNSW
+            and IVF), in which case a full `train` is required.
+        """
+        if self.index is None or len(self.row_ids) != self.index.ntotal:
+            raise ValueError("Incremental update needs a trained index with row ids.")
+        if self.answers.mapped:
+            raise ValueError("Engine was opened read-only; load it with mmap=False to update it.")
+
+        stale = {str(row_id) for row_id in removed_ids}
+        stale.update(str(row_id) for row_id, _, _ in changed)
+        positions = [pos for pos, row_id in enumerate(self.row_ids) if row_id in stale]
+        if positions and not supports_removal(self.index):
+            raise ValueError(f"{type(self.index).__name__} cannot remove rows in place.")
+        self.clear_caches()
+
+        if positions:
+            with _stage(progress, "index"):
+                # Flat-code indexes compact on removal and keep the order of the remaining vectors.
+                self.index.remove_ids(np.asarray(positions, dtype=np.int64))
+                dropped = set(positions)
+                self.answers = self.answers.delete(positions)
+                self.row_ids = [r for pos, r in enumerate(self.row_ids) if pos not in dropped]
+
+        if changed:
+            with _stage(progress, "embed"):
+                vectors = self.embedder.embed_documents(
+                    [user_input for _, user_input, _ in changed],
+                    on_progress=_embedded_counter(progress)
+                )
+            with _stage(progress, "index"):
+                self.index.add(vectors)
+            self.answers = self.answers.extend(reference for _, _, reference in changed)
+            self.row_ids.extend(str(row_id) for row_id, _, _ in changed)
+
+        return self.index.ntotal
 
     def respond(self, query: str, k: int = 1) -> str:
         """
         Searches vector DB for most similar question and returns its answer.
         """
-        if not self.vectorstore:
+        if self.index is None:
             return "Chatbot not trained yet."
 
-        matches = self.vectorstore.similarity_search(query, k=k)
+        key = normalize_query(query)
+        answer = self.answer_cache.get(key)
+        if answer is not None:
+            return answer
+
+        vectors = self._embed_queries([query])
+        with timer("engine.search"):
+            _, positions = self.index.search(vectors, k)
+        matches = [pos for pos in positions[0] if pos != -1]
         if not matches:
             return "Sorry, I couldn't find a relevant answer in the dataset."
 
-        return matches[0].metadata.get("answer", "No answer found.")
+        answer = self.answers[matches[0]] or "No answer found."
+        self.answer_cache.put(key, answer)
+        return answer
+
+    def respond_batch(self, queries: List[str], k: int = 1) -> List[dict]:
+        """
+        Answers many queries with one embedding call and one index search.
+
+        All queries are embedded together and searched as a single matrix, which
+        is far cheaper than calling `respond` once per query for red-team sweeps.
+
+        Parameters
+        ----------
+        queries : list of str
+            User queries.
+        k : int, optional
+            Number of nearest training questions to return per query.
+
+        Returns
+        -------
+        list of dict
+            One entry per query, in order:
+            {
+                "answer": best answer (same text `respond` would return),
+                "matches": [{"answer": str, "distance": float}, ...]
+            }
+        """
+        if self.index is None:
+            return [{"answer": "Chatbot not trained yet.", "matches": []} for _ in queries]
+        if not queries:
+            return []
+
+        vectors = self._embed_queries(list(queries))
+        with timer("engine.search"):
+            distances, positions = self.index.search(vectors, k)
+
+        results = []
+        for row_distances, row_positions in zip(distances, positions):
+            matches = [
+                {"answer": self.answers[pos], "distance": float(dist)}
+                for pos, dist in zip(row_positions, row_distances) if pos != -1
+            ]
+            if matches:
+                answer = matches[0]["answer"] or "No answer found."
+            else:
+                answer = "Sorry, I couldn't find a relevant answer in the dataset."
+            results.append({"answer": answer, "matches": matches})
+        return results
+
+    def evaluate(self, chunks, k: int = 10, sample: int = None, perturbations=(), seed: int = 0,
+                 latency_queries: int = 100, progress=None) -> dict:
+        """
+        Measures how well the engine retrieves the answers of its own testset.
+
+        Each chunk of rows is asked as is and in every perturbed form (see
+        `chat_core.evaluation`): its questions are embedded in one batch, the
+        trained ones through the embedding cache and the perturbed ones past
+        it so they never displace training embeddings, then searched as one
+        matrix and scored with NumPy. A 100k-row testset thus costs a few
+        hundred calls rather than one `respond` per question.
+
+        A search is correct when it returns the row's reference answer, so
+        duplicate questions sharing an answer do not count against the
+        engine. Rows whose answer is not in the index (changed since
+        training) are skipped. Asked as is, a question finds its own trained
+        vector, so in an exact index the "original" scores are near perfect
+        by construction: they are reported apart, as a check of the index,
+        and the headline "perturbed" scores cover the perturbed forms only.
+
+        Parameters
+        ----------
+        chunks : iterable of list of (row_id, user_input, reference)
+            Testset rows, e.g. from `iter_training_rows`.
+        k : int, optional
+            Results per search, for top-k accuracy and MRR.
+        sample : int, optional
+            Evaluate about this many rows, sampled uniformly. Defaults to all.
+        perturbations : iterable of str, optional
+            Names from `chat_core.evaluation.PERTURBATIONS` to ask as well.
+        seed : int, optional
+            Seed of the sample and the perturbations.
+        latency_queries : int, optional
+            Questions also searched one at a time, as chat requests are, for
+            the per-query latency percentiles.
+        progress : Job, optional
+            Background job that receives `rows_evaluated` updates and the
+            time spent in the "eval_embed" and "eval_search" stages.
+
+        Returns
+        -------
+        dict
+            {
+                "rows": rows evaluated, "skipped": rows not evaluated, "k": int,
+                "perturbed": scores over all perturbed forms, or None,
+                "original": scores of the questions asked as is,
+                "variants": {"<perturbation>": scores},
+                "latency_ms": {
+                    "embed_per_query", "search_per_query": batch time per question,
+                    "single_search": {"p50", "p95", "p99", "mean"}
+                }
+            }
+
+            where scores are {"queries": int, "top1_accuracy": float,
+            "topk_accuracy": float, "mrr": float}.
+
+        Raises
+        ------
+        ValueError
+            If the engine is untrained or a perturbation is unknown.
+        """
+        if self.index is None:
+            raise ValueError("Cannot evaluate an untrained engine.")
+        k = max(1, min(k, self.index.ntotal))
+        rate = min(1.0, sample / self.index.ntotal) if sample else 1.0
+        rng = np.random.default_rng(seed)
+
+        # Map every answer id to the first id of the same text, in case the table repeats one.
+        lookup = {}
+        canonical = np.array(
+            [lookup.setdefault(answer, answer_id)
+             for answer_id, answer in enumerate(self.answers.table)],
+            dtype=np.int64
+        )
+        answer_ids = np.asarray(self.answers.ids)
+        variants = (ORIGINAL,) + tuple(perturbations)
+        scores = {variant: RetrievalScores(k) for variant in variants}
+        perturbed_scores = RetrievalScores(k)
+        rows = skipped = 0
+        embed_seconds = search_seconds = 0.0
+        single_ms = []
+
+        for chunk in chunks:
+            if rate < 1.0:
+                chunk = [row for row, keep in zip(chunk, rng.random(len(chunk)) < rate) if keep]
+            expected = np.array(
+                [lookup.get(reference, -1) for _, _, reference in chunk], dtype=np.int64
+            )
+            known = expected >= 0
+            skipped += int((~known).sum())
+            questions = [row[1] for row, is_known in zip(chunk, known) if is_known]
+            expected = expected[known]
+            if not questions:
+                continue
+            perturbed = [
+                perturb(question, variant, rng)
+                for variant in variants[1:] for question in questions
+            ]
+
+            start = time.perf_counter()
+            with _stage(progress, "eval_embed"):
+                # Questions as trained come from the embedding cache; perturbed ones
+                # are embedded as queries, like `respond` would, and never cached.
+                vectors = self.embedder.embed_documents(questions)
+                if perturbed:
+                    queried = self.embedding_model.embed_queries(perturbed)
+                    vectors = np.vstack([vectors, np.asarray(queried, dtype=np.float32)])
+            embed_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            with _stage(progress, "eval_search"):
+                _, positions = self.index.search(vectors, k)
+            search_seconds += time.perf_counter() - start
+
+            found = np.where(positions >= 0, canonical[answer_ids[np.maximum(positions, 0)]], -1)
+            n = len(questions)
+            for i, variant in enumerate(variants):
+                scores[variant].add(found[i * n:(i + 1) * n], expected)
+                if variant != ORIGINAL:
+                    perturbed_scores.add(found[i * n:(i + 1) * n], expected)
+
+            for vector in vectors[:max(0, min(n, latency_queries - len(single_ms)))]:
+                start = time.perf_counter()
+                self.index.search(vector[None, :], k)
+                single_ms.append((time.perf_counter() - start) * 1000)
+
+            rows += n
+            if progress is not None:
+                progress.update(rows_evaluated=rows)
+
+        queries = max(rows * len(variants), 1)
+        return {
+            "rows": rows,
+            "skipped": skipped,
+            "k": k,
+            "perturbed": perturbed_scores.to_dict() if len(variants) > 1 else None,
+            "original": scores[ORIGINAL].to_dict(),
+            "variants": {variant: scores[variant].to_dict() for variant in variants[1:]},
+            "latency_ms": {
+                "embed_per_query": round(embed_seconds * 1000 / queries, 4),
+                "search_per_query": round(search_seconds * 1000 / queries, 4),
+                "single_search": latency_summary(single_ms),
+            },
+        }
+
+    def close(self):
+        """
+        Releases what the engine shares with others. Called by the engine
+        registry when it drops the engine; a dedicated engine holds nothing shared.
+        """
+
+    def clear_caches(self):
+        """Drops cached answers and query embeddings, e.g. after the index changed."""
+        self.answer_cache.clear()
+        self.query_embedding_cache.clear()
+
+    def cache_stats(self) -> dict:
+        """
+        Returns hit/miss counters of the query-side caches for monitoring.
+        """
+        return {
+            "answers": self.answer_cache.stats(),
+            "query_embeddings": self.query_embedding_cache.stats(),
+        }
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embeds queries as a float32 matrix, reusing cached query embeddings.
+
+        Cache misses are embedded as queries by the shared service, the same
+        way for one query or many, so `respond` and `respond_batch` return the
+        same answer for the same text. The service merges them with
+        concurrent queries where the model allows it.
+        """
+        vectors = [self.query_embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+        if missing:
+            with timer("engine.embed_query"):
+                embedded = self.embedding_model.embed_queries(missing)
+            fresh = dict(zip(missing, np.asarray(embedded, dtype=np.float32)))
+            for query, vector in fresh.items():
+                # A copy, so the cache never keeps a whole batch matrix alive through one row.
+                self.query_embedding_cache.put(query, vector.copy())
+            vectors = [fresh[q] if v is None else v for q, v in zip(queries, vectors)]
+        return np.stack(vectors)
+
+    @timed("engine.save")
+    def save(self, chatbot_id, meta_id):
+        """
+        Persists the trained index and answers as an on-disk artifact.
+
+        Parameters
+        ----------
+        chatbot_id : UUID or str
+            Identifier of the chatbot the engine serves.
+        meta_id : UUID or str
+            Testset the engine was trained on.
+
+        Returns
+        -------
+        pathlib.Path
+            Path of the written artifact directory.
+        """
+        if self.index is None:
+            raise ValueError("Cannot save an untrained engine.")
+        return save_artifact(
+            chatbot_id, meta_id, self.index, self.answers, self.row_ids, self.embedding_model_id,
+            index_config=self.index_type
+        )
+
+    @classmethod
+    @timed("engine.load")
+    def load(cls, chatbot_id, meta_id, mmap: bool = True) -> "ChatbotEngine":
+        """
+        Builds an engine from a persisted artifact instead of retraining.
+
+        Parameters
+        ----------
+        chatbot_id : UUID or str
+            Identifier of the chatbot.
+        meta_id : UUID or str
+            Testset the artifact was trained on.
+        mmap : bool, optional
+            Memory-map the index and the answer and row id tables read-only
+            (default) so workers share their pages. Use False to get an engine
+            that `apply_changes` can modify.
+
+        Raises
+        ------
+        FileNotFoundError
+            If no usable artifact exists, including one built with a different
+            embedding model.
+        """
+        engine = cls()
+        index, answers, row_ids, manifest = load_artifact(chatbot_id, meta_id, mmap=mmap)
+        engine.index_type = manifest.get("index_config")
+        if manifest.get("embedding_model") != engine.embedding_model_id:
+            raise FileNotFoundError(
+                f"Index artifact for chatbot {chatbot_id} was built with "
+                f"{manifest.get('embedding_model')}, not {engine.embedding_model_id}"
+            )
+        engine.index = tune_index(index)
+        engine.answers = answers
+        engine.row_ids = row_ids
+        return engine
+
+    def memory_footprint(self) -> int:
+        """
+        Estimates the bytes held by the trained engine.
+
+        Counts the FAISS index (vector codes plus any graph or inverted-list
+        overhead), the answer store, the row ids and the query embedding
+        cache. Used by the engine registry to enforce its memory budget.
+        Memory-mapped indexes and tables count at their full size, although
+        their pages are shared between workers.
+        """
+        if self.index is None:
+            return 0
+        if isinstance(self.row_ids, MappedStrings):
+            row_id_bytes = self.row_ids.nbytes
+        else:
+            row_id_bytes = sum(sys.getsizeof(row_id) for row_id in self.row_ids)
+        return (index_bytes(self.index) + self.answers.nbytes + row_id_bytes
+                + self.query_cache_bytes())
+
+    def query_cache_bytes(self) -> int:
+        """
+        Estimates the bytes of the query embedding cache when full.
+
+        The registry measures an engine once, when it is loaded, while the
+        cache fills as the engine serves, so it is counted at capacity.
+        """
+        if self.index is None:
+            return 0
+        return self.query_embedding_cache.maxsize * (self.index.d * 4 + _QUERY_CACHE_ENTRY_OVERHEAD)
@@ -0,0 +1,139 @@
+"""
+Runtime settings for the chatbot serving layer.
+
+Values are read from the environment (see `.env`) so deployments can tune
+them without code changes.
+
+Attributes
+----------
+ENGINE_MEMORY_BUDGET_BYTES : int
+    Upper bound on the estimated memory held by trained engines in the
+    process-wide registry before least recently used engines are evicted.
+ENGINE_MAX_LOADED : int
+    Hard cap on the number of engines kept in the registry (0 disables it).
+INDEX_DIR : str
+    Root directory of the persisted vector index artifacts.
+SNAPSHOT_DIR : str
+    Root directory of the columnar testset snapshots that training reads
+    instead of the database ("" disables snapshots).
+EMBED_CACHE_PATH : str
+    SQLite file of the persistent embedding cache ("" disables the cache).
+EMBED_CACHE_MAX_ENTRIES : int
+    Number of cached embeddings kept before the least recently used are evicted.
+EMBED_BATCH_SIZE : int
+    Number of texts sent to the embedding model per call.
+EMBED_MICROBATCH_SIZE : int
+    Maximum number of texts the shared embedding service merges from
+    concurrent requests into one model call.
+EMBED_MICROBATCH_WAIT_MS : float
+    Milliseconds the shared embedding service waits for more requests after
+    the first one of a micro-batch arrives (0 sends each request alone).
+TRAINING_WORKERS : int
+    Number of training jobs that run concurrently in a worker process.
+JOB_HISTORY : int
+    Number of background jobs kept for status queries.
+CHAT_BATCH_SIZE : int
+    Queries embedded and searched together by the batch chat endpoint; results
+    are streamed after each batch.
+CHAT_BATCH_MAX_QUERIES : int
+    Maximum number of queries accepted by one batch chat request.
+QUERY_CACHE_SIZE : int
+    Answers cached per engine, by normalized query text.
+QUERY_EMBEDDING_CACHE_SIZE : int
+    Query embeddings cached per engine, by exact query text. Each entry holds
+    a float32 vector (about 6 KB at 1536 dimensions), so the cache is
+    counted against `ENGINE_MEMORY_BUDGET_BYTES` at full capacity.
+QUERY_CACHE_TTL : float
+    Seconds a cached answer or query embedding stays valid.
+DATABASE_URL : str
+    SQLAlchemy URL of the chatbot database. Empty (the default) means the
+    PostgreSQL database described by `PG_CONFIG`.
+DB_POOL_SIZE : int
+    Connections kept open in the shared SQLAlchemy pool.
+DB_MAX_OVERFLOW : int
+    Extra connections opened under load beyond `DB_POOL_SIZE`.
+DB_POOL_TIMEOUT : float
+    Seconds to wait for a free pooled connection before failing.
+DB_POOL_RECYCLE : int
+    Seconds after which pooled connections are replaced.
+DB_BULK_BATCH_SIZE : int
+    Rows streamed per COPY chunk (or executemany batch) by bulk inserts.
+DB_FETCH_CHUNK_SIZE : int
+    Rows per chunk when streaming query results, e.g. to feed training.
+CHATBOT_PAGE_MAX : int
+    Largest page `GET /chatbots` returns for one `limit`.
+CAMPAIGN_WORKERS : int
+    Threads sending prompts concurrently during a red-team campaign.
+CAMPAIGN_RATE_LIMIT : float
+    Maximum prompts per second a campaign sends across all workers and
+    chatbots (0 disables the limit).
+CAMPAIGN_FLUSH_SIZE : int
+    Campaign results buffered before they are bulk-inserted.
+INDEX_TYPE : str
+    FAISS index type of newly trained chatbots unless a training request names
+    one: "auto" (chosen by testset size) or one of `chat_core.indexes.INDEX_TYPES`.
+INDEX_FLAT_MAX_ROWS : int
+    Largest testset "auto" indexes with exact (flat) search.
+INDEX_HNSW_MAX_ROWS : int
+    Largest testset "auto" indexes with HNSW; larger ones use scalar-quantized IVF.
+INDEX_HNSW_M : int
+    Neighbours per node of HNSW graphs.
+INDEX_EF_SEARCH : int
+    Candidates HNSW explores per query; higher improves recall and costs latency.
+INDEX_NPROBE : int
+    Inverted lists IVF indexes scan per query; higher improves recall and costs latency.
+PRELOAD_ENGINES : bool
+    Open the engines of all deployed chatbots when the app is created. Under a
+    pre-fork server started with `--preload`, this happens once in the master
+    and every worker inherits the same memory-mapped indexes and answers.
+    Only persisted artifacts are opened; chatbots without one are skipped.
+SHARED_INDEX : bool
+    Serve chatbots with flat indexes from one shared index per embedding
+    model, where each distinct vector is stored once and every chatbot
+    searches only its testset's vectors (see `chat_core.shared_index`).
+    This trades query latency for memory: a search filters the whole shared
+    index, so a small chatbot's query costs as much as scanning every
+    tenant's vectors. Suits many small chatbots on overlapping testsets; the
+    shared index counts against `ENGINE_MEMORY_BUDGET_BYTES`.
+SHARED_INDEX_COMPACT_RATIO : float
+    Share of a shared index's vectors no loaded chatbot uses above which the
+    index is rebuilt from the used ones.
+"""
+import os
+
+ENGINE_MEMORY_BUDGET_BYTES = int(os.getenv("CHAT_ENGINE_MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+ENGINE_MAX_LOADED = int(os.getenv("CHAT_ENGINE_MAX_LOADED", "0"))
+INDEX_DIR = os.getenv("CHAT_INDEX_DIR", os.path.join("var", "indexes"))
+SNAPSHOT_DIR = os.getenv("CHAT_SNAPSHOT_DIR", os.path.join("var", "snapshots"))
+EMBED_CACHE_PATH = os.getenv("CHAT_EMBED_CACHE_PATH", os.path.join("var", "embeddings.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_EMBED_CACHE_MAX_ENTRIES", "1000000"))
+EMBED_BATCH_SIZE = int(os.getenv("CHAT_EMBED_BATCH_SIZE", "256"))
+EMBED_MICROBATCH_SIZE = int(os.getenv("CHAT_EMBED_MICROBATCH_SIZE", "64"))
+EMBED_MICROBATCH_WAIT_MS = float(os.getenv("CHAT_EMBED_MICROBATCH_WAIT_MS", "5"))
+TRAINING_WORKERS = int(os.getenv("CHAT_TRAINING_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("CHAT_JOB_HISTORY", "500"))
+CHAT_BATCH_SIZE = int(os.getenv("CHAT_BATCH_SIZE", "1000"))
+CHAT_BATCH_MAX_QUERIES = int(os.getenv("CHAT_BATCH_MAX_QUERIES", "100000"))
+QUERY_CACHE_SIZE = int(os.getenv("CHAT_QUERY_CACHE_SIZE", "10000"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("CHAT_QUERY_EMBEDDING_CACHE_SIZE", "1000"))
+QUERY_CACHE_TTL = float(os.getenv("CHAT_QUERY_CACHE_TTL", "3600"))
+DATABASE_URL = os.getenv("CHAT_DATABASE_URL", "")
+DB_POOL_SIZE = int(os.getenv("CHAT_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("CHAT_DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("CHAT_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("CHAT_DB_POOL_RECYCLE", "1800"))
+DB_BULK_BATCH_SIZE = int(os.getenv("CHAT_DB_BULK_BATCH_SIZE", "50000"))
+DB_FETCH_CHUNK_SIZE = int(os.getenv("CHAT_DB_FETCH_CHUNK_SIZE", "5000"))
+CHATBOT_PAGE_MAX = int(os.getenv("CHAT_CHATBOT_PAGE_MAX", "1000"))
+CAMPAIGN_WORKERS = int(os.getenv("CHAT_CAMPAIGN_WORKERS", "8"))
+CAMPAIGN_RATE_LIMIT = float(os.getenv("CHAT_CAMPAIGN_RATE_LIMIT", "0"))
+CAMPAIGN_FLUSH_SIZE = int(os.getenv("CHAT_CAMPAIGN_FLUSH_SIZE", "5000"))
+INDEX_TYPE = os.getenv("CHAT_INDEX_TYPE", "auto")
+INDEX_FLAT_MAX_ROWS = int(os.getenv("CHAT_INDEX_FLAT_MAX_ROWS", "50000"))
+INDEX_HNSW_MAX_ROWS = int(os.getenv("CHAT_INDEX_HNSW_MAX_ROWS", "1000000"))
+INDEX_HNSW_M = int(os.getenv("CHAT_INDEX_HNSW_M", "32"))
+INDEX_EF_SEARCH = int(os.getenv("CHAT_INDEX_EF_SEARCH", "64"))
+INDEX_NPROBE = int(os.getenv("CHAT_INDEX_NPROBE", "32"))
+PRELOAD_ENGINES = os.getenv("CHAT_PRELOAD_ENGINES", "false").lower() in ("1", "true", "yes")
+SHARED_INDEX = os.getenv("CHAT_SHARED_INDEX", "false").lower() in ("1", "true", "yes")
+SHARED_INDEX_COMPACT_RATIO = float(os.getenv("CHAT_SHARED_INDEX_COMPACT_RATIO", "0.25"))
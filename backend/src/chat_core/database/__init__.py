@@ -8,10 +8,15 @@ and ORM-integrated CRUD operations.
 Key Features:
 - Automatic PostgreSQL database creation (if it doesn't exist)
 - ORM table setup from Base.metadata
+- A single process-wide Storage with a tuned connection pool (`get_storage`)
 - Insertion and fetching of records via SQLAlchemy ORM or raw SQL
+- Column projection with plain tuple or JSON-ready dict rows (no ORM objects),
+  optionally sorted and paginated by keyset
+- Streaming fetch in fixed-size chunks over a server-side cursor or by keyset
+- Bulk insertion of large DataFrames with PostgreSQL COPY (executemany fallback)
 - Conversion of pandas DataFrames to ORM model instances
 - Built-in support for Enums and UUIDs
-- Safe deletion and update operations
+- Safe deletion and set-based update operations
 
 Dependencies:
 - psycopg2
@@ -20,51 +25,185 @@ Dependencies:
 - PostgreSQL
 
 Usage:
-    from core.commons.storage.database.sql_storage import Storage
-    storage = Storage(PG_CONFIG)
+    from chat_core.database import get_storage
+    storage = get_storage()
     storage.insert(df, name="example", orm_class=ExampleModel)
 """
-from uuid import UUID
+import enum
+import io
+import json
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from uuid import UUID, uuid4
 import pandas as pd
 
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
-from sqlalchemy import create_engine, text, inspect
-from sqlalchemy.engine import URL
+from sqlalchemy import create_engine, text, inspect, select, tuple_, update as sa_update
+from sqlalchemy.sql import table as sa_table, column as sa_column
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session, class_mapper
-from sqlalchemy.orm.attributes import InstrumentedAttribute
-from sqlalchemy.sql.sqltypes import Enum as SQLAlchemyEnumType
-
+from sqlalchemy.sql.sqltypes import Enum as SQLAlchemyEnumType, DateTime, JSON, Uuid
+
+from chat_core.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_BULK_BATCH_SIZE, DB_FETCH_CHUNK_SIZE
+)
+from chat_core.database.models import Base as ChatbotBase, Chatbots
+from chat_core.metrics import timed, timer
 from core.commons.storage.database.models import Base
+from core.commons.config import PG_CONFIG
 from core.commons.log_config import get_logger
 from core.commons.storage import DataStorage
 
 logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
 
+# Columns added to existing tables after their first release. `create_all`
+# only creates missing tables, so `bootstrap` adds these to older databases.
+_ADDED_COLUMNS = (
+    Chatbots.__table__.c.meta_dataset_id,
+    Chatbots.__table__.c.updated_at,
+)
+
 
 class Storage(DataStorage):
     """Implements DataStorage using SQLAlchemy with ORM and DataFrame support."""
 
-    def __init__(self, config):
+    def __init__(
+        self,
+        config,
+        bootstrap: bool = True,
+        pool_size: int = DB_POOL_SIZE,
+        max_overflow: int = DB_MAX_OVERFLOW,
+        pool_timeout: float = DB_POOL_TIMEOUT,
+        pool_recycle: int = DB_POOL_RECYCLE,
+        url: str = None
+    ):
         """
-        Initializes the SQLStorage object and sets up the target PostgreSQL database.
+        Initializes the SQLStorage object and its pooled SQLAlchemy engine.
 
-        If the specified database does not exist, it is created automatically.
-        ORM tables defined in `Base.metadata` are also created.
+        With `bootstrap` (the default) the target PostgreSQL database is created
+        if it does not exist and the ORM tables defined in `Base.metadata` are
+        created, see `bootstrap`. Prefer the shared instance from `get_storage`
+        so this happens once per process rather than once per caller.
 
         Parameters
         ----------
-        config : dict
+        config : dict or None
             Dictionary of PostgreSQL credentials and settings.
             Expected keys: user, password, host, port, database.
+            Not used when `url` is given.
+        bootstrap : bool, optional
+            Whether to create the database and tables now. Default is True.
+        pool_size : int, optional
+            Connections kept open in the pool.
+        max_overflow : int, optional
+            Extra connections allowed under load beyond `pool_size`.
+        pool_timeout : float, optional
+            Seconds to wait for a free connection.
+        pool_recycle : int, optional
+            Seconds after which a pooled connection is replaced.
+        url : str, optional
+            SQLAlchemy database URL used instead of `config`, e.g. a local
+            SQLite file for development and benchmarks. Pool settings only
+            apply to server databases.
 
         Raises
         ------
         Exception
             If the database or ORM schema creation fails.
         """
+        self.config = config
+        if url:
+            db_url = make_url(url)
+        else:
+            db_url = URL.create(
+                drivername="postgresql+psycopg2",
+                username=config["user"],
+                password=config["password"],
+                host=config["host"],
+                port=config["port"],
+                database=config["database"],
+            )
+        pool_options = {} if db_url.get_backend_name() == "sqlite" else {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
+        self.engine = create_engine(
+            db_url,
+            echo=False,
+            future=True,
+            pool_pre_ping=True,
+            **pool_options
+        )
+        self.session = scoped_session(sessionmaker(
+            bind=self.engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False
+        ))
+
+        if bootstrap:
+            self.bootstrap()
+
+    @timed("db.bootstrap")
+    def bootstrap(self):
+        """
+        Creates the target database if missing, then the ORM tables, and adds
+        the columns of `_ADDED_COLUMNS` that older tables lack.
+
+        Runs catalog queries and `create_all`, so it should run once per
+        process at startup, not per request. Database creation is skipped
+        for storages opened from a non-PostgreSQL `url`.
+
+        Raises
+        ------
+        Exception
+            If the database or ORM schema creation fails.
+        """
+        config = self.config
+        if self.engine.dialect.name == "postgresql" and config:
+            self._create_database(config)
+
+        try:
+            Base.metadata.create_all(self.engine)
+            ChatbotBase.metadata.create_all(self.engine)
+            self._add_missing_columns()
+            logger.info("✅ ORM tables created (if not existing).")
+        except Exception as e:
+            logger.error("❌ Table creation failed: %s", e)
+            raise
+
+    def _add_missing_columns(self):
+        """
+        Adds the columns of `_ADDED_COLUMNS` missing from existing tables.
+
+        The catalog is checked first, so an up-to-date schema takes no
+        table lock.
+        """
+        dialect = self.engine.dialect
+        preparer = dialect.identifier_preparer
+        if_not_exists = "IF NOT EXISTS " if dialect.name == "postgresql" else ""
+        with self.engine.begin() as conn:
+            for column in _ADDED_COLUMNS:
+                present = {c["name"] for c in inspect(conn).get_columns(column.table.name)}
+                if column.name in present:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {if_not_exists}"
+                    f"{preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+                ))
+                logger.info("Added column %s.%s.", column.table.name, column.name)
+
+    @staticmethod
+    def _create_database(config):
+        """Creates the configured PostgreSQL database if it does not exist."""
         try:
             temp_conn = psycopg2.connect(
                 dbname="postgres",
@@ -90,29 +229,6 @@ class Storage(DataStorage):
             logger.error("❌ Database creation failed: %s", e)
             raise
 
-        db_url = URL.create(
-            drivername="postgresql+psycopg2",
-            username=config["user"],
-            password=config["password"],
-            host=config["host"],
-            port=config["port"],
-            database=config["database"],
-        )
-        self.engine = create_engine(db_url, echo=False, future=True)
-        self.session = scoped_session(sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False
-        ))
-
-        try:
-            Base.metadata.create_all(self.engine)
-            logger.info("✅ ORM tables created (if not existing).")
-        except Exception as e:
-            logger.error("❌ Table creation failed: %s", e)
-            raise
-
     def define_schema(self, df, name, overwrite=False):
         """
         Creates a SQL table schema based on the columns of a given DataFrame.
@@ -142,7 +258,8 @@ class Storage(DataStorage):
         except SQLAlchemyError as e:
             logger.error("Define schema error for '%s': %s", name, e)
 
-    def insert(self, df, name, orm_class=None, fixed_fields=None):
+    @timed("db.insert")
+    def insert(self, df, name, orm_class=None, fixed_fields=None, bulk=False):
         """
         Inserts records from a DataFrame into a SQL table using ORM instances.
 
@@ -156,13 +273,23 @@ class Storage(DataStorage):
             SQLAlchemy ORM model class corresponding to the destination table.
         fixed_fields : dict, optional
             Fields to inject into each record (e.g., foreign keys).
+        bulk : bool, optional
+            If True, bypasses the ORM and streams the rows with `bulk_insert`.
+            Use for large imports. Default is False.
+
+        Returns
+        -------
+        dict or None
+            Throughput statistics in bulk mode, otherwise None.
         """
         if df.empty:
             logger.warning("Empty DataFrame. Insert skipped.")
-            return
+            return None
         if orm_class is None:
             logger.error("Insert failed: ORM class not provided.")
-            return
+            return None
+        if bulk:
+            return self.bulk_insert(df, name, orm_class, fixed_fields)
         try:
             records = self.df_to_orm(df, orm_class, fixed_fields or {})
             with self.session() as session:
@@ -171,7 +298,74 @@ class Storage(DataStorage):
                 logger.info("[INSERT ORM] %d rows inserted into '%s'.", len(records), name)
         except Exception as e:
             logger.error("ORM Insert error for '%s': %s", name, e)
+        return None
+
+    @timed("db.bulk_insert")
+    def bulk_insert(self, df, name, orm_class, fixed_fields=None,
+                    batch_size: int = DB_BULK_BATCH_SIZE):
+        """
+        Inserts a large DataFrame without creating ORM objects.
 
+        Applies the same UUID/Enum coercion, Python-side column defaults and
+        `fixed_fields` as the ORM path, then streams the rows into PostgreSQL
+        with `COPY ... FROM STDIN` in chunks of `batch_size`. If COPY is not
+        available (non-PostgreSQL engine or driver), rows are sent with
+        executemany in batches instead. All chunks share one transaction.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Data to insert.
+        name : str
+            Logical name for logging (not the table name).
+        orm_class : DeclarativeMeta
+            SQLAlchemy ORM model class corresponding to the destination table.
+        fixed_fields : dict, optional
+            Fields to inject into each record (e.g., foreign keys).
+        batch_size : int, optional
+            Rows per COPY chunk or executemany batch.
+
+        Returns
+        -------
+        dict or None
+            {"rows": int, "skipped": int, "seconds": float,
+             "rows_per_second": float, "method": "copy" | "executemany"},
+            or None if the insert failed.
+        """
+        start = time.perf_counter()
+        try:
+            frame, skipped = self._prepare_frame(
+                df, orm_class, fixed_fields or {}, with_defaults=True
+            )
+            if frame.empty:
+                logger.warning("No valid rows to insert into '%s'.", name)
+                return None
+            table = orm_class.__table__
+            if self.engine.dialect.name == "postgresql":
+                method = "copy"
+                self._copy_frame(frame, table, batch_size)
+            else:
+                method = "executemany"
+                self._executemany_frame(frame, table, batch_size)
+        except Exception as e:
+            logger.error("Bulk insert error for '%s': %s", name, e)
+            return None
+
+        seconds = time.perf_counter() - start
+        stats = {
+            "rows": len(frame),
+            "skipped": skipped,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(frame) / seconds, 1) if seconds else float(len(frame)),
+            "method": method,
+        }
+        logger.info(
+            "[INSERT %s] %d rows inserted into '%s' in %.2fs (%.0f rows/s).",
+            method.upper(), stats["rows"], name, seconds, stats["rows_per_second"]
+        )
+        return stats
+
+    @timed("db.fetch")
     def fetch(
         self,
         name: str = None,
@@ -179,7 +373,12 @@ class Storage(DataStorage):
         orm_class=None,
         filters: dict = None,
         join_model=None,
-        as_orm: bool = False
+        as_orm: bool = False,
+        columns: list = None,
+        row_format: str = None,
+        order_by: list = None,
+        after: tuple = None,
+        limit: int = None
     ):
         """
         Retrieves records from the database using raw SQL or ORM-based query.
@@ -198,13 +397,38 @@ class Storage(DataStorage):
             ORM model to join with (only used in ORM mode).
         as_orm : bool, optional
             If True, returns a list of ORM instances. Otherwise, returns a pandas DataFrame.
+        columns : list of str, optional
+            Attribute names of `orm_class` to select, in order. Only these
+            columns are transferred. Defaults to every mapped column.
+        row_format : str, optional
+            "tuple" or "dict" to return plain rows without building ORM
+            instances: tuples hold the raw column values, dicts are keyed by
+            column name and JSON-ready (UUIDs as strings, enums as values,
+            timestamps in ISO format). Takes precedence over `as_orm`.
+        order_by : list of str, optional
+            Attribute names to sort by, ascending. Projected queries only.
+        after : tuple, optional
+            Keyset cursor: only rows whose `order_by` values sort after these
+            values are returned. Requires `order_by`.
+        limit : int, optional
+            Maximum number of rows to return. Projected queries only.
+
+        With `columns` or `row_format`, a filter value that is a list, tuple
+        or set matches any of its items.
 
         Returns
         -------
         pandas.DataFrame or list
-            A DataFrame or list of ORM objects depending on the query mode.
+            A DataFrame, a list of ORM objects, or a list of tuples or dicts
+            depending on the query mode.
         """
+        if row_format not in (None, "tuple", "dict"):
+            raise ValueError(f"Unknown row_format: {row_format}")
         try:
+            if orm_class and (columns or row_format):
+                return self._fetch_rows(
+                    orm_class, filters, join_model, columns, row_format, order_by, after, limit
+                )
             if orm_class:
                 with self.session() as session:
                     query = session.query(orm_class)
@@ -227,29 +451,238 @@ class Storage(DataStorage):
                 return df
         except SQLAlchemyError as e:
             logger.error("Fetch error for '%s': %s", name or orm_class, e)
-            return [] if as_orm else pd.DataFrame()
+            return [] if as_orm or row_format else pd.DataFrame()
+
+    def _fetch_rows(self, orm_class, filters, join_model, columns, row_format,
+                    order_by=None, after=None, limit=None):
+        """
+        Runs a projected Core SELECT for `fetch`, without ORM instances.
+
+        Returns a list of tuples or JSON-ready dicts, or a DataFrame of the
+        selected columns when no `row_format` is given.
+        """
+        if columns is None:
+            columns = list(_mapped_columns(orm_class))
+        query = select(*[getattr(orm_class, column) for column in columns])
+        if join_model:
+            query = query.join(join_model)
+        for attr, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.where(getattr(orm_class, attr).in_(list(value)))
+            else:
+                query = query.where(getattr(orm_class, attr) == value)
+        if order_by:
+            keys = [getattr(orm_class, attr) for attr in order_by]
+            if after is not None:
+                query = query.where(tuple_(*keys) > tuple_(*after))
+            query = query.order_by(*keys)
+        if limit is not None:
+            query = query.limit(limit)
+
+        with self.engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(query)]
+        logger.info(
+            "[FETCH ROWS] %d records (%d columns) fetched from '%s'.",
+            len(rows), len(columns), orm_class.__tablename__
+        )
+        if row_format == "tuple":
+            return rows
+        if row_format == "dict":
+            return [
+                {column: _to_json_value(value) for column, value in zip(columns, row)}
+                for row in rows
+            ]
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def iter_fetch(
+        self,
+        orm_class,
+        filters: dict = None,
+        columns: list = None,
+        chunk_size: int = DB_FETCH_CHUNK_SIZE,
+        as_frame: bool = False,
+        key: str = None
+    ):
+        """
+        Streams records in fixed-size chunks over a server-side cursor, or by
+        keyset pagination.
 
+        Unlike `fetch`, no ORM objects are built and at most one chunk is held
+        in memory, so callers such as training keep a flat memory profile as
+        the table grows.
+
+        A server-side cursor holds its connection, inside an open transaction,
+        until the last chunk has been read. With `key`, each chunk is instead
+        read by its own short query (`key > last key ORDER BY key LIMIT
+        chunk_size`), and the connection is back in the pool while the
+        caller works on the chunk. Use it when the caller is slow between
+        chunks, e.g. when it embeds each chunk. Each page is an index range
+        scan when the filtered columns and `key` share an index.
+
+        Parameters
+        ----------
+        orm_class : DeclarativeMeta
+            SQLAlchemy model class to query.
+        filters : dict, optional
+            Dictionary of field-value equality filters.
+        columns : list of str, optional
+            Attribute names to select, in order. Defaults to every mapped column.
+        chunk_size : int, optional
+            Rows per yielded chunk.
+        as_frame : bool, optional
+            If True, yields pandas DataFrames instead of lists of row tuples.
+        key : str, optional
+            Unique attribute to page by; it must be one of `columns`. Rows
+            are then yielded in `key` order.
+
+        Yields
+        ------
+        list of tuple or pandas.DataFrame
+            Up to `chunk_size` rows with the selected columns.
+        """
+        if columns is None:
+            columns = list(_mapped_columns(orm_class))
+        if key is not None and key not in columns:
+            raise ValueError(f"Keyset column {key!r} must be selected")
+        query = select(*[getattr(orm_class, column) for column in columns])
+        for attr, value in (filters or {}).items():
+            query = query.where(getattr(orm_class, attr) == value)
+
+        total = 0
+        if key is not None:
+            pages = self._iter_pages(query, getattr(orm_class, key), columns.index(key), chunk_size)
+        else:
+            pages = self._iter_cursor(query, chunk_size)
+        for rows in pages:
+            total += len(rows)
+            yield pd.DataFrame.from_records(rows, columns=columns) if as_frame else rows
+        logger.info(
+            "[FETCH STREAM] %d records streamed from '%s'.", total, orm_class.__tablename__
+        )
+
+    def _iter_cursor(self, query, chunk_size: int):
+        """Yields lists of row tuples read over one server-side cursor."""
+        with self.engine.connect() as conn:
+            options = conn.execution_options(stream_results=True, yield_per=chunk_size)
+            result = options.execute(query)
+            partitions = result.partitions(chunk_size)
+            while True:
+                with timer("db.iter_fetch"):
+                    partition = next(partitions, None)
+                if partition is None:
+                    break
+                yield [tuple(row) for row in partition]
+
+    def _iter_pages(self, query, key_column, key_position: int, chunk_size: int):
+        """Yields lists of row tuples read by keyset pages, one pooled connection per page."""
+        query = query.order_by(key_column).limit(chunk_size)
+        last = None
+        while True:
+            page = query if last is None else query.where(key_column > last)
+            with timer("db.iter_fetch"), self.engine.connect() as conn:
+                rows = [tuple(row) for row in conn.execute(page)]
+            if not rows:
+                break
+            yield rows
+            if len(rows) < chunk_size:
+                break
+            last = rows[-1][key_position]
+
+    @timed("db.update")
     def update(self, df, name, key_column):
+        """
+        Updates rows of a SQL table from a DataFrame, matched on a key column.
+
+        Rows are grouped by the set of non-null columns they carry. Each group
+        is staged in a temporary table and applied with a single
+        `UPDATE ... FROM` statement, so updating many rows (e.g. retiring or
+        redeploying many chatbots) costs one statement per column set instead
+        of one per row. For tables defined by the ORM models, UUID, Enum and
+        timestamp values are coerced to the column types first.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            New values; null cells leave the current value unchanged.
+        name : str
+            Name of the SQL table.
+        key_column : str
+            Column identifying the rows to update.
+
+        Returns
+        -------
+        int
+            Number of rows actually updated (0 if skipped or on error).
+        """
         if df.empty or key_column not in df.columns:
             logger.warning("Empty DataFrame or missing key column. Update skipped.")
-            return
+            return 0
+
+        frame = df[df[key_column].notna()]
+        target = self._table(name)
+        if target is not None:
+            frame, invalid = self._coerce_columns(
+                frame, {col.name: col for col in target.columns if col.name in frame.columns}
+            )
+            frame = frame[~invalid]
+        else:
+            target = sa_table(name, *[sa_column(col) for col in frame.columns])
+
+        mask = frame.notna()
+        updated = 0
         try:
             with self.engine.begin() as conn:
-                for _, row in df.iterrows():
-                    row_data = row.dropna().to_dict()
-                    if key_column not in row_data:
+                for pattern, index in mask.groupby(list(mask.columns)).groups.items():
+                    pattern = pattern if isinstance(pattern, tuple) else (pattern,)
+                    columns = [col for col, present in zip(mask.columns, pattern) if present]
+                    if columns == [key_column] or key_column not in columns:
                         continue
-                    set_clause = ", ".join(
-                        f"{col} = :{col}" for col in row_data if col != key_column
-                    )
-                    query = text(
-                        f"UPDATE {name} SET {set_clause} WHERE {key_column} = :{key_column}"
-                    )
-                    conn.execute(query, row_data)
-            logger.info("[UPDATE] Updated %d rows in '%s'.", len(df), name)
+                    records = frame.loc[index, columns].astype(object).to_dict("records")
+                    updated += self._update_from_staging(conn, target, key_column, columns, records)
+            logger.info("[UPDATE] Updated %d of %d rows in '%s'.", updated, len(df), name)
         except SQLAlchemyError as e:
             logger.error("Update error for '%s': %s", name, e)
+            return 0
+        return updated
+
+    def _update_from_staging(self, conn, target, key_column, columns, records) -> int:
+        """
+        Stages records in a temporary table with the target's column types and
+        applies them with one `UPDATE ... FROM`. Returns the affected row count.
+
+        On PostgreSQL the staging table is dropped when the transaction ends
+        (`ON COMMIT DROP`); elsewhere it is dropped after the update, and a
+        failed update's rollback removes it. Either way, no cleanup statement
+        runs in an aborted transaction and hides the original error.
+        """
+        preparer = self.engine.dialect.identifier_preparer
+        postgresql = self.engine.dialect.name == "postgresql"
+        staging_name = f"_staged_update_{uuid4().hex[:12]}"
+        staging = sa_table(staging_name, *[sa_column(col, target.c[col].type) for col in columns])
+        conn.execute(text(
+            f"CREATE TEMPORARY TABLE {staging_name}{' ON COMMIT DROP' if postgresql else ''} AS "
+            f"SELECT {', '.join(preparer.quote(col) for col in columns)} "
+            f"FROM {preparer.format_table(target)} WHERE 1 = 0"
+        ))
+        conn.execute(staging.insert(), records)
+        result = conn.execute(
+            sa_update(target)
+            .where(target.c[key_column] == staging.c[key_column])
+            .values({col: staging.c[col] for col in columns if col != key_column})
+        )
+        if not postgresql:
+            conn.execute(text(f"DROP TABLE {staging_name}"))
+        return result.rowcount
 
+    @staticmethod
+    def _table(name):
+        """Returns the ORM-defined Table called `name`, or None."""
+        for metadata in (Base.metadata, ChatbotBase.metadata):
+            if name in metadata.tables:
+                return metadata.tables[name]
+        return None
+
+    @timed("db.delete")
     def delete(self, name, where_clause):
         """
         Deletes records from a SQL table based on a WHERE clause.
@@ -271,13 +704,164 @@ class Storage(DataStorage):
         except SQLAlchemyError as e:
             logger.error("Delete error for '%s': %s", name, e)
 
+    def _copy_frame(self, frame: pd.DataFrame, table, batch_size: int):
+        """Streams a prepared frame into `table` with COPY FROM STDIN, one chunk at a time."""
+        preparer = self.engine.dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(column) for column in frame.columns)
+        statement = (
+            f"COPY {preparer.format_table(table)} ({columns}) "
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        )
+        serialized = self._serialize_for_copy(frame, table)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                for start in range(0, len(serialized), batch_size):
+                    buffer = io.StringIO()
+                    serialized.iloc[start:start + batch_size].to_csv(
+                        buffer, header=False, index=False, na_rep="\\N"
+                    )
+                    buffer.seek(0)
+                    cur.copy_expert(statement, buffer)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _executemany_frame(self, frame: pd.DataFrame, table, batch_size: int):
+        """Inserts a prepared frame into `table` with batched executemany."""
+        records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        with self.engine.begin() as conn:
+            for start in range(0, len(records), batch_size):
+                conn.execute(table.insert(), records[start:start + batch_size])
+
+    @staticmethod
+    def _serialize_for_copy(frame: pd.DataFrame, table) -> pd.DataFrame:
+        """Converts coerced values to the text COPY expects (enum labels, UUID/JSON strings)."""
+        out = frame.copy()
+        for column_name in out.columns:
+            column_type = table.columns[column_name].type
+            series = out[column_name]
+            if isinstance(column_type, SQLAlchemyEnumType) and column_type.enum_class is not None:
+                labels = dict(zip(column_type.enum_class, column_type.enums))
+                out[column_name] = series.map(labels, na_action="ignore")
+            elif isinstance(column_type, Uuid):
+                out[column_name] = series.map(str, na_action="ignore")
+            elif isinstance(column_type, JSON):
+                out[column_name] = series.map(json.dumps, na_action="ignore")
+        return out
+
+    @staticmethod
+    def _prepare_frame(df: pd.DataFrame, orm_class, fixed_fields: dict,
+                       with_defaults: bool = False):
+        """
+        Coerces a DataFrame column by column for insertion into `orm_class`'s table.
+
+        - Keeps only columns mapped by the ORM class and renames attribute keys
+          to table column names.
+        - Applies `fixed_fields` to every row.
+        - Parses UUID strings and converts Enum values or names to enum members.
+        - Optionally fills Python-side column defaults (e.g. generated ids),
+          which the ORM would otherwise apply.
+
+        Rows with values that cannot be coerced are dropped and reported in a
+        single log line per column.
+
+        Returns
+        -------
+        tuple
+            `(frame, skipped)`: the coerced DataFrame and the number of dropped rows.
+        """
+        columns = _mapped_columns(orm_class)
+
+        frame = df.copy()
+        for key, value in fixed_fields.items():
+            frame[key] = [value] * len(frame)
+        unknown = [col for col in frame.columns if col not in columns]
+        if unknown:
+            logger.warning("Ignoring columns not mapped by %s: %s", orm_class.__name__, unknown)
+            frame = frame.drop(columns=unknown)
+
+        frame, invalid = Storage._coerce_columns(frame, columns)
+
+        skipped = int(invalid.sum())
+        if skipped:
+            frame = frame[~invalid]
+
+        if with_defaults:
+            for key, column in columns.items():
+                default = column.default
+                if key in frame.columns or default is None:
+                    continue
+                if default.is_callable:
+                    frame[key] = [default.arg(None) for _ in range(len(frame))]
+                elif default.is_scalar:
+                    frame[key] = [default.arg] * len(frame)
+
+        frame = frame.rename(columns={key: column.name for key, column in columns.items()})
+        return frame, skipped
+
+    @staticmethod
+    def _coerce_columns(frame: pd.DataFrame, columns: dict):
+        """
+        Coerces whole UUID, Enum and timestamp columns to the Python types SQLAlchemy binds.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            Data whose column labels are keys of `columns`.
+        columns : dict
+            Maps each frame column to its SQLAlchemy `Column`.
+
+        Returns
+        -------
+        tuple
+            `(frame, invalid)`: a coerced copy of the frame and a boolean Series
+            marking rows with values that could not be coerced. Invalid values
+            are reported in a single log line per column.
+        """
+        frame = frame.copy()
+        invalid = pd.Series(False, index=frame.index)
+        for key in frame.columns:
+            column_type = columns[key].type
+            series = frame[key]
+            present = series.notna()
+            if isinstance(column_type, Uuid):
+                converted = series.map(_to_uuid, na_action="ignore")
+            elif isinstance(column_type, SQLAlchemyEnumType) and column_type.enum_class is not None:
+                lookup = _enum_lookup(column_type.enum_class)
+                converted = series.map(
+                    lambda value, lookup=lookup: lookup.get(value), na_action="ignore"
+                )
+            elif (isinstance(column_type, DateTime)
+                  and not pd.api.types.is_datetime64_any_dtype(series)):
+                converted = pd.to_datetime(series, errors="coerce", utc=bool(column_type.timezone))
+            else:
+                continue
+            bad = present & converted.isna()
+            if bad.any():
+                logger.warning(
+                    "Skipping %d rows with invalid values in column '%s' (e.g. %r).",
+                    int(bad.sum()), key, series[bad].iloc[0]
+                )
+                invalid |= bad
+            frame[key] = converted.astype(object).where(converted.notna(), None)
+        return frame, invalid
+
     @staticmethod
     def df_to_orm(df: pd.DataFrame, orm_class, fixed_fields: dict = None) -> list:
         """
         Converts a pandas DataFrame into a list of ORM model instances.
 
-        Handles UUID parsing and SQLAlchemy Enum conversion to ensure
-        type-safe ORM instantiation.
+        Columns are coerced as a whole (UUID parsing, SQLAlchemy Enum and
+        timestamp conversion, see `_coerce_columns`) before any instance is
+        built, so the per-row work is limited to the model constructor. Null
+        cells are left out so column defaults apply. Rows with values that
+        cannot be coerced or that the model rejects are skipped and reported
+        in one log line per cause.
 
         Parameters
         ----------
@@ -293,41 +877,96 @@ class Storage(DataStorage):
         list
             List of ORM instances ready for insertion.
         """
-        fixed_fields = fixed_fields or {}
-        instances = []
-
-        mapper = class_mapper(orm_class)
-        column_attrs = {
-            attr.key: attr.columns[0].type
-            for attr in mapper.attrs
-            if isinstance(attr, InstrumentedAttribute) and hasattr(attr, 'columns')
-        }
+        columns = _mapped_columns(orm_class)
 
-        for _, row in df.iterrows():
-            row_data = row.dropna().to_dict()
+        frame = df.copy()
+        for key, value in (fixed_fields or {}).items():
+            frame[key] = [value] * len(frame)
+        unknown = [col for col in frame.columns if col not in columns]
+        if unknown:
+            logger.warning("Ignoring columns not mapped by %s: %s", orm_class.__name__, unknown)
+            frame = frame.drop(columns=unknown)
 
-            for key, value in row_data.items():
-                # UUID conversion
-                if isinstance(value, str) and isinstance(column_attrs.get(key), UUID):
-                    try:
-                        row_data[key] = UUID(value)
-                    except ValueError:
-                        logger.warning("Invalid UUID in column '%s': %s", key, value)
-                        continue
+        frame, invalid = Storage._coerce_columns(frame, columns)
+        if invalid.any():
+            frame = frame[~invalid]
 
-                # Enum conversion
-                if isinstance(value, str) and isinstance(column_attrs.get(key), SQLAlchemyEnumType):
-                    enum_cls = column_attrs[key].enum_class
-                    try:
-                        row_data[key] = enum_cls(value)
-                    except ValueError:
-                        logger.warning("Invalid enum value for column '%s': %s", key, value)
-                        continue
+        keys = list(frame.columns)
+        values = frame.astype(object).to_numpy()
+        present = frame.notna().to_numpy()
 
+        instances = []
+        failed, first_error = 0, None
+        for row, mask in zip(values, present):
             try:
-                instance = orm_class(**{**row_data, **fixed_fields})
-                instances.append(instance)
+                fields = {key: value for key, value, keep in zip(keys, row, mask) if keep}
+                instances.append(orm_class(**fields))
             except Exception as e:
-                logger.warning("Skipping row due to insert error: %s", e)
+                failed += 1
+                first_error = first_error or e
+        if failed:
+            logger.warning(
+                "Skipping %d rows rejected by %s (e.g. %s).",
+                failed, orm_class.__name__, first_error
+            )
 
         return instances
+
+
+@lru_cache(maxsize=None)
+def _mapped_columns(orm_class) -> dict:
+    """Maps the attribute keys of an ORM class to their `Column`, cached per class."""
+    return {prop.key: prop.columns[0] for prop in class_mapper(orm_class).column_attrs}
+
+
+@lru_cache(maxsize=None)
+def _enum_lookup(enum_class) -> dict:
+    """Maps every member, name and value of an Enum class to its member, cached per class."""
+    lookup = {}
+    for member in enum_class:
+        lookup.update({member: member, member.name: member, member.value: member})
+    return lookup
+
+
+def _to_uuid(value):
+    """Returns `value` as a UUID, or None if it is not a valid UUID."""
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _to_json_value(value):
+    """Returns a JSON-serializable form of a column value (UUID, Enum, datetime)."""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """
+    Returns the process-wide Storage, creating and bootstrapping it on first use.
+
+    All routes and loaders share this instance and therefore one connection
+    pool; the database and schema bootstrap runs only once per process.
+
+    Returns
+    -------
+    Storage
+        The shared storage for `DATABASE_URL`, or `PG_CONFIG` if it is unset.
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = Storage(None, url=DATABASE_URL) if DATABASE_URL else Storage(PG_CONFIG)
+    return _storage
@@ -1,30 +1,45 @@
 """
 Module: dataset_loader
 
-Provides a utility function to retrieve a full dataset associated with a specific
-MetaDataset ID from a PostgreSQL database using SQLAlchemy ORM and convert it to
-a pandas DataFrame.
+Provides utility functions to retrieve the dataset associated with a specific
+MetaDataset ID from a PostgreSQL database using SQLAlchemy ORM, either in full,
+streamed in chunks, or only the rows that changed since a chatbot was last trained,
+to summarize a testset for snapshot freshness checks, and to summarize the
+chatbots table for conditional requests.
+
+All functions use the process-wide storage from `get_storage`, so they share
+one connection pool and never re-run the database bootstrap.
 
 Dependencies:
 - pandas
-- core.commons.storage.database.SQLStorage
+- chat_core.database.get_storage
+- chat_core.database.models.Chatbots
 - core.commons.storage.database.models.Dataset
-- core.commons.config.PG_CONFIG
 """
+import uuid
+
 import pandas as pd
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
-from core.commons.storage.database import SQLStorage
+from chat_core.database import get_storage
+from chat_core.database.models import Chatbots
+from chat_core.metrics import timed
 from core.commons.storage.database.models import Dataset
-from core.commons.config import PG_CONFIG
 
+# Ids per `IN (...)` list when reading rows by id, so a large change
+# (e.g. a bulk import) never builds one huge statement.
+_ID_CHUNK = 1000
+
+
+@timed("db.dataset")
 def get_full_dataset_by_meta_id(meta_id) -> pd.DataFrame:
     """
     Retrieve a full dataset from the database using the given MetaDataset ID.
 
-    This function initializes a SQLStorage instance with the configured
-    PostgreSQL connection, queries the `Dataset` ORM model for entries
-    related to the provided `meta_dataset_id`, and returns the result
-    as a pandas DataFrame.
+    This function queries the `Dataset` ORM model through the shared storage
+    for entries related to the provided `meta_dataset_id`, and returns the
+    result as a pandas DataFrame.
 
     Parameters
     ----------
@@ -36,7 +51,213 @@ def get_full_dataset_by_meta_id(meta_id) -> pd.DataFrame:
     pd.DataFrame
         A DataFrame containing all dataset records linked to the given meta_id.
     """
-    storage = SQLStorage(PG_CONFIG)
+    storage = get_storage()
 
     df_dataset = storage.fetch(orm_class=Dataset, filters={"meta_dataset_id": meta_id})
     return df_dataset
+
+
+@timed("db.training_pairs")
+def get_training_pairs_by_meta_id(meta_id) -> list:
+    """
+    Retrieve the `(user_input, reference)` pairs of a MetaDataset.
+
+    Only the two columns are selected and rows are returned as plain tuples,
+    without building ORM objects, ready to be passed to `ChatbotEngine.train`.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        The ID of the MetaDataset.
+
+    Returns
+    -------
+    list of tuple
+        `(user_input, reference)` rows.
+    """
+    storage = get_storage()
+
+    return storage.fetch(
+        orm_class=Dataset,
+        filters={"meta_dataset_id": meta_id},
+        columns=["user_input", "reference"],
+        row_format="tuple"
+    )
+
+
+def iter_dataset_by_meta_id(meta_id, chunk_size: int = None, with_changed_at: bool = False):
+    """
+    Stream the training rows of a MetaDataset in fixed-size chunks.
+
+    Only the columns training needs are selected and rows are read in pages
+    by keyset on `id`, so memory stays flat regardless of the testset size
+    and no connection is held while the caller embeds (or sends) a chunk.
+    Chunks come in `id` order.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        The ID of the MetaDataset.
+    chunk_size : int, optional
+        Rows per chunk. Defaults to the storage's streaming chunk size.
+    with_changed_at : bool, optional
+        Also select when each row was last written, e.g. for snapshots.
+
+    Yields
+    ------
+    list of tuple
+        `(id, user_input, reference)` rows, with a fourth `changed_at` value
+        if `with_changed_at` is set.
+    """
+    storage = get_storage()
+
+    columns = ["id", "user_input", "reference"]
+    if with_changed_at:
+        columns.append(_changed_at_column().key)
+    kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+    yield from storage.iter_fetch(
+        orm_class=Dataset,
+        filters={"meta_dataset_id": meta_id},
+        columns=columns,
+        key="id",
+        **kwargs
+    )
+
+
+@timed("db.chatbots_version")
+def get_chatbots_version() -> tuple:
+    """
+    Summarize the state of the `chatbots` table in one aggregate query.
+
+    Every insert and update sets `updated_at`, so the summary changes
+    whenever a chatbot is created, edited, trained, deployed or deleted.
+    It can validate cached listings (e.g. as an ETag) without reading any
+    rows.
+
+    Returns
+    -------
+    tuple
+        Row count and newest `updated_at`.
+    """
+    storage = get_storage()
+
+    with storage.session() as session:
+        return tuple(session.execute(
+            select(func.count(Chatbots.id), func.max(Chatbots.updated_at))
+        ).one())
+
+
+def _changed_at_column():
+    """Returns the Dataset column that records when a row was last written."""
+    return getattr(Dataset, "updated_at", None) or Dataset.created_at
+
+
+def dataset_tracks_updates() -> bool:
+    """Whether Dataset rows record when they were last modified, not only created."""
+    return getattr(Dataset, "updated_at", None) is not None
+
+
+def _content_digest(dialect: str):
+    """
+    Returns an aggregate hashing the ids and texts of the selected rows in id
+    order, or None where the database has no ordered `string_agg` and `md5`.
+    """
+    if dialect != "postgresql":
+        return None
+    row = func.md5(func.concat(
+        cast(Dataset.id, String), "\x1f",
+        func.coalesce(Dataset.user_input, ""), "\x1f",
+        func.coalesce(Dataset.reference, "")
+    ))
+    return func.md5(func.string_agg(row, aggregate_order_by("", Dataset.id)))
+
+
+@timed("db.dataset_version")
+def get_dataset_version(meta_id) -> tuple:
+    """
+    Summarize the dataset rows of a MetaDataset in one aggregate query.
+
+    The summary changes whenever a row is added or deleted, or written with a
+    newer timestamp, so it tells whether a snapshot of the testset is still
+    current without reading any rows. On PostgreSQL it also carries a digest
+    of every row's id and texts, which changes when a row is edited in place
+    even if its timestamps do not.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        The ID of the MetaDataset.
+
+    Returns
+    -------
+    tuple
+        `(row count, newest write time, content digest)`; the time is None
+        for an empty testset, the digest None for an empty testset or a
+        database other than PostgreSQL.
+    """
+    storage = get_storage()
+
+    columns = [func.count(Dataset.id), func.max(_changed_at_column())]
+    digest = _content_digest(storage.engine.dialect.name)
+    if digest is not None:
+        columns.append(digest)
+    with storage.session() as session:
+        row = session.execute(select(*columns).where(Dataset.meta_dataset_id == meta_id)).one()
+    return row[0], row[1], row[2] if digest is not None else None
+
+
+@timed("db.dataset_changes")
+def get_dataset_changes_by_meta_id(meta_id, since, indexed_ids: set):
+    """
+    Retrieve the dataset rows that changed since a point in time.
+
+    A row is returned if it was written after `since`, or if it is not part
+    of `indexed_ids` (e.g. a row inserted with an older timestamp). Ids that
+    are indexed but no longer exist are reported as removed.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        The ID of the MetaDataset.
+    since : datetime
+        When the chatbot was last trained.
+    indexed_ids : set of str
+        Row ids currently held by the chatbot's index.
+
+    Returns
+    -------
+    tuple
+        `(changed, removed_ids)` where `changed` is a DataFrame of new or
+        modified rows (columns id, user_input, reference) and `removed_ids`
+        is a set of deleted row ids.
+    """
+    storage = get_storage()
+
+    # Only ids are streamed over the whole testset; texts are read for changed rows only.
+    current_ids = set()
+    for chunk in storage.iter_fetch(
+        orm_class=Dataset, filters={"meta_dataset_id": meta_id}, columns=["id"], key="id"
+    ):
+        current_ids.update(str(row_id) for (row_id,) in chunk)
+    removed_ids = indexed_ids - current_ids
+
+    with storage.engine.connect() as conn:
+        written = conn.execute(
+            select(Dataset.id)
+            .where(Dataset.meta_dataset_id == meta_id)
+            .where(_changed_at_column() > since)
+        )
+        changed_ids = sorted({str(row_id) for (row_id,) in written} | (current_ids - indexed_ids))
+
+    columns = ["id", "user_input", "reference"]
+    frames = [
+        storage.fetch(
+            orm_class=Dataset,
+            filters={"id": [uuid.UUID(row_id) for row_id in changed_ids[start:start + _ID_CHUNK]]},
+            columns=columns
+        )
+        for start in range(0, len(changed_ids), _ID_CHUNK)
+    ]
+    changed = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    changed["id"] = changed["id"].astype(str)
+    return changed, removed_ids
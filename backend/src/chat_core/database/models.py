@@ -3,7 +3,8 @@ ORM models for chatbot deployment schema.
 
 Defines:
 - Chatbot: Chatbot related dataset entries.
-- 
+- Campaign: A red-team run of a testset against deployed chatbots.
+- CampaignResult: One prompt sent to one chatbot during a campaign.
 
 Use `Base.metadata.create_all(engine)` to initialize tables.
 """
@@ -11,7 +12,9 @@ import uuid
 import enum
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, String, Text, TIMESTAMP, Enum as SQLAlchemyEnum
+from sqlalchemy import (
+    Boolean, Column, Float, ForeignKey, Index, JSON, String, Text, TIMESTAMP, Enum as SQLAlchemyEnum
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base
 
@@ -44,8 +47,10 @@ class Chatbots(Base):
         name (str): Descriptive name for the chatbot deployed
         description (str): Optional text explaining what the chatbot is for
         deployment_url (str): Link of the chatbot
+        meta_dataset_id (UUID): Testset (MetaDataset) the chatbot is trained on
         created_at (timestamp): When the chatbot was created
         last_trained_at (timestamp): When the chatbot was last trained
+        updated_at (timestamp): When the row was created or last updated
         status (enum): Chatbot Status
     """
     __tablename__  = "chatbots"
@@ -54,6 +59,7 @@ class Chatbots(Base):
     name = Column(Text, nullable=False)
     description = Column(Text, nullable=True)
     deployment_url = Column(String, nullable=False)
+    meta_dataset_id = Column(UUID(as_uuid=True), nullable=True)
     created_at = Column(
         TIMESTAMP(timezone=True),
         default=lambda: datetime.now(timezone.utc)
@@ -62,6 +68,11 @@ class Chatbots(Base):
         TIMESTAMP(timezone=True),
         default=lambda: datetime.now(timezone.utc)
     )
+    updated_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
     status = Column(SQLAlchemyEnum(StatusEnum, name="status_enum"), nullable=False)
 
     def to_dict(self):
@@ -74,6 +85,7 @@ class Chatbots(Base):
                 - name (str)
                 - description (str or None)
                 - deployment_url (str or None)
+                - meta_dataset_id (str or None)
                 - created_at (str in ISO format or None)
                 - last_trained_at (str in ISO format or None)
                 - status (str)
@@ -83,7 +95,102 @@ class Chatbots(Base):
             "name": self.name,
             "description": self.description,
             "deployment_url": self.deployment_url,
+            "meta_dataset_id": str(self.meta_dataset_id) if self.meta_dataset_id else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "last_trained_at": self.last_trained_at.isoformat() if self.last_trained_at else None,
             "status": self.status.value
         }
+
+
+class Campaign(Base):
+    """
+    Represents one red-team campaign: a testset run against deployed chatbots.
+
+    Attributes:
+        id (UUID): Primary key identifier
+        meta_dataset_id (UUID): Testset (MetaDataset) the prompts come from
+        chatbot_ids (list): Chatbots the prompts were sent to
+        status (str): "running", "succeeded" or "failed"
+        report (dict): Per-chatbot throughput, latency and hit-rate summary
+        created_at (timestamp): When the campaign started
+        finished_at (timestamp): When the campaign finished
+    """
+    __tablename__ = "campaigns"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    meta_dataset_id = Column(UUID(as_uuid=True), nullable=False)
+    chatbot_ids = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="running")
+    report = Column(JSON, nullable=True)
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    def to_dict(self):
+        """
+        Convert the Campaign ORM object to a serializable dictionary.
+
+        Returns:
+            dict: The campaign's columns with UUIDs and timestamps as strings.
+        """
+        return {
+            "id": str(self.id),
+            "meta_dataset_id": str(self.meta_dataset_id),
+            "chatbot_ids": self.chatbot_ids,
+            "status": self.status,
+            "report": self.report,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class CampaignResult(Base):
+    """
+    Represents the response of one chatbot to one campaign prompt.
+
+    Attributes:
+        id (UUID): Primary key identifier
+        campaign_id (UUID): Campaign the result belongs to
+        chatbot_id (UUID): Chatbot that answered
+        dataset_id (UUID): Dataset row the prompt came from
+        response (str): Answer returned by the chatbot
+        distance (float): Distance to the retrieved training question
+        hit (bool): Whether the retrieved answer is the prompt's reference
+        latency_ms (float): Time taken to answer
+        error (str): Failure reason, if the prompt could not be answered
+    """
+    __tablename__ = "campaign_results"
+    __table_args__ = (Index("ix_campaign_results_campaign_chatbot", "campaign_id", "chatbot_id"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    campaign_id = Column(
+        UUID(as_uuid=True), ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False
+    )
+    chatbot_id = Column(UUID(as_uuid=True), nullable=False)
+    dataset_id = Column(UUID(as_uuid=True), nullable=True)
+    response = Column(Text, nullable=True)
+    distance = Column(Float, nullable=True)
+    hit = Column(Boolean, nullable=True)
+    latency_ms = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+    def to_dict(self):
+        """
+        Convert the CampaignResult ORM object to a serializable dictionary.
+
+        Returns:
+            dict: The result's columns with UUIDs as strings.
+        """
+        return {
+            "id": str(self.id),
+            "campaign_id": str(self.campaign_id),
+            "chatbot_id": str(self.chatbot_id),
+            "dataset_id": str(self.dataset_id) if self.dataset_id else None,
+            "response": self.response,
+            "distance": self.distance,
+            "hit": self.hit,
+            "latency_ms": self.latency_ms,
+            "error": self.error
+        }
@@ -0,0 +1,591 @@
+"""
+Embedding helpers shared by training and serving.
+
+Embedding is the dominant cost of training a chatbot, and testsets repeat
+prompts both within a testset and across chatbots. Embeddings are therefore
+cached persistently, keyed by a hash of the embedding model identity and the
+text, so retraining the same or an overlapping testset only embeds new text.
+Cache misses are sent to the model in fixed-size batches.
+
+Each process loads the embedding model once and shares it through an
+`EmbeddingService`. Small requests arriving concurrently from any engine or
+route (e.g. single chat queries) are merged into micro-batches: the first
+request waits at most `EMBED_MICROBATCH_WAIT_MS` for others, up to
+`EMBED_MICROBATCH_SIZE` texts, and the whole batch is embedded in one call.
+
+Classes
+-------
+EmbeddingCache
+    Size-capped, SQLite-backed store of embeddings with LRU eviction.
+CachedEmbedder
+    Embeds texts through the cache, deduplicating and batching misses.
+EmbeddingService
+    Shared embedding model that micro-batches concurrent requests.
+
+Functions
+---------
+describe_embedding_model
+    Returns a stable identity for an embedding model.
+get_embedding_cache
+    Returns the process-wide embedding cache.
+get_embedding_service
+    Returns the process-wide embedding service.
+embedding_service_stats
+    Returns the shared service's counters, if it has been created.
+"""
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from chat_core.config import (
+    EMBED_BATCH_SIZE, EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_PATH, EMBED_MICROBATCH_SIZE,
+    EMBED_MICROBATCH_WAIT_MS
+)
+from chat_core.metrics import timer
+from core.commons.log_config import get_logger
+from core.utils.clients import ModelClient
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+# SQLite limits the number of bound parameters per statement.
+_SQL_CHUNK = 500
+# Seconds within which a cache hit does not rewrite its entry's recency again.
+_RECENCY_RESOLUTION = 60.0
+# Text embedded both as a query and as a document to tell whether a model distinguishes them.
+_QUERY_PROBE = "How do I reset my password?"
+
+
+def describe_embedding_model(embedding_model) -> str:
+    """
+    Returns a stable identity for an embedding model.
+
+    Vectors from different models are not comparable, so the identity is part
+    of every cache key and is stored with persisted indexes. An
+    `EmbeddingService` is described by the model it serves.
+    """
+    if isinstance(embedding_model, EmbeddingService):
+        embedding_model = embedding_model.embedding_model
+    name = next(
+        (getattr(embedding_model, attr) for attr in ("model", "model_name", "deployment")
+         if getattr(embedding_model, attr, None)),
+        ""
+    )
+    return f"{type(embedding_model).__name__}:{name}"
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """Runs the enclosed statements of an autocommit connection as one transaction."""
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-capped cache of embeddings backed by a SQLite file.
+
+    Keys are content hashes, so the cache can be shared by every chatbot and
+    process on the host. When the number of entries exceeds `max_entries`,
+    the least recently used tenth of the cache is evicted.
+
+    SQLite connections must not be used across `fork`, so a pre-fork worker
+    that inherited the cache opens its own connection on first use.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file. Parent directories are created if needed.
+    max_entries : int
+        Maximum number of embeddings kept.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this process's connection, opening it on first use. Caller holds the lock.
+
+        A connection inherited through `fork` is abandoned, not closed, so
+        the child never touches the parent's SQLite state.
+        """
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def key(model_id: str, text: str) -> str:
+        """Returns the content-addressed cache key of a text for a model."""
+        return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up embeddings and refreshes their recency.
+
+        Recency only orders eviction, so entries used within the last
+        `_RECENCY_RESOLUTION` seconds are not rewritten, and the remaining
+        refreshes are written in one transaction.
+
+        Returns
+        -------
+        dict
+            Cached float32 vectors by key; missing keys are absent.
+        """
+        found, stale = {}, []
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _SQL_CHUNK):
+                chunk = list(keys[start:start + _SQL_CHUNK])
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    "SELECT key, dim, vector, last_used FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, dim, blob, _ in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+                stale.extend(
+                    key for key, _, _, last_used in rows
+                    if last_used < now - _RECENCY_RESOLUTION
+                )
+            if stale:
+                with _transaction(conn):
+                    conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in stale]
+                    )
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Stores embeddings by key and evicts old entries if over capacity."""
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (key, int(vector.shape[0]), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            conn = self._connection()
+            with _transaction(conn):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            self._evict(conn)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drops least recently used entries down to 90% of capacity. Caller holds the lock."""
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        logger.info("[EMBED CACHE] Evicted %d embeddings.", excess)
+
+
+class CachedEmbedder:
+    """
+    Embeds texts through an `EmbeddingCache`.
+
+    Duplicate texts are embedded once, cached vectors are reused, and the
+    remaining texts are sent to the model in batches of `batch_size`.
+
+    Parameters
+    ----------
+    embedding_model : Embeddings
+        LangChain-compatible embedding model (`embed_documents`).
+    cache : EmbeddingCache, optional
+        Cache to use. Without one every text is embedded.
+    batch_size : int, optional
+        Texts per embedding call. Defaults to `EMBED_BATCH_SIZE`.
+    """
+
+    def __init__(self, embedding_model, cache: EmbeddingCache = None,
+                 batch_size: int = EMBED_BATCH_SIZE):
+        self.embedding_model = embedding_model
+        self.model_id = describe_embedding_model(embedding_model)
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.embedded = 0
+        self.reused = 0
+
+    def embed_documents(self, texts: List[str],
+                        on_progress: Callable[[int], None] = None) -> np.ndarray:
+        """
+        Returns a float32 matrix with one embedding row per input text.
+
+        Parameters
+        ----------
+        texts : list of str
+            Texts to embed.
+        on_progress : callable, optional
+            Called with the number of input texts that have an embedding so
+            far, after the cache lookup and after every model batch.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [EmbeddingCache.key(self.model_id, text) for text in texts]
+        counts = Counter(keys)
+        unique = dict(zip(keys, texts))
+        vectors = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        self.reused += len(vectors)
+        done = sum(counts[key] for key in vectors)
+        if on_progress:
+            on_progress(done)
+
+        missing = [key for key in unique if key not in vectors]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = np.asarray(
+                self.embedding_model.embed_documents([unique[key] for key in batch]),
+                dtype=np.float32
+            )
+            fresh = dict(zip(batch, embedded))
+            vectors.update(fresh)
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            done += sum(counts[key] for key in batch)
+            if on_progress:
+                on_progress(done)
+        self.embedded += len(missing)
+
+        if missing:
+            logger.info(
+                "[EMBED] %d texts: %d unique, %d from cache, %d embedded.",
+                len(texts), len(unique), len(unique) - len(missing), len(missing)
+            )
+        return np.stack([vectors[key] for key in keys])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    Returns the process-wide embedding cache, or None if it is disabled.
+    """
+    global _cache
+    if not EMBED_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+class _EmbedRequest:
+    """Texts waiting for a micro-batch, and the caller's handle on the result."""
+
+    __slots__ = ("texts", "vectors", "error", "done")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingService:
+    """
+    One embedding model shared by every engine and route of a process.
+
+    Requests smaller than `max_batch` texts are queued. A dispatcher thread
+    takes the first queued request, collects more for at most `max_wait`
+    seconds or until `max_batch` texts are pending, embeds them all in one
+    `embed_documents` call and hands each caller its rows. Under concurrent
+    chat load this turns many single-query model calls into a few batched
+    ones; a request is delayed by at most `max_wait`. Requests of
+    `max_batch` texts or more (e.g. training batches) are embedded directly
+    by the calling thread.
+
+    Queries and documents have separate queues, because some models embed
+    them differently (e.g. with an instruction prefix). On first use the
+    service embeds a probe text both ways: if the vectors agree, queued
+    queries are merged into one `embed_documents` call like documents;
+    otherwise every query is embedded with the model's `embed_query`, one
+    call per text, directly by the calling thread so concurrent queries do
+    not wait on each other.
+
+    The service has the `embed_documents`/`embed_query` interface of the
+    model it wraps, so it can be used wherever the model was.
+
+    Parameters
+    ----------
+    embedding_model : Embeddings
+        LangChain-compatible embedding model (`embed_documents`, `embed_query`).
+    max_batch : int, optional
+        Maximum texts per merged model call. Defaults to `EMBED_MICROBATCH_SIZE`.
+    max_wait : float, optional
+        Seconds to wait for more requests. Defaults to `EMBED_MICROBATCH_WAIT_MS`.
+        With 0 every request is embedded directly.
+    load_model : callable, optional
+        Returns a fresh instance of the model. A pre-fork worker that
+        inherited the service calls it once, so it does not share the
+        model's HTTP connection pool with its parent.
+    """
+
+    def __init__(self, embedding_model, max_batch: int = EMBED_MICROBATCH_SIZE,
+                 max_wait: float = EMBED_MICROBATCH_WAIT_MS / 1000,
+                 load_model: Callable[[], object] = None):
+        self.embedding_model = embedding_model
+        self._load_model = load_model
+        self._model_pid = os.getpid()
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._pid = None
+        self._probe_lock = threading.Lock()
+        self._query_as_document = None
+        self.requests = 0
+        self.texts = 0
+        self.model_calls = 0
+        self.merged_requests = 0
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Returns a float32 matrix with one embedding row per input text."""
+        return self._submit(texts, query=False)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """Returns a float32 matrix with the query embedding of each text."""
+        return self._submit(texts, query=True)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Returns the float32 query embedding of one text, batched with concurrent queries."""
+        return self.embed_queries([text])[0]
+
+    def stats(self) -> dict:
+        """
+        Returns request and model call counters for monitoring.
+
+        `merged_requests` counts queued requests that shared a model call with
+        at least one other request.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "model_calls": self.model_calls,
+                "merged_requests": self.merged_requests,
+            }
+
+    def _submit(self, texts: List[str], query: bool) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self.requests += 1
+            self.texts += len(texts)
+        # Queries a model embeds differently cannot share a call: queueing them
+        # would only make concurrent callers wait on each other.
+        if len(texts) >= self.max_batch or self.max_wait <= 0 or not self._merges(query):
+            return self._embed(texts, query)
+        request = _EmbedRequest(texts)
+        self._dispatch_queue(query).put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors
+
+    def _embed(self, texts: List[str], query: bool = False) -> np.ndarray:
+        model = self._model()
+        if query and not self._merges(query):
+            with self._lock:
+                self.model_calls += len(texts)
+            with timer("embed.model"):
+                return np.asarray([model.embed_query(text) for text in texts], dtype=np.float32)
+        with self._lock:
+            self.model_calls += 1
+        with timer("embed.model"):
+            return np.asarray(model.embed_documents(texts), dtype=np.float32)
+
+    def _merges(self, query: bool) -> bool:
+        """
+        Returns whether requests of this kind can share an `embed_documents` call.
+
+        Documents always can. Queries can if the model embeds a probe text
+        the same way as a query and as a document; the probe runs once.
+        """
+        if not query:
+            return True
+        if self._query_as_document is None:
+            with self._probe_lock:
+                if self._query_as_document is None:
+                    model = self._model()
+                    as_query = np.asarray(model.embed_query(_QUERY_PROBE), dtype=np.float32)
+                    as_document = np.asarray(
+                        model.embed_documents([_QUERY_PROBE])[0], dtype=np.float32
+                    )
+                    with self._lock:
+                        self.model_calls += 2
+                    self._query_as_document = bool(
+                        np.allclose(as_query, as_document, rtol=1e-3, atol=1e-5)
+                    )
+                    logger.info(
+                        "[EMBED] %s embeds queries %s documents.", describe_embedding_model(model),
+                        "like" if self._query_as_document else "differently from"
+                    )
+        return self._query_as_document
+
+    def _model(self):
+        """Returns the wrapped model, reloaded once in a forked worker if `load_model` was given."""
+        if self._load_model is not None and self._model_pid != os.getpid():
+            with self._lock:
+                if self._model_pid != os.getpid():
+                    self.embedding_model = self._load_model()
+                    self._model_pid = os.getpid()
+        return self.embedding_model
+
+    def _dispatch_queue(self, query: bool) -> queue.Queue:
+        """
+        Returns the query or document queue, starting its dispatcher thread on first use.
+
+        Threads do not survive `fork`, so a pre-fork worker that inherited a
+        started service starts its own dispatchers and queues.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queues = {}
+                self._pid = os.getpid()
+            requests = self._queues.get(query)
+            if requests is None:
+                requests = self._queues[query] = queue.Queue()
+                threading.Thread(
+                    target=self._run, args=(requests, query),
+                    name="embedding-service-queries" if query else "embedding-service", daemon=True
+                ).start()
+            return requests
+
+    def _run(self, requests: queue.Queue, query: bool):
+        """
+        Dispatcher loop: collects micro-batches from the queue and embeds them.
+
+        Requests already queued are always merged. Waiting up to `max_wait`
+        for more only pays off under concurrent load, so the dispatcher waits
+        only after the previous batch merged several requests into one model
+        call; a lone caller is served without delay.
+        """
+        concurrent = False
+        while True:
+            batch = [requests.get()]
+            pending = len(batch[0].texts)
+            deadline = time.monotonic() + (self.max_wait if concurrent else 0.0)
+            while pending < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        request = requests.get(timeout=remaining)
+                    else:
+                        request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                pending += len(request.texts)
+            concurrent = self._embed_batch(batch, query)
+
+    def _embed_batch(self, batch: List[_EmbedRequest], query: bool) -> bool:
+        """
+        Embeds the texts of every request and resolves each request.
+
+        Returns
+        -------
+        bool
+            True if several requests shared one model call.
+        """
+        merged = False
+        try:
+            merged = len(batch) > 1 and self._merges(query)
+            vectors = self._embed([text for request in batch for text in request.texts], query)
+            start = 0
+            for request in batch:
+                request.vectors = vectors[start:start + len(request.texts)]
+                start += len(request.texts)
+        except Exception as exc:  # handed to every waiting caller
+            for request in batch:
+                request.error = exc
+        finally:
+            if merged:
+                with self._lock:
+                    self.merged_requests += len(batch)
+            for request in batch:
+                request.done.set()
+        return merged
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _load_embedding_model():
+    return ModelClient.load().get_embeddings()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """
+    Returns the process-wide embedding service, loading the model on first use.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService(_load_embedding_model(), load_model=_load_embedding_model)
+            logger.info(
+                "[EMBED] Shared embedding service for %s "
+                "(micro-batches of up to %d texts, %.1f ms wait).",
+                describe_embedding_model(_service), _service.max_batch, _service.max_wait * 1000
+            )
+    return _service
+
+
+def embedding_service_stats():
+    """Returns the shared service's counters, or None if no engine has loaded the model yet."""
+    service = _service
+    return service.stats() if service is not None else None
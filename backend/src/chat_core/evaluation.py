@@ -0,0 +1,136 @@
+"""
+Retrieval self-evaluation of trained chatbots.
+
+A chatbot answers with the reference of the nearest training question, so
+how well it retrieves can be measured on its own testset: every question
+(or a sample) is asked as is and in perturbed forms, and a search counts as
+correct when it returns the row's reference answer. Asked as is, a question
+finds itself in an exact index, so that variant mostly measures approximate
+indexes and duplicate questions with different answers; the perturbed
+variants measure robustness to rewording.
+
+Perturbations are deterministic for a given seed, so two evaluations of the
+same testset ask the same questions:
+
+    typo         two adjacent characters swapped
+    drop_word    one word removed
+    swap_words   two adjacent words swapped
+
+Classes
+-------
+RetrievalScores
+    Accumulates top-1/top-k accuracy and MRR over batches of searches.
+
+Functions
+---------
+perturb
+    Returns a perturbed copy of a question.
+latency_summary
+    Summarizes latency samples as percentiles.
+"""
+import numpy as np
+
+PERTURBATIONS = ("typo", "drop_word", "swap_words")
+ORIGINAL = "original"
+
+
+def perturb(text: str, kind: str, rng: np.random.Generator) -> str:
+    """
+    Returns a perturbed copy of `text`.
+
+    Texts too short for the perturbation are returned unchanged.
+
+    Parameters
+    ----------
+    text : str
+        Question to perturb.
+    kind : str
+        A name from `PERTURBATIONS`.
+    rng : numpy.random.Generator
+        Source of the perturbation positions.
+
+    Raises
+    ------
+    ValueError
+        If `kind` is not a known perturbation.
+    """
+    if kind == "typo":
+        if len(text) < 2:
+            return text
+        i = int(rng.integers(len(text) - 1))
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    words = text.split()
+    if kind == "drop_word":
+        if len(words) < 2:
+            return text
+        del words[int(rng.integers(len(words)))]
+        return " ".join(words)
+    if kind == "swap_words":
+        if len(words) < 2:
+            return text
+        i = int(rng.integers(len(words) - 1))
+        words[i], words[i + 1] = words[i + 1], words[i]
+        return " ".join(words)
+    raise ValueError(f"Unknown perturbation {kind!r}; expected one of {PERTURBATIONS}")
+
+
+def latency_summary(samples) -> dict:
+    """Returns the p50, p95, p99 and mean of latency samples in milliseconds."""
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "mean": round(float(samples.mean()), 4),
+    }
+
+
+class RetrievalScores:
+    """
+    Top-1/top-k accuracy and mean reciprocal rank over batches of searches.
+
+    Parameters
+    ----------
+    k : int
+        Number of results per search.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.queries = 0
+        self.top1 = 0
+        self.topk = 0
+        self.reciprocal_ranks = 0.0
+
+    def add(self, found: np.ndarray, expected: np.ndarray):
+        """
+        Scores a batch of searches.
+
+        Parameters
+        ----------
+        found : numpy.ndarray
+            (queries, k) answer ids of the results, best first; negative for
+            missing results.
+        expected : numpy.ndarray
+            Answer id each query should retrieve.
+        """
+        hits = (found == expected[:, None]) & (found >= 0)
+        hit = hits.any(axis=1)
+        ranks = hits.argmax(axis=1) + 1
+        self.queries += len(expected)
+        self.top1 += int(hits[:, 0].sum())
+        self.topk += int(hit.sum())
+        self.reciprocal_ranks += float((1.0 / ranks[hit]).sum())
+
+    def to_dict(self) -> dict:
+        """Returns the accumulated scores."""
+        queries = max(self.queries, 1)
+        return {
+            "queries": self.queries,
+            "top1_accuracy": round(self.top1 / queries, 4),
+            "topk_accuracy": round(self.topk / queries, 4),
+            "mrr": round(self.reciprocal_ranks / queries, 4),
+        }
@@ -0,0 +1,526 @@
+"""
+On-disk artifacts for trained chatbot indexes.
+
+A trained `ChatbotEngine` is persisted as a versioned artifact directory so
+restarts and new workers can open the index instead of re-embedding the whole
+testset. Artifacts are keyed by chatbot id and testset (`meta_id`):
+
+    <INDEX_DIR>/<chatbot_id>/<meta_id>/v<FORMAT_VERSION>/    (link to v<FORMAT_VERSION>.<id>/)
+        manifest.json   format version, row count, dimension, index type, embedding
+                        model, content hash
+        index.faiss     FAISS index, opened memory-mapped when serving
+        answer_ids.npy  int32 answer id of each index position
+        answers.bin     distinct UTF-8 answers, one after another
+        answers.npy     int64 offsets: answer i is bytes [offsets[i], offsets[i+1])
+        row_ids.bin     Dataset row ids, stored like the answers
+        row_ids.npy
+
+Artifacts are written to a temporary directory, which becomes a uniquely
+named version directory. `v<FORMAT_VERSION>` is a symbolic link to the
+current one and is replaced in a single rename, so a reader always finds
+either the previous or the new artifact, never a partial or missing one.
+The previous version is kept for readers that are still opening it.
+
+When serving, the index and the answer tables are memory-mapped read-only.
+Every worker of a pre-fork server that opens the same artifact (before or
+after forking) shares one copy of their pages through the page cache, where
+Python lists of strings would be copied into each worker by reference
+counting.
+
+Classes
+-------
+MappedStrings
+    Read-only sequence of strings in one contiguous buffer plus offsets.
+AnswerStore
+    Answer of each index position, with repeated answers stored once.
+AnswerStoreBuilder
+    Builds an `AnswerStore` incrementally, deduplicating as it goes.
+
+Functions
+---------
+publish_directory
+    Atomically makes a written directory the one served at a path.
+artifact_path
+    Returns the artifact directory for a chatbot and testset.
+save_artifact
+    Writes an index and its answers as an artifact.
+read_manifest
+    Returns the manifest of an artifact without opening its index.
+load_artifact
+    Opens an artifact, memory-mapping the index by default.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from chat_core.config import INDEX_DIR
+from chat_core.indexes import IVF_TYPES, index_type_of
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+# Version 3 replaced the JSON answer and row id lists with memory-mapped tables;
+# version 4 stores each distinct answer once, with an answer id per position.
+FORMAT_VERSION = 4
+
+# IO_FLAG_MMAP_IFC (newer FAISS releases) also maps the codes of flat indexes,
+# not only inverted lists, so the vectors are shared through the page cache.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+# IVF indexes map their inverted lists with IO_FLAG_MMAP alone; combined with
+# IO_FLAG_MMAP_IFC, FAISS refuses to open them.
+IVF_MMAP_FLAGS = faiss.IO_FLAG_MMAP
+# Times `load_artifact` retries when the version it opened is retired by newer saves meanwhile.
+OPEN_ATTEMPTS = 3
+# Files whose bytes decide what a chatbot answers; hashed into the manifest's
+# "content_hash", so artifacts with identical contents can be recognized.
+_SERVED_FILES = ("index.faiss", "answer_ids.npy", "answers.bin", "answers.npy", "answers.nulls.npy")
+
+
+class MappedStrings:
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus offsets.
+
+    Item `i` is decoded from `data[offsets[i]:offsets[i + 1]]` on access, so
+    no Python string is kept per item. Tables opened from an artifact are
+    memory-mapped and their pages stay shared between processes. Items
+    written as None are marked in `nulls`.
+
+    Parameters
+    ----------
+    data : buffer
+        Concatenated UTF-8 strings, e.g. a `numpy.memmap` of uint8.
+    offsets : numpy.ndarray
+        int64 array of length `len(self) + 1`.
+    nulls : numpy.ndarray, optional
+        Boolean array marking items that are None.
+    """
+
+    def __init__(self, data, offsets, nulls=None):
+        self._data = data
+        self._offsets = offsets
+        self._nulls = nulls
+
+    @classmethod
+    def open(cls, directory: Path, name: str, mmap: bool = True) -> "MappedStrings":
+        """Opens the table `<name>.bin` / `<name>.npy` (and `<name>.nulls.npy`) in `directory`."""
+        mode = "r" if mmap else None
+        offsets = np.load(directory / f"{name}.npy", mmap_mode=mode)
+        nulls_file = directory / f"{name}.nulls.npy"
+        nulls = np.load(nulls_file, mmap_mode=mode) if nulls_file.exists() else None
+        data_file = directory / f"{name}.bin"
+        if not mmap or data_file.stat().st_size == 0:
+            # numpy cannot map empty files.
+            data = np.fromfile(data_file, dtype=np.uint8)
+        else:
+            data = np.memmap(data_file, dtype=np.uint8, mode="r")
+        return cls(data, offsets, nulls)
+
+    @classmethod
+    def from_strings(cls, strings) -> "MappedStrings":
+        """Packs strings (None allowed) into an in-memory table."""
+        strings = list(strings)
+        encoded = [b"" if text is None else str(text).encode("utf-8") for text in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        nulls = np.fromiter((text is None for text in strings), dtype=bool, count=len(strings))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets, nulls if nulls.any() else None)
+
+    def save(self, directory: Path, name: str):
+        """Writes the table as `<name>.bin`, `<name>.npy` and, with nulls, `<name>.nulls.npy`."""
+        with open(directory / f"{name}.bin", "wb") as f:
+            f.write(memoryview(np.ascontiguousarray(self._data)))
+        np.save(directory / f"{name}.npy", self._offsets)
+        if self._nulls is not None:
+            np.save(directory / f"{name}.nulls.npy", self._nulls)
+
+    @classmethod
+    def write(cls, directory: Path, name: str, strings):
+        """Writes strings (None allowed) as the table `name` in `directory`."""
+        cls.from_strings(strings).save(directory, name)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the table (shared between processes when mapped)."""
+        nulls = self._nulls.nbytes if self._nulls is not None else 0
+        return int(self._data.nbytes + self._offsets.nbytes + nulls)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("MappedStrings index out of range")
+        if self._nulls is not None and self._nulls[i]:
+            return None
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class AnswerStore:
+    """
+    Answer of each index position, with repeated answers stored once.
+
+    Testsets repeat reference answers a lot. Position `i` maps to the integer
+    answer id `ids[i]`, and each distinct answer is kept once in a
+    `MappedStrings` table, so a row costs 4 bytes plus its share of the
+    distinct answers instead of a Python string per row. The store is a
+    read-only sequence; `delete` and `extend` return updated copies.
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+        int32 answer id per index position.
+    table : MappedStrings
+        Distinct answers, indexed by answer id.
+    mapped : bool, optional
+        Whether `ids` and `table` are memory-mapped from an artifact.
+    """
+
+    def __init__(self, ids, table: MappedStrings, mapped: bool = False):
+        self.ids = ids
+        self.table = table
+        self.mapped = mapped
+
+    @classmethod
+    def build(cls, answers) -> "AnswerStore":
+        """Builds a store holding `answers` in order."""
+        builder = AnswerStoreBuilder()
+        builder.extend(answers)
+        return builder.build()
+
+    @classmethod
+    def open(cls, directory: Path, mmap: bool = True) -> "AnswerStore":
+        """Opens the store saved in `directory`, memory-mapped by default."""
+        ids = np.load(directory / "answer_ids.npy", mmap_mode="r" if mmap else None)
+        return cls(ids, MappedStrings.open(directory, "answers", mmap=mmap), mapped=mmap)
+
+    def save(self, directory: Path):
+        """Writes the store as `answer_ids.npy` and the `answers` table in `directory`."""
+        np.save(directory / "answer_ids.npy", np.asarray(self.ids, dtype=np.int32))
+        self.table.save(directory, "answers")
+
+    @property
+    def unique(self) -> int:
+        """Number of distinct answers."""
+        return len(self.table)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the answer ids and the distinct answers."""
+        return int(self.ids.nbytes) + self.table.nbytes
+
+    def delete(self, positions) -> "AnswerStore":
+        """
+        Returns a store without the given positions, keeping the order of the others.
+
+        Answers no longer referenced stay in the table until the store is rebuilt.
+        """
+        return AnswerStore(np.delete(self.ids, positions), self.table)
+
+    def extend(self, answers) -> "AnswerStore":
+        """Returns a store with `answers` appended, reusing the stored distinct answers."""
+        builder = AnswerStoreBuilder(self)
+        builder.extend(answers)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.table[int(answer_id)] for answer_id in self.ids[i]]
+        return self.table[int(self.ids[i])]
+
+    def __iter__(self):
+        for answer_id in self.ids:
+            yield self.table[int(answer_id)]
+
+
+class AnswerStoreBuilder:
+    """
+    Collects answers position by position and packs them into an `AnswerStore`.
+
+    Only one Python string is kept per distinct answer while building, so
+    streamed training does not hold a string per row.
+
+    Parameters
+    ----------
+    store : AnswerStore, optional
+        Existing store to append to.
+    """
+
+    def __init__(self, store: AnswerStore = None):
+        self._ids = array("i")
+        self._answers = []
+        self._lookup = {}
+        if store is not None:
+            self._answers = list(store.table)
+            self._lookup = {answer: answer_id for answer_id, answer in enumerate(self._answers)}
+            self._ids.extend(int(answer_id) for answer_id in store.ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def extend(self, answers):
+        """Appends answers, one per index position."""
+        for answer in answers:
+            answer_id = self._lookup.get(answer)
+            if answer_id is None:
+                answer_id = self._lookup[answer] = len(self._answers)
+                self._answers.append(answer)
+            self._ids.append(answer_id)
+
+    def build(self) -> AnswerStore:
+        """Returns the packed store."""
+        ids = np.frombuffer(self._ids, dtype=np.int32).copy()
+        return AnswerStore(ids, MappedStrings.from_strings(self._answers))
+
+
+def publish_directory(staging: Path, target: Path) -> Path:
+    """
+    Makes a fully written directory the one served at `target`.
+
+    `staging` is renamed to a uniquely named version directory beside
+    `target`, and `target` becomes a symbolic link to it by renaming a fresh
+    link over the old one. Readers therefore see the old or the new
+    directory at every moment. Publishers of the same target take a lock
+    file in turn, so concurrent writers do not fail each other: the last one
+    wins. The version replaced is kept for readers still opening it and
+    older versions are removed.
+
+    Parameters
+    ----------
+    staging : pathlib.Path
+        Written directory, in the same directory as `target`.
+    target : pathlib.Path
+        Path readers open.
+
+    Returns
+    -------
+    pathlib.Path
+        The version directory `target` now links to.
+    """
+    parent = target.parent
+    version = parent / f"{target.name}.{uuid.uuid4().hex}"
+    with open(parent / f".{target.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        os.replace(staging, version)
+        previous = None
+        if target.is_symlink():
+            previous = os.readlink(target)
+        elif target.exists():
+            # Directory written before versions were linked; retired like any other version.
+            previous = f"{target.name}.legacy-{uuid.uuid4().hex}"
+            os.replace(target, parent / previous)
+        link = parent / f".link-{uuid.uuid4().hex}"
+        os.symlink(version.name, link)
+        os.replace(link, target)
+
+        for path in parent.glob(f"{target.name}.*"):
+            if path.name not in (version.name, previous) and path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+def artifact_path(chatbot_id, meta_id, root: str = None) -> Path:
+    """
+    Returns the directory holding the artifact for a chatbot and testset.
+
+    Parameters
+    ----------
+    chatbot_id : UUID or str
+        Identifier of the chatbot.
+    meta_id : UUID or str
+        Identifier of the testset (MetaDataset) the index was trained on.
+    root : str, optional
+        Artifact root directory. Defaults to `INDEX_DIR`.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the versioned artifact directory.
+    """
+    return Path(root or INDEX_DIR) / str(chatbot_id) / str(meta_id) / f"v{FORMAT_VERSION}"
+
+
+def save_artifact(chatbot_id, meta_id, index, answers, row_ids, embedding_model: str,
+                  index_config: str = None, root: str = None) -> Path:
+    """
+    Persists a FAISS index and its answers, replacing any previous artifact.
+
+    Parameters
+    ----------
+    chatbot_id : UUID or str
+        Identifier of the chatbot.
+    meta_id : UUID or str
+        Identifier of the testset the index was trained on.
+    index : faiss.Index
+        Trained index; position `i` must correspond to `answers[i]`.
+    answers : AnswerStore or sequence of str
+        Answer for each index position.
+    row_ids : sequence of str
+        Dataset row id for each index position, used for incremental updates.
+    embedding_model : str
+        Identity of the embedding model that produced the vectors.
+    index_config : str, optional
+        Index type the chatbot was trained with, possibly "auto". Full
+        retrains reuse it, while the built type is recorded as "index_type".
+    root : str, optional
+        Artifact root directory. Defaults to `INDEX_DIR`.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the written artifact directory.
+    """
+    target = artifact_path(chatbot_id, meta_id, root)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=target.parent))
+    try:
+        faiss.write_index(index, str(staging / "index.faiss"))
+        if not isinstance(answers, AnswerStore):
+            answers = AnswerStore.build(answers)
+        answers.save(staging)
+        MappedStrings.write(staging, "row_ids", [str(row_id) for row_id in row_ids])
+        content_hash = hashlib.blake2b(digest_size=16)
+        for name in _SERVED_FILES:
+            if (staging / name).exists():
+                with open(staging / name, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        content_hash.update(block)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "chatbot_id": str(chatbot_id),
+            "meta_id": str(meta_id),
+            "rows": int(index.ntotal),
+            "dimension": int(index.d),
+            "index_type": index_type_of(index),
+            "index_config": index_config,
+            "embedding_model": embedding_model,
+            "content_hash": content_hash.hexdigest(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        publish_directory(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(
+        "[ARTIFACT] Saved %d vectors for chatbot %s to %s.", index.ntotal, chatbot_id, target
+    )
+    return target
+
+
+def read_manifest(chatbot_id, meta_id, root: str = None):
+    """
+    Returns the manifest of a persisted artifact, or None if there is none.
+
+    Parameters
+    ----------
+    chatbot_id : UUID or str
+        Identifier of the chatbot.
+    meta_id : UUID or str
+        Identifier of the testset the index was trained on.
+    root : str, optional
+        Artifact root directory. Defaults to `INDEX_DIR`.
+    """
+    return _read_manifest_file(artifact_path(chatbot_id, meta_id, root))
+
+
+def _read_manifest_file(directory: Path):
+    """Returns the manifest in `directory`, or None if there is none."""
+    manifest_file = directory / "manifest.json"
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _open_version(source: Path, mmap: bool):
+    """Opens the artifact version directory `source`; see `load_artifact`."""
+    manifest = _read_manifest_file(source)
+    if manifest is None:
+        raise FileNotFoundError(f"No index artifact at {source}")
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise FileNotFoundError(
+            f"Index artifact at {source} has format {manifest.get('format_version')}, "
+            f"expected {FORMAT_VERSION}"
+        )
+
+    flags = 0
+    if mmap:
+        flags = IVF_MMAP_FLAGS if manifest.get("index_type") in IVF_TYPES else MMAP_FLAGS
+    index = faiss.read_index(str(source / "index.faiss"), flags)
+    answers = AnswerStore.open(source, mmap=mmap)
+    row_ids = MappedStrings.open(source, "row_ids", mmap=mmap)
+    if not mmap:
+        row_ids = list(row_ids)
+    return index, answers, row_ids, manifest
+
+
+def load_artifact(chatbot_id, meta_id, mmap: bool = True, root: str = None):
+    """
+    Opens a persisted artifact.
+
+    Parameters
+    ----------
+    chatbot_id : UUID or str
+        Identifier of the chatbot.
+    meta_id : UUID or str
+        Identifier of the testset the index was trained on.
+    mmap : bool, optional
+        If True (default), the index and the answer and row id tables are
+        memory-mapped read-only so several workers share their pages. Use
+        False to load copies that can be modified.
+    root : str, optional
+        Artifact root directory. Defaults to `INDEX_DIR`.
+
+    Returns
+    -------
+    tuple
+        `(index, answers, row_ids, manifest)`. The answers are an
+        `AnswerStore`. The row ids are a read-only `MappedStrings` when
+        mapped, a plain list otherwise.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no artifact of the current format version exists.
+    """
+    target = artifact_path(chatbot_id, meta_id, root)
+    for attempt in range(OPEN_ATTEMPTS):
+        # Resolved once per attempt, so every file comes from the same version.
+        source = target.resolve()
+        try:
+            index, answers, row_ids, manifest = _open_version(source, mmap)
+            break
+        except (OSError, RuntimeError):
+            # A version retired while it was being opened: retry on the one now published.
+            if attempt == OPEN_ATTEMPTS - 1 or target.resolve() == source:
+                raise
+
+    logger.info(
+        "[ARTIFACT] Opened %d vectors for chatbot %s (mmap=%s).", index.ntotal, chatbot_id, mmap
+    )
+    return index, answers, row_ids, manifest
@@ -0,0 +1,317 @@
+"""
+FAISS index types for chatbot engines.
+
+Exact (flat) search scans every vector, so query cost grows linearly with
+the testset and every vector is held as float32. Large testsets can use an
+approximate index instead:
+
+    flat     exact search over float32 vectors
+    sq8      exact scan over 8-bit scalar-quantized vectors (4x smaller)
+    hnsw     HNSW graph over float32 vectors (fast queries, larger index)
+    ivf      inverted lists over float32 vectors
+    ivfsq8   inverted lists over 8-bit scalar-quantized vectors
+    ivfpq    inverted lists over product-quantized vectors (smallest)
+
+"auto" picks by testset size: flat up to `INDEX_FLAT_MAX_ROWS`, HNSW up to
+`INDEX_HNSW_MAX_ROWS`, scalar-quantized IVF beyond. `index_report` measures
+recall and latency of each type against exact search on a chatbot's own
+vectors, so the choice can rest on evidence.
+
+Functions
+---------
+resolve_index_type
+    Turns a requested type ("auto" or None included) into a concrete one.
+build_index
+    Builds, trains and fills an index of a given type.
+tune_index
+    Applies the configured search parameters (nprobe, efSearch).
+index_type_of
+    Returns the type name of an existing index.
+supports_removal
+    Whether vectors can be removed from an index in place.
+index_bytes
+    Estimates the memory held by an index.
+index_report
+    Compares index types against exact search.
+"""
+import math
+import time
+
+import faiss
+import numpy as np
+
+from chat_core.config import (
+    INDEX_TYPE, INDEX_FLAT_MAX_ROWS, INDEX_HNSW_MAX_ROWS, INDEX_HNSW_M, INDEX_EF_SEARCH,
+    INDEX_NPROBE
+)
+from chat_core.evaluation import latency_summary
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+AUTO = "auto"
+INDEX_TYPES = ("flat", "sq8", "hnsw", "ivf", "ivfsq8", "ivfpq")
+IVF_TYPES = ("ivf", "ivfsq8", "ivfpq")
+
+# Inverted-list indexes need enough vectors to train their clusters (and PQ
+# its 256 codes per sub-vector); smaller testsets fall back to flat search,
+# which is fast at that size anyway.
+MIN_TRAINING_ROWS = {"ivf": 1000, "ivfsq8": 1000, "ivfpq": 10000}
+# Vectors sampled to train IVF centroids and quantizers, per list.
+TRAIN_POINTS_PER_LIST = 64
+
+# Only 8-bit scalar quantizers are built here, so the class identifies the type.
+_CLASS_TYPES = {
+    "IndexFlat": "flat",
+    "IndexFlatL2": "flat",
+    "IndexScalarQuantizer": "sq8",
+    "IndexHNSWFlat": "hnsw",
+    "IndexIVFFlat": "ivf",
+    "IndexIVFScalarQuantizer": "ivfsq8",
+    "IndexIVFPQ": "ivfpq",
+}
+
+
+def resolve_index_type(index_type: str, rows: int) -> str:
+    """
+    Returns the concrete index type to build for `rows` vectors.
+
+    Parameters
+    ----------
+    index_type : str or None
+        A name from `INDEX_TYPES`, "auto", or None for the configured default.
+    rows : int
+        Number of vectors to index.
+
+    Raises
+    ------
+    ValueError
+        If `index_type` is not a known type.
+    """
+    index_type = (index_type or INDEX_TYPE).lower()
+    if index_type == AUTO:
+        if rows <= INDEX_FLAT_MAX_ROWS:
+            return "flat"
+        return "hnsw" if rows <= INDEX_HNSW_MAX_ROWS else "ivfsq8"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index type {index_type!r}; expected {AUTO!r} or one of {INDEX_TYPES}"
+        )
+    if rows < MIN_TRAINING_ROWS.get(index_type, 0):
+        logger.info("[INDEX] %d rows are too few for %s; using flat search.", rows, index_type)
+        return "flat"
+    return index_type
+
+
+def _nlist(rows: int) -> int:
+    """Number of inverted lists: about 4 * sqrt(rows), with enough rows to train each."""
+    return max(1, min(int(4 * math.sqrt(rows)), rows // 39))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """PQ sub-vectors: the largest divisor of `dimension` up to dimension / 16 (one byte each)."""
+    limit = max(1, dimension // 16)
+    return max(m for m in range(1, limit + 1) if dimension % m == 0)
+
+
+def _factory_string(index_type: str, rows: int, dimension: int) -> str:
+    """Returns the `faiss.index_factory` description of an index type."""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "hnsw":
+        return f"HNSW{INDEX_HNSW_M}"
+    nlist = _nlist(rows)
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivfsq8":
+        return f"IVF{nlist},SQ8"
+    return f"IVF{nlist},PQ{_pq_subquantizers(dimension)}"
+
+
+def build_index(vectors: np.ndarray, index_type: str = None, seed: int = 0):
+    """
+    Builds an index of the requested type over `vectors`.
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        float32 matrix, one row per indexed question. Row `i` becomes index
+        position `i` for every type.
+    index_type : str, optional
+        A name from `INDEX_TYPES`, "auto", or None for the configured default.
+    seed : int, optional
+        Seed of the training sample for IVF types.
+
+    Returns
+    -------
+    faiss.Index
+        Trained index holding all vectors, tuned with `tune_index`.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rows, dimension = vectors.shape
+    index_type = resolve_index_type(index_type, rows)
+    factory = _factory_string(index_type, rows, dimension)
+    index = faiss.index_factory(dimension, factory, faiss.METRIC_L2)
+    if not index.is_trained:
+        sample = vectors
+        limit = TRAIN_POINTS_PER_LIST * getattr(faiss.try_extract_index_ivf(index), "nlist", 1)
+        if rows > limit:
+            sample = vectors[np.random.default_rng(seed).choice(rows, limit, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return tune_index(index)
+
+
+def tune_index(index):
+    """
+    Applies the configured search parameters and returns the index.
+
+    IVF indexes scan `INDEX_NPROBE` lists per query and HNSW indexes explore
+    `INDEX_EF_SEARCH` candidates. Other index types are returned unchanged.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(INDEX_NPROBE, ivf.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = INDEX_EF_SEARCH
+    return index
+
+
+def index_type_of(index) -> str:
+    """Returns the `INDEX_TYPES` name of an index, or its class name if it is not one of them."""
+    name = type(index).__name__
+    return _CLASS_TYPES.get(name, name)
+
+
+def supports_removal(index) -> bool:
+    """
+    Whether `index.remove_ids` compacts the index and keeps the order of the remaining vectors.
+
+    Position `i` of the engine's index must stay aligned with `answers[i]`, so
+    only flat-code indexes (flat and sq8) can be updated with removals in place.
+    """
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def index_bytes(index) -> int:
+    """
+    Estimates the bytes held by an index: vector codes, ids and graph links.
+    """
+    if index is None:
+        return 0
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Codes and 64-bit ids in the inverted lists, plus the coarse centroids.
+        return index.ntotal * (ivf.code_size + 8) + ivf.nlist * index.d * 4
+    if hasattr(index, "hnsw"):
+        storage = faiss.downcast_index(index.storage)
+        return index_bytes(storage) + index.hnsw.neighbors.size() * 4 + index.ntotal * 16
+    return index.ntotal * getattr(index, "code_size", index.d * 4)
+
+
+def _search_neighbours(index, vectors: np.ndarray, sample: np.ndarray, k: int):
+    """
+    Searches the sampled rows one at a time, as chat requests do.
+
+    Each query is an indexed vector, so its own position is dropped from the
+    results and the `k` nearest other questions are kept (-1 pads short lists).
+
+    Returns
+    -------
+    tuple
+        `(positions, latencies_ms)`.
+    """
+    positions = np.full((len(sample), k), -1, dtype=np.int64)
+    latencies = np.empty(len(sample), dtype=np.float64)
+    for i, row in enumerate(sample):
+        start = time.perf_counter()
+        _, found = index.search(vectors[row:row + 1], k + 1)
+        latencies[i] = (time.perf_counter() - start) * 1000
+        others = found[0][(found[0] != row) & (found[0] != -1)][:k]
+        positions[i, :len(others)] = others
+    return positions, latencies
+
+
+def index_report(vectors: np.ndarray, index_types=None, k: int = 10, queries: int = 1000,
+                 seed: int = 0) -> dict:
+    """
+    Compares index types against exact search on the given vectors.
+
+    Queries are a random sample of the indexed vectors themselves (the
+    chatbot's own questions), so the report reflects the data the chatbot
+    actually serves. Each query's own entry is left out of the results, so
+    recall measures how well an index finds the *other* nearest questions,
+    i.e. how it would answer a close paraphrase. Each index is searched one
+    query at a time.
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        float32 matrix of the indexed questions.
+    index_types : list of str, optional
+        Types to compare. Defaults to all of `INDEX_TYPES`.
+    k : int, optional
+        Neighbours compared per query.
+    queries : int, optional
+        Number of sampled queries.
+    seed : int, optional
+        Seed of the query sample and the IVF training sample.
+
+    Returns
+    -------
+    dict
+        {
+            "rows": int, "dimension": int, "k": int, "queries": int,
+            "default": index type "auto" picks for this size,
+            "indexes": {
+                "<type>": {
+                    "built_as": type actually built (small testsets fall back to flat),
+                    "build_s": seconds to build,
+                    "bytes": estimated memory,
+                    "recall_at_k": share of the exact top-k neighbours found,
+                    "top1_agreement": share of queries whose nearest neighbour
+                                      matches exact search,
+                    "latency_ms": {"p50", "p95", "p99", "mean"}
+                }
+            }
+        }
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rows, dimension = vectors.shape
+    k = max(1, min(k, rows - 1))
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(rows, min(queries, rows), replace=False)
+
+    start = time.perf_counter()
+    exact = build_index(vectors, "flat")
+    exact_seconds = time.perf_counter() - start
+    truth, _ = _search_neighbours(exact, vectors, sample, k)
+
+    report = {
+        "rows": rows,
+        "dimension": dimension,
+        "k": k,
+        "queries": len(sample),
+        "default": resolve_index_type(AUTO, rows),
+        "indexes": {},
+    }
+    for index_type in index_types or INDEX_TYPES:
+        if index_type == "flat":
+            index, build_seconds = exact, exact_seconds
+        else:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, seed=seed)
+            build_seconds = time.perf_counter() - start
+        found, latencies = _search_neighbours(index, vectors, sample, k)
+        recall = np.mean([len(np.intersect1d(a[a != -1], b)) / k for a, b in zip(found, truth)])
+        report["indexes"][index_type] = {
+            "built_as": index_type_of(index),
+            "build_s": round(build_seconds, 4),
+            "bytes": index_bytes(index),
+            "recall_at_k": round(float(recall), 4),
+            "top1_agreement": round(float(np.mean(found[:, 0] == truth[:, 0])), 4),
+            "latency_ms": latency_summary(latencies),
+        }
+    return report
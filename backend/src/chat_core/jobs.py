@@ -0,0 +1,220 @@
+"""
+In-process background jobs.
+
+Training a chatbot loads and embeds a whole testset, which takes far longer
+than a request should. Routes submit that work to a bounded thread pool and
+return a job id immediately; clients poll the job for its progress counters
+(e.g. rows loaded, rows embedded), per-stage timings and final result.
+
+Jobs live in the memory of the worker that accepted them and only the most
+recent ones are retained.
+
+Classes
+-------
+Job
+    State, progress and stage timings of one background task.
+JobManager
+    Bounded executor that runs jobs and keeps their history.
+"""
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+
+class Job:
+    """
+    Tracks one background task.
+
+    Attributes
+    ----------
+    id : str
+        Unique job id.
+    kind : str
+        What the job does (e.g. "train").
+    key : str or None
+        Resource the job works on (e.g. a chatbot id). Only one unfinished job
+        per key is allowed.
+    status : str
+        One of "queued", "running", "succeeded" or "failed".
+    progress : dict
+        Counters reported by the task, e.g. `rows_loaded`, `rows_embedded`.
+    stages : dict
+        Seconds spent in each named stage of the task.
+    result : dict or None
+        Value returned by the task once it succeeded.
+    error : str or None
+        Failure reason once it failed.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, kind: str, key: str = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.status = Job.QUEUED
+        self.progress = {}
+        self.stages = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """True once the job succeeded or failed."""
+        return self.status in (Job.SUCCEEDED, Job.FAILED)
+
+    def update(self, **counters):
+        """Sets progress counters, e.g. `job.update(rows_embedded=500)`."""
+        with self._lock:
+            self.progress.update(counters)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times a stage of the task and records it under `stages[name]`.
+
+        Repeated stages with the same name accumulate.
+        """
+        with self._lock:
+            self.progress["stage"] = name
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 4)
+
+    def track(self, iterable, stage: str, counter: str):
+        """
+        Wraps an iterable of chunks, timing each fetch under `stage` and
+        counting the items of every chunk in `progress[counter]`.
+        """
+        total = 0
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage):
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            total += len(chunk)
+            self.update(**{counter: total})
+            yield chunk
+
+    def to_dict(self) -> dict:
+        """
+        Returns a JSON-serializable snapshot of the job.
+        """
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "key": self.key,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "stages": dict(self.stages),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps the most recent ones.
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of jobs that run concurrently; further jobs queue.
+    max_retained : int
+        Number of jobs kept for status queries. The oldest finished jobs are
+        forgotten first.
+    """
+
+    def __init__(self, max_workers: int, max_retained: int = 500):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        self.max_retained = max_retained
+
+    def submit(self, kind: str, task, *args, key: str = None, **kwargs) -> Job:
+        """
+        Queues `task(job, *args, **kwargs)` and returns its job immediately.
+
+        The task reports progress through the `Job` it receives and returns
+        a JSON-serializable result. Any exception marks the job as failed.
+
+        Raises
+        ------
+        RuntimeError
+            If an unfinished job already exists for `key`. Its id is the
+            second argument of the exception.
+        """
+        job = Job(kind, key)
+        with self._lock:
+            if key is not None:
+                running = self._active.get(key)
+                if running is not None and not running.done:
+                    raise RuntimeError(
+                        f"A {running.kind} job is already running for {key}", running.id
+                    )
+                self._active[key] = job
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, task, args, kwargs)
+        logger.info("[JOB] Queued %s job %s for %s.", kind, job.id, key)
+        return job
+
+    def get(self, job_id: str):
+        """Returns the job with this id, or None if unknown or forgotten."""
+        with self._lock:
+            return self._jobs.get(str(job_id))
+
+    def shutdown(self, wait: bool = True):
+        """Stops accepting jobs and optionally waits for running ones."""
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, task, args, kwargs):
+        job.status = Job.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            job.result = task(job, *args, **kwargs)
+            job.status = Job.SUCCEEDED
+            logger.info("[JOB] %s job %s succeeded in %s.", job.kind, job.id, job.stages)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = Job.FAILED
+            logger.error(
+                "[JOB] %s job %s failed: %s\n%s", job.kind, job.id, e, traceback.format_exc()
+            )
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            with self._lock:
+                if job.key is not None and self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def _trim(self):
+        """Forgets the oldest finished jobs beyond `max_retained`. Caller holds the lock."""
+        excess = len(self._jobs) - self.max_retained
+        for job_id in [jid for jid, job in self._jobs.items() if job.done][:max(excess, 0)]:
+            del self._jobs[job_id]
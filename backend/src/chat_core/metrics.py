@@ -0,0 +1,343 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Routes, `Storage` methods and `ChatbotEngine` stages are timed into latency
+histograms. `GET /api/metrics` renders them with the request counters for
+Prometheus to scrape. Each worker process keeps its own metrics.
+
+Timings taken while a request is handled are also summed per stage for that
+request and sent back in a `Server-Timing` header, for example
+`db.fetch;dur=3.1, engine.respond;dur=0.9, total;dur=5.2`. This splits slow
+requests between the database and the engine without any external tooling.
+Only top-level stages are summed: a stage timed inside another (e.g.
+`db.bulk_insert` inside `db.insert`) is part of its parent's duration, so
+the entries never add up to more than the total.
+
+A streamed response sends its headers before its body is produced, so its
+header only covers the work done until then. Its request is recorded when
+the stream ends, and the route can report the streamed work itself with
+`collect` and `server_timing`.
+
+Classes
+-------
+Counter
+    Monotonic counter with labels.
+Gauge
+    Value that is set rather than accumulated, with labels.
+Histogram
+    Cumulative-bucket latency histogram with labels.
+
+Functions
+---------
+timer
+    Context manager that times a stage into `chat_stage_duration_seconds`.
+timed
+    Decorator form of `timer`.
+start_request, finish_request
+    Begin and end per-request Server-Timing collection.
+stop_request, collect
+    Stop collecting a request's stage timings, and collect them elsewhere.
+server_timing
+    Formats stage timings as a Server-Timing header value.
+render
+    Returns every metric in the Prometheus text format.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; covers sub-millisecond cache hits up to slow training stages.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_METRICS = []
+_request_timings = ContextVar("request_timings", default=None)
+_stage_depth = ContextVar("stage_depth", default=0)
+
+
+def _escape(value) -> str:
+    """Escapes a label value for the exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values) -> str:
+    """Formats label names and values as `{name="value",...}`."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Thread-safe monotonic counter.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    documentation : str
+        Help text.
+    labels : tuple of str, optional
+        Label names; `inc` takes their values in the same order.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def inc(self, *label_values, amount: float = 1.0):
+        """Adds `amount` to the series with these label values."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        """Returns the metric's exposition lines."""
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in values]
+        return lines
+
+
+class Gauge:
+    """
+    Thread-safe gauge: the last value set for each label combination.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    documentation : str
+        Help text.
+    labels : tuple of str, optional
+        Label names; `set` takes their values in the same order.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def set(self, value: float, *label_values):
+        """Sets the series with these label values to `value`."""
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> list:
+        """Returns the metric's exposition lines."""
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """
+    Thread-safe histogram with cumulative buckets, as Prometheus expects.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    documentation : str
+        Help text.
+    labels : tuple of str, optional
+        Label names; `observe` takes their values in the same order.
+    buckets : tuple of float, optional
+        Upper bounds of the buckets, ascending. `+Inf` is added.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def observe(self, value: float, *label_values):
+        """Records one observation for the series with these label values."""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        """Returns the metric's exposition lines."""
+        with self._lock:
+            series = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._series.items()
+            )
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labels + ("le",), key + (repr(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+HTTP_REQUESTS = Counter(
+    "chat_http_requests_total",
+    "HTTP requests handled, by route and status.",
+    ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "chat_http_request_duration_seconds",
+    "Time to handle an HTTP request, by route.",
+    ("method", "route")
+)
+STARTUP_SECONDS = Gauge(
+    "chat_startup_seconds",
+    "Time spent creating the app, by phase (import, preload, total).",
+    ("phase",)
+)
+STAGE_LATENCY = Histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in database calls and engine stages (load, embed, index, search).",
+    ("stage",)
+)
+
+
+@contextmanager
+def timer(stage: str):
+    """
+    Times a block into `chat_stage_duration_seconds{stage=...}`.
+
+    If a request is being handled and the block is not nested in another
+    timed stage, the time is also added to its Server-Timing entry for
+    `stage`.
+    """
+    depth = _stage_depth.get()
+    token = _stage_depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _stage_depth.reset(token)
+        STAGE_LATENCY.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None and depth == 0:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed(stage: str):
+    """Decorator that runs the function inside `timer(stage)`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request():
+    """Starts collecting stage timings for the current request."""
+    _request_timings.set({})
+
+
+def stop_request():
+    """Stops collecting stage timings for the current request and returns them, None outside one."""
+    timings = _request_timings.get()
+    _request_timings.set(None)
+    return timings
+
+
+@contextmanager
+def collect(timings: dict):
+    """
+    Adds the top-level stages timed in the block to `timings`.
+
+    Used by streamed responses, whose body is produced after the request
+    has finished and its header was sent.
+    """
+    token = _request_timings.set(timings)
+    depth = _stage_depth.set(0)
+    try:
+        yield
+    finally:
+        _stage_depth.reset(depth)
+        _request_timings.reset(token)
+
+
+def server_timing(timings: dict, seconds: float) -> str:
+    """Returns a Server-Timing header value for stage timings and a total, in seconds."""
+    entries = [
+        f"{stage};dur={elapsed * 1000:.3f}" for stage, elapsed in sorted((timings or {}).items())
+    ]
+    entries.append(f"total;dur={seconds * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def finish_request(method: str, route: str, status: int, seconds: float,
+                   timings: dict = None) -> str:
+    """
+    Records a finished request and returns its Server-Timing header value.
+
+    Parameters
+    ----------
+    method, route : str
+        Request method and matched route rule.
+    status : int
+        Response status code.
+    seconds : float
+        Time taken to handle the request.
+    timings : dict, optional
+        Stage timings to report. Defaults to those collected for the
+        current request, which stops collecting.
+    """
+    if timings is None:
+        timings = stop_request()
+    HTTP_REQUESTS.inc(method, route, status)
+    HTTP_LATENCY.observe(seconds, method, route)
+    return server_timing(timings, seconds)
+
+
+def render(gauges: dict = None, counters: dict = None) -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    Parameters
+    ----------
+    gauges : dict, optional
+        Additional gauges as `{name: (documentation, value)}`, e.g. the
+        engine registry state.
+    counters : dict, optional
+        Additional counters in the same form, for totals kept elsewhere
+        (e.g. registry hits). Their names should end in `_total`.
+    """
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    for kind, values in (("gauge", gauges), ("counter", counters)):
+        for name, (documentation, value) in (values or {}).items():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,212 @@
+"""
+Process-wide registry of trained chatbot engines.
+
+Deployed chatbots are served from trained `ChatbotEngine` instances. Building
+one means embedding the whole testset and creating a FAISS index, so engines
+are kept in memory between requests and shared by every request handled in
+the worker. The registry bounds the estimated memory held by engines and
+evicts the least recently used ones once the budget is exceeded. Engines that
+are not loaded ("cold" chatbots) are built on first use through a loader
+callback.
+
+Memory held outside the engines but freed by dropping them, such as the
+shared index of chatbots served in shared mode, is counted against the same
+budget. Dropped engines are closed so they can release it.
+
+Classes
+-------
+EngineRegistry
+    Thread-safe LRU cache of engines keyed by chatbot id.
+"""
+import threading
+from collections import OrderedDict
+
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+
+class EngineRegistry:
+    """
+    Thread-safe LRU registry of trained engines with a memory budget.
+
+    Parameters
+    ----------
+    loader : callable
+        Called as `loader(chatbot_id)` to build an engine for a cold chatbot.
+        Should raise `LookupError` when the chatbot cannot be served.
+    memory_budget : int
+        Maximum estimated bytes held by loaded engines. The most recently
+        used engine is always kept, even if it alone exceeds the budget.
+    max_engines : int, optional
+        Maximum number of loaded engines. 0 (default) means no count limit.
+    external_bytes : callable, optional
+        Returns the bytes held on behalf of loaded engines outside their own
+        footprint (e.g. shared indexes), counted against the budget.
+    """
+
+    def __init__(self, loader, memory_budget: int, max_engines: int = 0, external_bytes=None):
+        self._loader = loader
+        self.memory_budget = memory_budget
+        self.max_engines = max_engines
+        self._external_bytes = external_bytes or (lambda: 0)
+        self._engines = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, chatbot_id):
+        """
+        Returns the engine for a chatbot, loading it on first use.
+
+        Concurrent requests for the same cold chatbot wait for a single load
+        instead of each building their own engine.
+
+        Parameters
+        ----------
+        chatbot_id : UUID or str
+            Identifier of the chatbot.
+
+        Returns
+        -------
+        ChatbotEngine
+            The trained engine.
+
+        Raises
+        ------
+        LookupError
+            If the loader cannot provide an engine for this chatbot.
+        """
+        key = str(chatbot_id)
+        with self._lock:
+            engine = self._touch(key)
+            if engine is not None:
+                self.hits += 1
+                return engine
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another request may have finished loading while we waited.
+            with self._lock:
+                engine = self._touch(key)
+                if engine is not None:
+                    self.hits += 1
+                    return engine
+                self.misses += 1
+            try:
+                engine = self._loader(chatbot_id)
+                self.put(key, engine)
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+        return engine
+
+    def put(self, chatbot_id, engine):
+        """
+        Registers (or replaces) the engine for a chatbot and enforces the budget.
+
+        Parameters
+        ----------
+        chatbot_id : UUID or str
+            Identifier of the chatbot.
+        engine : ChatbotEngine
+            Trained engine to serve for this chatbot.
+        """
+        key = str(chatbot_id)
+        size = engine.memory_footprint()
+        with self._lock:
+            previous = self._engines.get(key)
+            self._engines[key] = engine
+            self._engines.move_to_end(key)
+            self._sizes[key] = size
+            if previous is not None and previous is not engine:
+                previous.close()
+            self._enforce_budget()
+        logger.info("[REGISTRY] Loaded engine for chatbot %s (~%d bytes).", key, size)
+
+    def evict(self, chatbot_id) -> bool:
+        """
+        Drops the engine for a chatbot, e.g. after it was retrained or retired.
+
+        Returns
+        -------
+        bool
+            True if an engine was loaded for this chatbot.
+        """
+        key = str(chatbot_id)
+        with self._lock:
+            self._sizes.pop(key, None)
+            engine = self._engines.pop(key, None)
+            if engine is not None:
+                engine.close()
+            return engine is not None
+
+    def clear(self):
+        """Drops every loaded engine."""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.close()
+            self._engines.clear()
+            self._sizes.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the registry state for monitoring.
+
+        Returns
+        -------
+        dict
+            Loaded engine count, estimated bytes in use (engines plus shared
+            memory, which is also reported as `external_bytes`), the budget
+            and hit/miss/eviction counters.
+        """
+        with self._lock:
+            external = self._external_bytes()
+            return {
+                "loaded": len(self._engines),
+                "bytes": sum(self._sizes.values()) + external,
+                "external_bytes": external,
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def engine_stats(self) -> dict:
+        """
+        Returns the query cache counters of every loaded engine, by chatbot id.
+        """
+        with self._lock:
+            engines = list(self._engines.items())
+        return {key: engine.cache_stats() for key, engine in engines}
+
+    def __contains__(self, chatbot_id) -> bool:
+        with self._lock:
+            return str(chatbot_id) in self._engines
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._engines)
+
+    def _touch(self, key):
+        """Returns the engine for `key` and marks it most recently used. Caller holds the lock."""
+        engine = self._engines.get(key)
+        if engine is not None:
+            self._engines.move_to_end(key)
+        return engine
+
+    def _enforce_budget(self):
+        """Evicts least recently used engines until within budget. Caller holds the lock."""
+        while len(self._engines) > 1 and (
+            sum(self._sizes.values()) + self._external_bytes() > self.memory_budget
+            or (self.max_engines and len(self._engines) > self.max_engines)
+        ):
+            key, engine = self._engines.popitem(last=False)
+            size = self._sizes.pop(key, 0)
+            # Closing may free shared memory, which the next check sees.
+            engine.close()
+            self.evictions += 1
+            logger.info("[REGISTRY] Evicted engine for chatbot %s (~%d bytes).", key, size)
@@ -3,27 +3,413 @@ Routes for Chatbot API.
 
 Includes endpoints to:
 - Create a chatbot based on a testset (MetaDataset)
-- List existing chatbots
-- Train a chatbot (mark as trained with a dataset)
+- List existing chatbots, filtered and paginated, with conditional GET
+- Train a chatbot in the background (mark as trained with a dataset)
+- Compare FAISS index types on a chatbot's testset (recall/latency report)
+- Evaluate how well a trained chatbot retrieves its own testset (accuracy/MRR report)
+- Export a testset to a columnar snapshot that training reads instead of the database
+- Poll the progress of a background job
 - Deploy a chatbot (mark as active with a URL)
+- Chat with a deployed chatbot, one message or a streamed batch
+- Run red-team campaigns against deployed chatbots and read their reports
+- Expose Prometheus metrics; every response carries a Server-Timing header
+
+Importing this module does not touch the database or load the retrieval
+stack: storage is opened by `get_storage` on first use, and the engine, FAISS
+and embedding modules are reached through `_LazyModule` handles that import
+them on first attribute access. Worker boot and test collection therefore
+stay fast and work without a database. pandas and numpy are imported eagerly:
+`chat_core.database` already loads them (about 0.4 s of the 1 s it takes
+to import this module), so deferring them here would save nothing.
 """
+import base64
+import hashlib
+import importlib
+import json
+import time
 import uuid
 from datetime import datetime, timezone
 from urllib.parse import urljoin
 
+import numpy as np
 import pandas as pd
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response, g
 
-from chat_core.database import Storage
-from chat_core.database.models import Chatbots, StatusEnum
-from chat_core.database.fetch import get_full_dataset_by_meta_id
-from core.commons.config import PG_CONFIG
+from chat_core import metrics
+from chat_core.campaign import CampaignRunner
+from chat_core.config import (
+    ENGINE_MEMORY_BUDGET_BYTES, ENGINE_MAX_LOADED, TRAINING_WORKERS, JOB_HISTORY,
+    CHAT_BATCH_SIZE, CHAT_BATCH_MAX_QUERIES, CHATBOT_PAGE_MAX, CAMPAIGN_WORKERS,
+    CAMPAIGN_RATE_LIMIT, SHARED_INDEX, SNAPSHOT_DIR
+)
+from chat_core.database import get_storage
+from chat_core.database.models import Campaign, Chatbots, StatusEnum
+from chat_core.database.fetch import get_chatbots_version
+from chat_core.jobs import JobManager
+from chat_core.registry import EngineRegistry
 from core.commons.log_config import get_logger
 
 logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
 
+
+class _LazyModule:
+    """
+    Handle on a module that is imported on first attribute access.
+
+    Parameters
+    ----------
+    name : str
+        Absolute name of the module.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+_chatbot = _LazyModule("chat_core.chatbot")
+_embeddings = _LazyModule("chat_core.embeddings")
+_evaluation = _LazyModule("chat_core.evaluation")
+_index_store = _LazyModule("chat_core.index_store")
+_indexes = _LazyModule("chat_core.indexes")
+_shared_index = _LazyModule("chat_core.shared_index")
+_snapshots = _LazyModule("chat_core.snapshots")
+
 chatbot_api = Blueprint("chatbot_api", __name__)
-chatbot_storage = Storage(PG_CONFIG)
+
+
+@chatbot_api.before_request
+def _start_timing():
+    """Starts timing the request and collecting its stage timings."""
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+
+@chatbot_api.after_request
+def _finish_timing(response):
+    """
+    Records request metrics and adds the `Server-Timing` header.
+
+    A streamed response's header only covers the work done before its body
+    is produced; the request is recorded, with its full duration, once the
+    stream has been sent.
+    """
+    started = g.pop("request_started", None)
+    if started is not None:
+        method, status = request.method, response.status_code
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        if response.is_streamed:
+            timings = metrics.stop_request()
+            response.headers["Server-Timing"] = metrics.server_timing(
+                timings, time.perf_counter() - started
+            )
+            response.call_on_close(lambda: metrics.finish_request(
+                method, route, status, time.perf_counter() - started, timings
+            ))
+        else:
+            response.headers["Server-Timing"] = metrics.finish_request(
+                method, route, status, time.perf_counter() - started
+            )
+    return response
+
+
+def _open_engine(chatbot):
+    """
+    Opens a chatbot's persisted engine: on the shared index in shared mode
+    (if its index is flat), as a dedicated memory-mapped engine otherwise.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no usable artifact exists.
+    """
+    if SHARED_INDEX:
+        engine = _shared_index.load_shared_engine(chatbot.id, chatbot.meta_dataset_id)
+        if engine is not None:
+            return engine
+    return _chatbot.ChatbotEngine.load(chatbot.id, chatbot.meta_dataset_id)
+
+
+def _load_engine(chatbot_id):
+    """
+    Opens the engine of a deployed chatbot on its first chat request.
+
+    A chatbot without a usable artifact (e.g. trained before indexes were
+    persisted) is not retrained here: a background training job rebuilds it,
+    and requests are turned away until it has finished.
+
+    Raises
+    ------
+    LookupError
+        If the chatbot does not exist, is not deployed, or has no testset.
+    RuntimeError
+        If the chatbot's index is being rebuilt. The id of the training job
+        is the second argument of the exception.
+    """
+    results = get_storage().fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
+    if not results or results[0].status != StatusEnum.ACTIVE:
+        raise LookupError("Chatbot not found or not deployed")
+    chatbot = results[0]
+    if not chatbot.meta_dataset_id:
+        raise LookupError("Chatbot has no testset to answer from")
+
+    try:
+        engine = _open_engine(chatbot)
+    except FileNotFoundError as e:
+        logger.warning("No index artifact for chatbot '%s' (%s). Retraining.", chatbot.name, e)
+        try:
+            job = job_manager.submit(
+                "train", _run_training, chatbot, chatbot.meta_dataset_id, False,
+                key=str(chatbot.id)
+            )
+        except RuntimeError as running:
+            raise RuntimeError("Chatbot is being trained", running.args[1]) from e
+        raise RuntimeError("Chatbot index is being rebuilt", job.id) from e
+    logger.info("Loaded chatbot '%s' with %d rows.", chatbot.name, engine.index.ntotal)
+    return engine
+
+
+def preload_engines() -> int:
+    """
+    Opens the persisted engines of all deployed chatbots into the registry.
+
+    Meant for pre-fork servers: run once in the master process (e.g. from
+    `create_app` under `gunicorn --preload`) so every forked worker inherits
+    the registry. Indexes and answer tables are memory-mapped read-only, so
+    the workers share one copy of each chatbot's pages instead of loading
+    their own. Only artifacts are opened: a chatbot without one is skipped
+    and retrained in the background when a worker is first asked for it.
+    Database connections opened here are discarded afterwards so that
+    workers do not share sockets; the embedding cache and model reconnect
+    on their own in each worker.
+
+    Returns
+    -------
+    int
+        Number of engines loaded (the registry budget still applies).
+    """
+    chatbots = get_storage().fetch(
+        orm_class=Chatbots, filters={"status": StatusEnum.ACTIVE}, as_orm=True
+    )
+    loaded = 0
+    for chatbot in chatbots:
+        if not chatbot.meta_dataset_id:
+            logger.warning("Chatbot %s not preloaded: it has no testset.", chatbot.id)
+            continue
+        try:
+            engine_registry.put(chatbot.id, _open_engine(chatbot))
+            loaded += 1
+        except FileNotFoundError as e:
+            logger.warning("Chatbot %s not preloaded: no index artifact (%s).", chatbot.id, e)
+    get_storage().engine.dispose()
+    logger.info("Preloaded %d of %d deployed chatbots.", loaded, len(chatbots))
+    return loaded
+
+
+def _update_engine(chatbot, meta_id, job):
+    """
+    Applies the dataset changes since the chatbot was last trained to its persisted index.
+
+    Returns
+    -------
+    ChatbotEngine or None
+        The updated engine, or None if a full retrain is required (no usable
+        artifact, or an index without row ids).
+    """
+    try:
+        engine = _chatbot.ChatbotEngine.load(chatbot.id, meta_id, mmap=False)
+    except FileNotFoundError as e:
+        logger.warning(
+            "No index artifact for chatbot '%s' (%s). Retraining fully.", chatbot.name, e
+        )
+        return None
+
+    with job.stage("load"):
+        changed, removed_ids = _snapshots.get_dataset_changes(
+            meta_id, chatbot.last_trained_at, set(engine.row_ids)
+        )
+        rows = [] if changed.empty else list(
+            zip(changed["id"], changed["user_input"], changed["reference"])
+        )
+    job.update(rows_loaded=len(rows), rows_removed=len(removed_ids))
+    try:
+        engine.apply_changes(rows, removed_ids, progress=job)
+    except ValueError as e:
+        logger.warning(
+            "Cannot update chatbot '%s' incrementally (%s). Retraining fully.", chatbot.name, e
+        )
+        return None
+
+    logger.info(
+        "Updated chatbot '%s': %d rows changed, %d removed.",
+        chatbot.name, len(rows), len(removed_ids)
+    )
+    return engine
+
+
+def _run_training(job, chatbot, meta_id, incremental, index_type=None):
+    """
+    Background training job: builds or updates the index, then marks the chatbot TRAINED.
+
+    A full retrain without an explicit `index_type` keeps the index type the
+    chatbot was last trained with. Naming an index type always retrains fully.
+
+    Returns
+    -------
+    dict
+        Training mode, number of indexed rows and the index type built.
+
+    Raises
+    ------
+    LookupError
+        If the testset has no rows.
+    """
+    # Rows written while training runs are picked up by the next incremental update.
+    started_at = datetime.now(timezone.utc)
+    engine = None
+    if (incremental and index_type is None and chatbot.status != StatusEnum.INACTIVE
+            and chatbot.meta_dataset_id == meta_id and chatbot.last_trained_at):
+        engine = _update_engine(chatbot, meta_id, job)
+    mode = "incremental" if engine is not None else "full"
+
+    if engine is None:
+        # Stream the dataset for the chatbot (from its snapshot if current), embedding one
+        # chunk at a time
+        logger.info("Training chatbot '%s' on testset %s...", chatbot.name, meta_id)
+        if index_type is None and chatbot.meta_dataset_id:
+            manifest = _index_store.read_manifest(chatbot.id, chatbot.meta_dataset_id)
+            index_type = manifest.get("index_config") if manifest else None
+        engine = _chatbot.ChatbotEngine(index_type=index_type)
+        rows = engine.train_from_chunks(
+            job.track(_snapshots.iter_training_rows(meta_id), stage="load", counter="rows_loaded"),
+            progress=job
+        )
+        if not rows:
+            logger.warning("No dataset found for meta_id: %s", meta_id)
+            raise LookupError("No dataset found for this meta id")
+    with job.stage("save"):
+        engine.save(chatbot.id, meta_id)
+
+    # Only the columns training owns: the row was read when the job was
+    # submitted, and a rename or deployment since then must be kept.
+    changes = {"id": chatbot.id, "meta_dataset_id": meta_id, "last_trained_at": started_at}
+    if chatbot.status == StatusEnum.INACTIVE:
+        changes["status"] = StatusEnum.TRAINED
+    with job.stage("update"):
+        get_storage().update(pd.DataFrame([changes]), name="chatbots", key_column="id")
+    engine_registry.evict(chatbot.id)
+
+    built = _indexes.index_type_of(engine.index)
+    logger.info(
+        "Chatbot '%s' trained (%s, %d rows, %s index).",
+        chatbot.name, mode, engine.index.ntotal, built
+    )
+    return {"mode": mode, "rows": engine.index.ntotal, "index_type": built}
+
+
+def _run_index_report(job, chatbot, index_types, k, queries):
+    """
+    Background job: embeds the chatbot's testset and compares index types on it.
+
+    Returns
+    -------
+    dict
+        The report of `chat_core.indexes.index_report`.
+
+    Raises
+    ------
+    LookupError
+        If the testset has no rows.
+    """
+    engine = _chatbot.ChatbotEngine()
+    vectors = []
+    chunks = job.track(
+        _snapshots.iter_training_rows(chatbot.meta_dataset_id), stage="load", counter="rows_loaded"
+    )
+    for chunk in chunks:
+        with job.stage("embed"):
+            questions = [user_input for _, user_input, _ in chunk]
+            vectors.append(engine.embedder.embed_documents(questions))
+    if not vectors:
+        raise LookupError("No dataset found for this meta id")
+    with job.stage("report"):
+        report = _indexes.index_report(np.vstack(vectors), index_types, k=k, queries=queries)
+    logger.info("Index report for chatbot '%s' over %d rows.", chatbot.name, report["rows"])
+    return report
+
+
+def _run_evaluation(job, chatbot, k, sample, perturbations, seed):
+    """
+    Background job: asks a trained chatbot its own testset and scores the answers.
+
+    Returns
+    -------
+    dict
+        The report of `ChatbotEngine.evaluate`, with the index type.
+
+    Raises
+    ------
+    LookupError
+        If the chatbot has no usable index artifact.
+    """
+    with job.stage("load"):
+        try:
+            engine = _chatbot.ChatbotEngine.load(chatbot.id, chatbot.meta_dataset_id)
+        except FileNotFoundError as e:
+            raise LookupError(f"Chatbot has no usable index; train it again ({e})") from e
+    chunks = job.track(
+        _snapshots.iter_training_rows(chatbot.meta_dataset_id), stage="load", counter="rows_loaded"
+    )
+    report = engine.evaluate(
+        chunks, k=k, sample=sample, perturbations=perturbations, seed=seed, progress=job
+    )
+    report["index_type"] = _indexes.index_type_of(engine.index)
+    headline = report["perturbed"] or report["original"]
+    logger.info(
+        "Evaluated chatbot '%s' on %d rows: %s top-1 accuracy %.3f.",
+        chatbot.name, report["rows"], "perturbed" if report["perturbed"] else "original",
+        headline["top1_accuracy"]
+    )
+    return report
+
+
+def _run_snapshot(job, meta_id, force):
+    """
+    Background job: writes a snapshot of a testset unless a current one exists.
+
+    Returns
+    -------
+    dict
+        The snapshot manifest.
+    """
+    with job.stage("export"):
+        manifest = _snapshots.export_snapshot(meta_id, force=force)
+    job.update(rows_loaded=manifest["rows"])
+    return manifest
+
+
+# Columns returned by `GET /chatbots`, in the shape of `Chatbots.to_dict`.
+CHATBOT_LIST_COLUMNS = [
+    "id", "name", "description", "deployment_url", "meta_dataset_id",
+    "created_at", "last_trained_at", "status"
+]
+
+def _shared_index_bytes() -> int:
+    """Returns the bytes held by the shared indexes in shared index mode, 0 otherwise."""
+    if not SHARED_INDEX:
+        return 0
+    return _shared_index.shared_index_bytes()
+
+
+engine_registry = EngineRegistry(
+    _load_engine,
+    memory_budget=ENGINE_MEMORY_BUDGET_BYTES,
+    max_engines=ENGINE_MAX_LOADED,
+    external_bytes=_shared_index_bytes
+)
+job_manager = JobManager(max_workers=TRAINING_WORKERS, max_retained=JOB_HISTORY)
 
 @chatbot_api.route('/chatbots/create', methods=['POST'])
 def create_chatbot():
@@ -52,20 +438,47 @@ def create_chatbot():
     name = data.get("name", "Untitled Chatbot")
 
     # Validate meta_id exists
+    try:
+        meta_dataset_id = uuid.UUID(meta_id) if meta_id else None
+    except (TypeError, ValueError):
+        logger.warning("Invalid meta_id in request: %s", meta_id)
+        return jsonify({"error": "Invalid meta_id"}), 400
+
     # Insert into Chatbots table
+    # The id is set here, not by the column default, so it can be returned.
     chatbot = Chatbots(
+        id=uuid.uuid4(),
         name=name,
         description="Generated from testset",
         deployment_url="",
+        meta_dataset_id=meta_dataset_id,
         status=StatusEnum.INACTIVE
     )
-    chatbot_storage.insert([chatbot], name="chatbots", orm_class=Chatbots)
+    get_storage().insert(pd.DataFrame([chatbot.to_dict()]), name="chatbots", orm_class=Chatbots)
     return jsonify({"chatbot_id": str(chatbot.id)})
 
 @chatbot_api.route('/chatbots', methods=['GET'])
 def list_chatbots():
     """
-    API endpoint to retrieve all chatbots from the database.
+    API endpoint to retrieve chatbots from the database.
+
+    Chatbots are ordered by `(created_at, id)`. Pages are read by keyset, so
+    each page costs the same regardless of how deep it is. The response
+    carries an ETag derived from the table state and the query; polls with a
+    matching `If-None-Match` get `304 Not Modified` without any rows being
+    read or serialized.
+
+    Query Parameters
+    ----------------
+    status : str, optional
+        Comma-separated statuses to keep, e.g. `active,trained`.
+    fields : str, optional
+        Comma-separated fields to return. Defaults to every field below.
+    limit : int, optional
+        Page size, at most `CHATBOT_PAGE_MAX`. Without it every matching
+        chatbot is returned.
+    cursor : str, optional
+        The `X-Next-Cursor` header of the previous page.
 
     Returns
     -------
@@ -75,28 +488,121 @@ def list_chatbots():
         - name (str)
         - description (str)
         - deployment_url (str)
+        - meta_dataset_id (UUID or null)
         - created_at (ISO datetime string)
         - last_trained_at (ISO datetime string or null)
-        - status (str): one of "INACTIVE", "TRAINED", or "ACTIVE"
+        - status (str): one of "inactive", "trained", or "active"
+        If more chatbots follow, the `X-Next-Cursor` header holds the cursor
+        of the next page.
     """
-    chatbots = chatbot_storage.fetch(orm_class=Chatbots, as_orm=True)
-    logger.info("Fetched %d chatbots.", len(chatbots))
-    return jsonify([cb.to_dict() for cb in chatbots])
+    args = request.args
+    filters = {}
+    if args.get("status"):
+        try:
+            filters["status"] = [
+                _parse_status(value) for value in args["status"].split(",")
+            ]
+        except KeyError:
+            return jsonify({"error": "Invalid status"}), 400
+
+    if args.get("fields"):
+        fields = [f.strip() for f in args["fields"].split(",")]
+    else:
+        fields = CHATBOT_LIST_COLUMNS
+    if not set(fields) <= set(CHATBOT_LIST_COLUMNS):
+        return jsonify({"error": "Invalid fields", "allowed": CHATBOT_LIST_COLUMNS}), 400
+
+    try:
+        limit = int(args["limit"]) if args.get("limit") else None
+        after = _decode_cursor(args["cursor"]) if args.get("cursor") else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    if limit is not None and not 0 < limit <= CHATBOT_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {CHATBOT_PAGE_MAX}"}), 400
+
+    etag = hashlib.sha1(
+        f"{get_chatbots_version()}|{request.query_string.decode()}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # Cursor keys are always selected; fetch one extra row to know whether a next page exists.
+    columns = list(dict.fromkeys(fields + ["created_at", "id"]))
+    rows = get_storage().fetch(
+        orm_class=Chatbots,
+        filters=filters,
+        columns=columns,
+        row_format="dict",
+        order_by=["created_at", "id"],
+        after=after,
+        limit=limit + 1 if limit else None
+    )
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+
+    logger.info("Fetched %d chatbots.", len(rows))
+    response = jsonify([{field: row[field] for field in fields} for row in rows])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _parse_status(value: str) -> StatusEnum:
+    """Returns the status for a name or value such as "ACTIVE" or "active"."""
+    value = value.strip()
+    try:
+        return StatusEnum(value.lower())
+    except ValueError:
+        raise KeyError(value) from None
+
+
+def _encode_cursor(row: dict) -> str:
+    """Encodes the `(created_at, id)` keyset position after `row`."""
+    return base64.urlsafe_b64encode(json.dumps([row["created_at"], row["id"]]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Decodes a cursor from `_encode_cursor` into `(created_at, id)` values."""
+    created_at, chatbot_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(created_at), uuid.UUID(chatbot_id)
 
 @chatbot_api.route('/chatbots/<uuid:chatbot_id>/train', methods=['POST'])
 def train_chatbot(chatbot_id):
     """
-    API endpoint to train a chatbot using its associated dataset.
+    API endpoint to start training a chatbot using its associated dataset.
+
+    Training runs as a background job so large testsets do not block the
+    request. The job builds the chatbot's vector index, persists it as an
+    on-disk artifact that serving opens instead of retraining, then updates the
+    chatbot's status to TRAINED and sets the last_trained_at timestamp. The
+    chatbot must currently be in the INACTIVE state and a valid meta_dataset_id
+    must be given. Poll `GET /jobs/<job_id>` for progress.
 
-    This updates the chatbot's status to TRAINED and sets the last_trained_at timestamp,
-    provided it is currently in the INACTIVE state and a valid meta_dataset_id is given.
+    A TRAINED or ACTIVE chatbot can be retrained with `incremental` set: only the
+    Dataset rows written after `last_trained_at` are embedded and added to the
+    existing index, and deleted rows are removed from it. The chatbot keeps its
+    status. If the testset changed or no index can be updated, it is rebuilt fully.
+    It can also be rebuilt fully with another index by naming an `index_type`.
 
     Request JSON
     ------------
     {
-        "meta_id": "<uuid>"
+        "meta_id": "<uuid>",
+        "incremental": false,
+        "index_type": "auto"
     }
 
+    `index_type` is optional: "auto" (chosen by testset size) or one of
+    "flat", "sq8", "hnsw", "ivf", "ivfsq8", "ivfpq". Without it, the chatbot
+    keeps the index type it was last trained with. Naming one retrains fully,
+    whatever the chatbot's status and `incremental`.
+
     Parameters
     ----------
     chatbot_id : UUID
@@ -105,16 +611,18 @@ def train_chatbot(chatbot_id):
     Returns
     -------
     JSON response
-        Success:
+        Accepted (202):
         {
-            "message": "Trained Successfully"
+            "message": "Training started",
+            "job_id": "<job id>"
         }
 
         Error:
         {
             "error": "Reason for failure"
         }
-        With appropriate HTTP status code.
+        With appropriate HTTP status code. A training job already running for
+        the chatbot yields 409 with its `job_id`.
     """
     # Validate and parse meta_id
     try:
@@ -124,33 +632,248 @@ def train_chatbot(chatbot_id):
         return jsonify({"error": "Invalid or missing meta_id"}), 400
 
     # Fetch the chatbot instance
-    results = chatbot_storage.fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
+    results = get_storage().fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
     if not results:
         logger.warning("Chatbot %s not found.", chatbot_id)
         return jsonify({"error": "Chatbot not found"}), 400
 
     chatbot = results[0]
 
-    if chatbot.status != StatusEnum.INACTIVE:
+    incremental = bool(request.json.get("incremental"))
+    index_type = request.json.get("index_type")
+    if index_type is not None and index_type not in (_indexes.AUTO, *_indexes.INDEX_TYPES):
+        choices = [_indexes.AUTO, *_indexes.INDEX_TYPES]
+        return jsonify({"error": f"index_type must be one of {choices}"}), 400
+    if chatbot.status != StatusEnum.INACTIVE and not incremental and index_type is None:
         logger.warning("Chatbot %s is already %s.", chatbot.id, chatbot.status)
         return jsonify({"error": "Chatbot is already trained or active"}), 400
 
-    # Load dataset for the chatbot
-    df = get_full_dataset_by_meta_id(meta_id)
-    if df.empty:
-        logger.warning("No dataset found for meta_id: %s", meta_id)
-        return jsonify({"error": "No dataset found for this meta id"}), 404
+    try:
+        job = job_manager.submit(
+            "train", _run_training, chatbot, meta_id, incremental, index_type, key=str(chatbot.id)
+        )
+    except RuntimeError as e:
+        logger.warning("Chatbot %s is already training.", chatbot.id)
+        return jsonify({"error": "Chatbot is already training", "job_id": e.args[1]}), 409
+
+    return jsonify({"message": "Training started", "job_id": job.id}), 202
+
+@chatbot_api.route('/chatbots/<uuid:chatbot_id>/index-report', methods=['POST'])
+def start_index_report(chatbot_id):
+    """
+    API endpoint to compare FAISS index types on a chatbot's testset.
+
+    The testset is embedded (mostly from the embedding cache) and every index
+    type is built over it. Sampled questions are searched one at a time and
+    each index's results are compared with exact search, giving recall@k,
+    top-1 agreement, latency percentiles, build time and memory per type.
+    Runs as a background job; the report is the job's `result`.
+
+    Request JSON
+    ------------
+    {
+        "index_types": ["flat", "sq8", "hnsw", "ivf", "ivfsq8", "ivfpq"],
+        "k": 10,
+        "queries": 1000
+    }
+
+    Returns
+    -------
+    JSON response (202)
+        {
+            "job_id": "<job id>"
+        }
+
+        On error, a JSON body:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    data = request.get_json(silent=True) or {}
+    index_types = data.get("index_types") or list(_indexes.INDEX_TYPES)
+    if not isinstance(index_types, list) or any(t not in _indexes.INDEX_TYPES for t in index_types):
+        choices = list(_indexes.INDEX_TYPES)
+        return jsonify({"error": f"index_types must be a list drawn from {choices}"}), 400
+    k, queries = data.get("k", 10), data.get("queries", 1000)
+    if not isinstance(k, int) or not 1 <= k <= 100:
+        return jsonify({"error": "k must be an integer between 1 and 100"}), 400
+    if not isinstance(queries, int) or not 1 <= queries <= 100000:
+        return jsonify({"error": "queries must be an integer between 1 and 100000"}), 400
+
+    results = get_storage().fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
+    if not results:
+        return jsonify({"error": "Chatbot not found"}), 404
+    chatbot = results[0]
+    if not chatbot.meta_dataset_id:
+        return jsonify({"error": "Chatbot has no testset"}), 400
+
+    try:
+        job = job_manager.submit(
+            "index_report", _run_index_report, chatbot, index_types, k, queries,
+            key=f"{chatbot.id}:index-report"
+        )
+    except RuntimeError as e:
+        return jsonify({"error": "An index report is already running", "job_id": e.args[1]}), 409
+    return jsonify({"job_id": job.id}), 202
+
+@chatbot_api.route('/chatbots/<uuid:chatbot_id>/evaluate', methods=['POST'])
+def start_evaluation(chatbot_id):
+    """
+    API endpoint to measure how well a trained chatbot retrieves its own testset.
+
+    Every testset question (or a sample) is asked as is and in perturbed
+    forms, embedded in batches and searched as one matrix against the
+    chatbot's persisted index. A search is correct when it returns the row's
+    reference answer. Runs as a background job; the report is the job's
+    `result`, so a chatbot can be checked before it is deployed.
+
+    Request JSON
+    ------------
+    {
+        "k": 10,
+        "sample": 10000,                            // rows to evaluate, default all
+        "perturbations": ["typo", "drop_word", "swap_words"],
+        "seed": 0
+    }
+
+    Returns
+    -------
+    JSON response (202)
+        {
+            "job_id": "<job id>"
+        }
+
+        The job's result:
+        {
+            "rows": int, "skipped": int, "k": int, "index_type": str,
+            "perturbed": scores over all perturbed questions, or null without perturbations,
+            "original": scores of the questions as trained (a check of the index),
+            "variants": {"<perturbation>": scores},
+            "latency_ms": {
+                "embed_per_query": float, "search_per_query": float,
+                "single_search": {"p50", "p95", "p99", "mean"}
+            }
+        }
+        where scores are
+        {"queries": int, "top1_accuracy": float, "topk_accuracy": float, "mrr": float}.
+
+        On error, a JSON body:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    data = request.get_json(silent=True) or {}
+    k, sample, seed = data.get("k", 10), data.get("sample"), data.get("seed", 0)
+    perturbations = data.get("perturbations", list(_evaluation.PERTURBATIONS))
+    if not isinstance(k, int) or not 1 <= k <= 100:
+        return jsonify({"error": "k must be an integer between 1 and 100"}), 400
+    if sample is not None and (not isinstance(sample, int) or sample < 1):
+        return jsonify({"error": "sample must be a positive integer"}), 400
+    if (not isinstance(perturbations, list)
+            or any(p not in _evaluation.PERTURBATIONS for p in perturbations)):
+        choices = list(_evaluation.PERTURBATIONS)
+        return jsonify({"error": f"perturbations must be a list drawn from {choices}"}), 400
+    if not isinstance(seed, int):
+        return jsonify({"error": "seed must be an integer"}), 400
 
-    # Simulate training
-    logger.info("Training chatbot '%s' on %d rows...", chatbot.name, len(df))
-    chatbot.last_trained_at = datetime.now(timezone.utc)
-    chatbot.status = StatusEnum.TRAINED
+    results = get_storage().fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
+    if not results:
+        return jsonify({"error": "Chatbot not found"}), 404
+    chatbot = results[0]
+    if chatbot.status == StatusEnum.INACTIVE or not chatbot.meta_dataset_id:
+        return jsonify({"error": "Chatbot is not trained"}), 400
 
-    # Update in DB
-    chatbot_storage.update(pd.DataFrame([chatbot.to_dict()]), name="chatbots", key_column="id")
+    try:
+        job = job_manager.submit(
+            "evaluate", _run_evaluation, chatbot, k, sample, list(dict.fromkeys(perturbations)),
+            seed, key=f"{chatbot.id}:evaluate"
+        )
+    except RuntimeError as e:
+        return jsonify({"error": "An evaluation is already running", "job_id": e.args[1]}), 409
+    return jsonify({"job_id": job.id}), 202
+
+@chatbot_api.route('/testsets/<uuid:meta_id>/snapshot', methods=['POST'])
+def export_testset_snapshot(meta_id):
+    """
+    API endpoint to export a testset's Dataset rows to a columnar snapshot.
+
+    Training and retraining read a current snapshot instead of the database
+    and refresh a stale one as they stream from the database, so exporting is
+    only needed to prepare a testset ahead of training. Runs as a background
+    job whose `result` is the snapshot manifest (row count, checksum and the
+    testset version it was taken at).
+
+    Request JSON
+    ------------
+    {
+        "force": false    // rewrite the snapshot even if it is current
+    }
+
+    Returns
+    -------
+    JSON response (202)
+        {
+            "job_id": "<job id>"
+        }
+
+        On error, a JSON body:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    if not SNAPSHOT_DIR:
+        return jsonify({"error": "Snapshots are disabled"}), 400
+    data = request.get_json(silent=True) or {}
+    force = data.get("force", False)
+    if not isinstance(force, bool):
+        return jsonify({"error": "force must be a boolean"}), 400
+
+    try:
+        job = job_manager.submit(
+            "snapshot", _run_snapshot, meta_id, force, key=f"{meta_id}:snapshot"
+        )
+    except RuntimeError as e:
+        return jsonify({"error": "A snapshot export is already running", "job_id": e.args[1]}), 409
+    return jsonify({"job_id": job.id}), 202
+
+@chatbot_api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    API endpoint to report the status of a background job.
+
+    Jobs are kept in the memory of the process that started them. Behind a
+    pre-fork server, poll with the same worker (e.g. sticky sessions or a
+    single worker for job routes): any other worker answers 404.
+
+    Parameters
+    ----------
+    job_id : str
+        Identifier returned when the job was started.
+
+    Returns
+    -------
+    JSON response
+        {
+            "job_id": "<job id>",
+            "kind": "train",
+            "key": "<chatbot id>",
+            "status": "queued" | "running" | "succeeded" | "failed",
+            "progress": {"rows_loaded": int, "rows_embedded": int, "stage": str, ...},
+            "stages": {"<stage>": seconds, ...},
+            "result": {...} or null,
+            "error": str or null,
+            "created_at", "started_at", "finished_at": ISO datetime strings or null
+        }
 
-    logger.info("Chatbot '%s' marked as TRAINED.", chatbot.name)
-    return jsonify({"message": "Trained Successfully"}), 200
+        404 if the job is unknown to this worker.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
 @chatbot_api.route('/chatbots/<uuid:chatbot_id>/deploy', methods=['POST'])
 def deploy_chatbot(chatbot_id):
@@ -181,7 +904,7 @@ def deploy_chatbot(chatbot_id):
         With appropriate HTTP status code.
     """
     # BUGFIX: filters should be a dict with key-value pairs, not a set
-    results = chatbot_storage.fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
+    results = get_storage().fetch(orm_class=Chatbots, filters={"id": chatbot_id}, as_orm=True)
     if not results:
         logger.warning("Chatbot %s not found for deployment.", chatbot_id)
         return jsonify({"error": "Chatbot not found"}), 404
@@ -194,10 +917,352 @@ def deploy_chatbot(chatbot_id):
     base_url = request.host_url.rstrip('/')
     chatbot.deployment_url = urljoin(base_url, f"chat/{chatbot.id}")
     chatbot.status = StatusEnum.ACTIVE
-    chatbot_storage.update(pd.DataFrame([chatbot.to_dict()]), name="chatbots", key_column="id")
+    get_storage().update(pd.DataFrame([chatbot.to_dict()]), name="chatbots", key_column="id")
+    engine_registry.evict(chatbot.id)
 
     logger.info("Chatbot '%s' deployed at %s", chatbot.name, chatbot.deployment_url)
     return jsonify({
         "message": "Deployment Successful",
         "deployment_url": chatbot.deployment_url
     })
+
+# Seconds a client is asked to wait while a chatbot's index is rebuilt.
+_RETRY_AFTER_SECONDS = 30
+
+def _training_unavailable(error):
+    """Turns away a chat request while the chatbot's index is rebuilt by the job in `error`."""
+    logger.warning("Chatbot cannot be served yet: %s (job %s).", error.args[0], error.args[1])
+    response = jsonify({"error": f"{error.args[0]}; retry later", "job_id": error.args[1]})
+    response.headers["Retry-After"] = str(_RETRY_AFTER_SECONDS)
+    return response, 503
+
+@chatbot_api.route('/chat/<uuid:chatbot_id>', methods=['POST'])
+def chat(chatbot_id):
+    """
+    API endpoint to send a message to a deployed chatbot.
+
+    The answer is served from the process-wide engine registry. A chatbot that
+    is not loaded yet is opened from its persisted index artifact on the first
+    request and kept in memory until it is evicted to stay within the memory budget.
+    A chatbot without an artifact is retrained by a background job, and is
+    answered with 503, the job id and a Retry-After header until it is done.
+
+    Request JSON
+    ------------
+    {
+        "message": "<user message>"
+    }
+
+    Parameters
+    ----------
+    chatbot_id : UUID
+        Unique identifier of the deployed chatbot.
+
+    Returns
+    -------
+    JSON response
+        On success:
+        {
+            "chatbot_id": "<UUID>",
+            "response": "<answer>"
+        }
+
+        On error:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    data = request.get_json(silent=True) or {}
+    message = data.get("message")
+    if not isinstance(message, str) or not message.strip():
+        logger.warning("Missing message in chat request for %s.", chatbot_id)
+        return jsonify({"error": "Missing message"}), 400
+
+    try:
+        engine = engine_registry.get(chatbot_id)
+    except LookupError as e:
+        logger.warning("Chatbot %s cannot be served: %s", chatbot_id, e)
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return _training_unavailable(e)
+
+    return jsonify({
+        "chatbot_id": str(chatbot_id),
+        "response": engine.respond(message)
+    })
+
+def _shared_index_stats() -> dict:
+    """Returns `shared_index_stats()` in shared index mode, an empty dict otherwise."""
+    if not SHARED_INDEX:
+        return {}
+    return _shared_index.shared_index_stats()
+
+@chatbot_api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    API endpoint exposing this worker's metrics in the Prometheus text format.
+
+    Includes request counters and latency histograms per route, latency
+    histograms of database calls and engine stages (load, embed, index,
+    search), the engine registry state, the shared embedding service's
+    micro-batching counters and, in shared index mode, the shared indexes.
+
+    Returns
+    -------
+    text/plain response
+        Prometheus exposition format, version 0.0.4.
+    """
+    registry = engine_registry.stats()
+    embedding = _embeddings.embedding_service_stats() or {}
+    shared = list(_shared_index_stats().values())
+    counters = {
+        "chat_engine_registry_hits_total": ("Registry lookups served by a loaded engine.",
+                                            registry["hits"]),
+        "chat_engine_registry_misses_total": ("Registry lookups that loaded an engine.",
+                                              registry["misses"]),
+        "chat_engine_registry_evictions_total": ("Engines evicted to stay within budget.",
+                                                 registry["evictions"]),
+        "chat_embed_requests_total": ("Requests to the shared embedding service.",
+                                      embedding.get("requests", 0)),
+        "chat_embed_texts_total": ("Texts embedded by the shared embedding service.",
+                                   embedding.get("texts", 0)),
+        "chat_embed_model_calls_total": ("Embedding model calls, after micro-batching.",
+                                         embedding.get("model_calls", 0)),
+        "chat_embed_merged_requests_total": ("Requests that shared a model call with others.",
+                                             embedding.get("merged_requests", 0)),
+    }
+    body = metrics.render({
+        "chat_engines_loaded": ("Trained engines held by the registry.", registry["loaded"]),
+        "chat_engine_registry_bytes": ("Estimated bytes held by loaded engines and shared indexes.",
+                                       registry["bytes"]),
+        "chat_shared_index_vectors": ("Distinct vectors held by the shared indexes.",
+                                      sum(stats["vectors"] for stats in shared)),
+        "chat_shared_index_used_vectors": ("Shared index vectors used by loaded chatbots.",
+                                           sum(stats["used_vectors"] for stats in shared)),
+        "chat_shared_index_rows": ("Testset questions served from the shared indexes.",
+                                   sum(stats["rows"] for stats in shared)),
+        "chat_shared_index_bytes": ("Estimated bytes held by the shared indexes' vectors.",
+                                    sum(stats["bytes"] for stats in shared)),
+    }, counters)
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+@chatbot_api.route('/chat/stats', methods=['GET'])
+def chat_stats():
+    """
+    API endpoint to monitor chat serving in this worker.
+
+    Returns
+    -------
+    JSON response
+        {
+            "registry": {"loaded": int, "bytes": int, "hits": int, "misses": int, ...},
+            "embedding": {"requests": int, "texts": int, "model_calls": int,
+                          "merged_requests": int} or null before the model is loaded,
+            "shared_index": {
+                "<embedding model>": {"vectors": int, "used_vectors": int, "bytes": int,
+                                      "tenants": int, "chatbots": int, "rows": int,
+                                      "tenant_bytes": int, "compactions": int}
+            },
+            "engines": {
+                "<chatbot id>": {
+                    "answers": {"size": int, "hits": int, "misses": int, "hit_rate": float, ...},
+                    "query_embeddings": {...}
+                }
+            }
+        }
+    """
+    return jsonify({
+        "registry": engine_registry.stats(),
+        "embedding": _embeddings.embedding_service_stats(),
+        "shared_index": _shared_index_stats(),
+        "engines": engine_registry.engine_stats()
+    })
+
+@chatbot_api.route('/chat/<uuid:chatbot_id>/batch', methods=['POST'])
+def chat_batch(chatbot_id):
+    """
+    API endpoint to send many messages to a deployed chatbot in one request.
+
+    Intended for red-team sweeps. Queries are embedded and searched in batches
+    of `CHAT_BATCH_SIZE` with a single index search per batch, and results are
+    streamed back as newline-delimited JSON as soon as each batch is answered.
+
+    The `Server-Timing` header is sent before any batch is answered. With
+    `server_timing` set, the stream ends with one more line timing the
+    streamed work the same way:
+    {"server_timing": "engine.respond_batch;dur=41.2, total;dur=43.0"}
+
+    Request JSON
+    ------------
+    {
+        "queries": ["<message>", ...],
+        "k": 1,
+        "server_timing": false
+    }
+
+    Parameters
+    ----------
+    chatbot_id : UUID
+        Unique identifier of the deployed chatbot.
+
+    Returns
+    -------
+    NDJSON response (application/x-ndjson)
+        One line per query, in request order:
+        {"index": 0, "query": "<message>", "answer": "<answer>",
+         "matches": [{"answer": "<answer>", "distance": 0.12}, ...]}
+
+        On error, a JSON body:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    data = request.get_json(silent=True) or {}
+    queries = data.get("queries")
+    if (not isinstance(queries, list) or not queries
+            or not all(isinstance(query, str) for query in queries)):
+        logger.warning("Missing or invalid queries in batch chat request for %s.", chatbot_id)
+        return jsonify({"error": "queries must be a non-empty list of strings"}), 400
+    if len(queries) > CHAT_BATCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {CHAT_BATCH_MAX_QUERIES} queries per request"}), 413
+    k = data.get("k", 1)
+    if not isinstance(k, int) or not 1 <= k <= 50:
+        return jsonify({"error": "k must be an integer between 1 and 50"}), 400
+
+    try:
+        engine = engine_registry.get(chatbot_id)
+    except LookupError as e:
+        logger.warning("Chatbot %s cannot be served: %s", chatbot_id, e)
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return _training_unavailable(e)
+
+    report_timing = data.get("server_timing") is True
+
+    def generate():
+        # Runs after the request has finished, so the streamed stages are collected here.
+        started, timings = time.perf_counter(), {}
+        for start in range(0, len(queries), CHAT_BATCH_SIZE):
+            batch = queries[start:start + CHAT_BATCH_SIZE]
+            with metrics.collect(timings):
+                results = engine.respond_batch(batch, k=k)
+            lines = [
+                json.dumps({"index": start + offset, "query": query, **result})
+                for offset, (query, result) in enumerate(zip(batch, results))
+            ]
+            yield "\n".join(lines) + "\n"
+        logger.info("Answered %d batch queries for chatbot %s.", len(queries), chatbot_id)
+        if report_timing:
+            total = metrics.server_timing(timings, time.perf_counter() - started)
+            yield json.dumps({"server_timing": total}) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+def _run_campaign(job, campaign_id, meta_id, chatbot_ids, workers, rate_limit):
+    """
+    Background campaign job: runs the testset against the chatbots.
+
+    Returns
+    -------
+    dict
+        The campaign report.
+    """
+    runner = CampaignRunner(
+        engine_registry.get, storage=get_storage(), workers=workers, rate_limit=rate_limit
+    )
+    return runner.run(meta_id, chatbot_ids, campaign_id=campaign_id, progress=job)
+
+@chatbot_api.route('/campaigns', methods=['POST'])
+def start_campaign():
+    """
+    API endpoint to start a red-team campaign against deployed chatbots.
+
+    Every prompt of the testset is sent to each chatbot from a bounded thread
+    pool, optionally rate limited. Results are bulk-inserted into
+    `campaign_results` as they arrive. The campaign runs as a background job;
+    poll `GET /jobs/<job_id>` for progress and `GET /campaigns/<campaign_id>`
+    for the report.
+
+    Request JSON
+    ------------
+    {
+        "meta_id": "<uuid>",
+        "chatbot_ids": ["<uuid>", ...],
+        "workers": 8,
+        "rate_limit": 0
+    }
+
+    Returns
+    -------
+    JSON response (202)
+        {
+            "campaign_id": "<uuid>",
+            "job_id": "<job id>"
+        }
+
+        On error, a JSON body:
+        {
+            "error": "Reason for failure"
+        }
+        With appropriate HTTP status code.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        meta_id = uuid.UUID(str(data.get("meta_id")))
+        chatbot_ids = [
+            str(uuid.UUID(str(chatbot_id))) for chatbot_id in data.get("chatbot_ids") or []
+        ]
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid meta_id or chatbot_ids"}), 400
+    if not chatbot_ids:
+        return jsonify({"error": "chatbot_ids must be a non-empty list"}), 400
+
+    workers = data.get("workers", CAMPAIGN_WORKERS)
+    rate_limit = data.get("rate_limit", CAMPAIGN_RATE_LIMIT)
+    if not isinstance(workers, int) or not 1 <= workers <= 256:
+        return jsonify({"error": "workers must be an integer between 1 and 256"}), 400
+    if not isinstance(rate_limit, (int, float)) or rate_limit < 0:
+        return jsonify({"error": "rate_limit must be a non-negative number"}), 400
+
+    campaign_id = uuid.uuid4()
+    job = job_manager.submit(
+        "campaign", _run_campaign, campaign_id, meta_id, chatbot_ids, workers, rate_limit
+    )
+    logger.info("Campaign %s queued against %d chatbots.", campaign_id, len(chatbot_ids))
+    return jsonify({"campaign_id": str(campaign_id), "job_id": job.id}), 202
+
+@chatbot_api.route('/campaigns/<uuid:campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """
+    API endpoint to retrieve a campaign and its report.
+
+    Returns
+    -------
+    JSON response
+        {
+            "id": "<uuid>",
+            "meta_dataset_id": "<uuid>",
+            "chatbot_ids": ["<uuid>", ...],
+            "status": "running" | "succeeded" | "failed",
+            "report": {
+                "prompts_sent": int, "seconds": float, "throughput": float,
+                "chatbots": {
+                    "<chatbot id>": {
+                        "prompts": int, "errors": int, "hits": int, "hit_rate": float,
+                        "throughput": float,
+                        "latency_ms": {"p50": float, "p95": float, "p99": float, "mean": float}
+                    }
+                }
+            } or null,
+            "created_at": "<ISO datetime>",
+            "finished_at": "<ISO datetime>" or null
+        }
+    """
+    results = get_storage().fetch(
+        orm_class=Campaign, filters={"id": campaign_id}, row_format="dict"
+    )
+    if not results:
+        return jsonify({"error": "Campaign not found"}), 404
+    return jsonify(results[0])
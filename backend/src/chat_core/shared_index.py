@@ -0,0 +1,562 @@
+"""
+One vector index shared by many chatbots (multi-tenant serving).
+
+Every `ChatbotEngine` normally holds its own FAISS index, so many small
+chatbots trained on the same or overlapping testsets store the same vectors
+many times. In shared mode (`CHAT_SHARED_INDEX`), chatbots with flat indexes
+are served from one `SharedIndex` per embedding model instead:
+
+- Each distinct vector is stored once. Vectors are deduplicated by a hash of
+  their bytes; the embedding cache gives identical texts identical vectors.
+- Each testset (`meta_dataset_id`) is a `Tenant`: a bitmap of the shared
+  positions holding its questions, their answers, and the ids of the
+  chatbots served from it. These tags are all a vector carries.
+- `respond` searches the shared index with the tenant's bitmap as an id
+  filter, so only the chatbot's own questions can match.
+
+Tenants are keyed by testset and artifact content hash, so chatbots trained
+on the same testset with the same result share one. Opening a chatbot whose
+tenant exists only reads its artifact manifest. Otherwise its persisted
+artifact is read once and only the vectors that are not in the shared index
+yet are added. A newer tenant of a testset replaces older ones for chatbots
+opened later; engines already serving keep theirs.
+
+A tenant is kept while a loaded engine uses it: the engine registry closes
+engines it drops, which detaches their chatbot, and a tenant without
+chatbots is dropped. Vectors are appended as tenants are added; once the
+share of vectors no tenant uses passes `SHARED_INDEX_COMPACT_RATIO`, the
+index is rebuilt from the used ones. The registry counts the shared
+indexes' bytes against its memory budget, so evicting engines is what
+frees them.
+
+Each search filters the whole shared index, so a small chatbot's query
+costs about as much as a scan of every tenant's vectors: shared mode trades
+query latency for memory.
+
+Large testsets keep dedicated engines: their approximate indexes do not hold
+exact vectors to deduplicate, and a dedicated index beats filtering a shared
+one at that size.
+
+Classes
+-------
+SharedIndex
+    Flat index of distinct vectors with per-testset tenants.
+Tenant
+    One testset's view of a shared index, searchable like a FAISS index.
+SharedChatbotEngine
+    `ChatbotEngine` answering from a tenant.
+
+Functions
+---------
+get_shared_index
+    Returns the process-wide shared index of an embedding model.
+load_shared_engine
+    Opens a chatbot's engine on the shared index.
+shared_index_bytes
+    Returns the bytes held by every shared index, for the registry budget.
+shared_index_stats
+    Returns the size and deduplication counters of every shared index.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+from chat_core.chatbot import ChatbotEngine
+from chat_core.config import SHARED_INDEX_COMPACT_RATIO
+from chat_core.embeddings import describe_embedding_model, get_embedding_service
+from chat_core.index_store import FORMAT_VERSION, AnswerStore, load_artifact, read_manifest
+from chat_core.indexes import index_bytes
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+
+class _ReadWriteLock:
+    """Lets many searches run at once, while adding vectors waits for them and blocks new ones."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._writing = True
+            while self._readers:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class Tenant:
+    """
+    One testset's view of a `SharedIndex`.
+
+    Has the `ntotal`, `d` and `search` of a FAISS index, with local position
+    `i` standing for the i-th shared position of the testset, so
+    `ChatbotEngine.respond` works on it unchanged. `answers[i]` is the answer
+    of local position `i`.
+
+    The FAISS index, positions and filter are replaced together when the
+    shared index is compacted. A tenant dropped before that keeps searching
+    the vectors it was built on, which are not modified any more.
+
+    Parameters
+    ----------
+    shared : SharedIndex
+        Index holding the vectors.
+    meta_id : str
+        Testset (MetaDataset) id.
+    positions : numpy.ndarray
+        Sorted, distinct shared positions of the testset's questions.
+    answers : AnswerStore
+        Answer of each position in `positions`.
+    content_hash : str
+        Content hash of the artifact the tenant was built from.
+    created_at : str
+        Creation time of that artifact.
+    """
+
+    def __init__(self, shared, meta_id: str, positions: np.ndarray, answers: AnswerStore,
+                 content_hash: str, created_at: str):
+        self.shared = shared
+        self.meta_id = meta_id
+        self.answers = answers
+        self.content_hash = content_hash
+        self.created_at = created_at
+        self.chatbot_ids = set()
+        self._bind(shared.index, positions)
+
+    def _bind(self, index, positions: np.ndarray):
+        """Points the tenant at `positions` of a FAISS index. Needs the shared write lock."""
+        mask = np.zeros(int(positions[-1]) + 1 if len(positions) else 0, dtype=bool)
+        mask[positions] = True
+        # Bit i of the bitmap selects shared position i; positions added later are outside it.
+        bitmap = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+        # One assignment, so a concurrent search sees the old or the new view, never a mix.
+        self._view = (index, positions, bitmap, faiss.SearchParameters(sel=selector), selector)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._view[1]
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.positions)
+
+    @property
+    def d(self) -> int:
+        return self.shared.d
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the tenant alone: filter, positions and answers."""
+        _, positions, bitmap, _, _ = self._view
+        return int(bitmap.nbytes + positions.nbytes) + self.answers.nbytes
+
+    def contains(self, position: int) -> bool:
+        """Whether a shared position holds one of the testset's questions."""
+        positions = self.positions
+        i = np.searchsorted(positions, position)
+        return i < len(positions) and positions[i] == position
+
+    def search(self, vectors: np.ndarray, k: int):
+        """
+        Searches the testset's vectors only.
+
+        Returns
+        -------
+        tuple
+            `(distances, positions)` like `faiss.Index.search`, with local
+            positions (-1 pads missing results).
+        """
+        index, positions, _, params, _ = self._view
+        distances, found = self.shared.search(vectors, k, params, index=index)
+        local = np.searchsorted(positions, found)
+        local[found == -1] = -1
+        return distances, local
+
+
+class SharedIndex:
+    """
+    Flat index of distinct vectors, shared by the tenants of one embedding model.
+
+    Searches run concurrently; adding vectors waits for running searches.
+    Vectors are appended as tenants are added and stay in place while they
+    are used, so a retrained testset reuses the vectors it kept. Once more
+    than `compact_ratio` of the vectors belong to no kept tenant, the index
+    is rebuilt from the used ones and the kept tenants are rebound to it.
+
+    Parameters
+    ----------
+    model_id : str
+        Identity of the embedding model of every vector.
+    dimension : int
+        Vector dimension.
+    compact_ratio : float, optional
+        Share of unused vectors that triggers a rebuild. Defaults to
+        `SHARED_INDEX_COMPACT_RATIO`.
+    """
+
+    def __init__(self, model_id: str, dimension: int,
+                 compact_ratio: float = SHARED_INDEX_COMPACT_RATIO):
+        self.model_id = model_id
+        self.d = dimension
+        self.compact_ratio = compact_ratio
+        self.index = faiss.IndexFlatL2(dimension)
+        self._keys = {}
+        # Tenants new chatbots of a testset are opened on, by (meta_id, content_hash).
+        self._tenants = {}
+        # Tenants serving at least one chatbot, including ones replaced in `_tenants`.
+        self._attached = set()
+        self._lock = _ReadWriteLock()
+        self._tenants_lock = threading.Lock()
+        self.rows_added = 0
+        self.compactions = 0
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Adds the vectors that are not stored yet.
+
+        Returns
+        -------
+        numpy.ndarray
+            int64 shared position of each input vector.
+        """
+        with self._lock.write():
+            return self._add(vectors)
+
+    def _add(self, vectors: np.ndarray) -> np.ndarray:
+        """`add` for a caller holding the write lock."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        keys = [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in vectors]
+        positions = np.empty(len(keys), dtype=np.int64)
+        fresh = []
+        for i, key in enumerate(keys):
+            position = self._keys.get(key)
+            if position is None:
+                position = self._keys[key] = self.index.ntotal + len(fresh)
+                fresh.append(i)
+            positions[i] = position
+        if fresh:
+            self.index.add(vectors[fresh])
+        self.rows_added += len(keys)
+        logger.info("[SHARED INDEX] %d vectors: %d new, %d already stored.", len(keys), len(fresh),
+                    len(keys) - len(fresh))
+        return positions
+
+    def search(self, vectors: np.ndarray, k: int, params=None, index=None):
+        """Searches all vectors of `index` (default: current), or those selected by `params`."""
+        with self._lock.read():
+            return (index if index is not None else self.index).search(vectors, k, params=params)
+
+    def tenant(self, meta_id, content_hash: str):
+        """Returns the tenant of a testset built from an artifact with this content, or None."""
+        with self._tenants_lock:
+            return self._tenants.get((str(meta_id), content_hash))
+
+    def add_tenant(self, meta_id, vectors: np.ndarray, answers: AnswerStore, content_hash: str,
+                   created_at: str, chatbot_id=None) -> Tenant:
+        """
+        Adds the tenant of a testset, replacing its tenants built from older artifacts.
+
+        Questions with identical vectors are indexed once per testset and
+        answered with the first one's answer.
+
+        Parameters
+        ----------
+        meta_id : UUID or str
+            Testset id.
+        vectors : numpy.ndarray
+            Embedding of each question, in the order of `answers`.
+        answers : AnswerStore
+            Answer of each question.
+        content_hash : str
+            Content hash of the artifact the vectors come from.
+        created_at : str
+            Creation time of that artifact.
+        chatbot_id : UUID or str, optional
+            Chatbot served from the tenant, attached before any compaction
+            can drop the new tenant.
+        """
+        with self._lock.write():
+            positions = self._add(vectors)
+            positions, first = np.unique(positions, return_index=True)
+            answers = AnswerStore(np.asarray(answers.ids)[first], answers.table)
+            tenant = Tenant(self, str(meta_id), positions, answers, content_hash, created_at)
+            with self._tenants_lock:
+                for key, previous in list(self._tenants.items()):
+                    if previous.meta_id == tenant.meta_id and previous.created_at < created_at:
+                        del self._tenants[key]
+                self._tenants[(tenant.meta_id, content_hash)] = tenant
+                if chatbot_id is not None:
+                    tenant.chatbot_ids.add(str(chatbot_id))
+                    self._attached.add(tenant)
+        self.compact_if_sparse()
+        return tenant
+
+    def attach(self, tenant: Tenant, chatbot_id) -> bool:
+        """
+        Records that a chatbot is served from a tenant.
+
+        Returns
+        -------
+        bool
+            False if the tenant was dropped meanwhile; build a new one then.
+        """
+        with self._tenants_lock:
+            registered = self._tenants.get((tenant.meta_id, tenant.content_hash))
+            if tenant not in self._attached and registered is not tenant:
+                return False
+            tenant.chatbot_ids.add(str(chatbot_id))
+            self._attached.add(tenant)
+            return True
+
+    def release(self, tenant: Tenant, chatbot_id):
+        """
+        Records that a chatbot's engine was dropped, dropping the tenant with its last chatbot.
+        """
+        with self._tenants_lock:
+            tenant.chatbot_ids.discard(str(chatbot_id))
+            if tenant.chatbot_ids:
+                return
+            self._attached.discard(tenant)
+            key = (tenant.meta_id, tenant.content_hash)
+            if self._tenants.get(key) is tenant:
+                del self._tenants[key]
+        self.compact_if_sparse()
+
+    def _kept(self) -> list:
+        """Tenants whose vectors are kept. Caller holds the tenants lock."""
+        return list(self._attached.union(self._tenants.values()))
+
+    def _used_positions(self, tenants) -> np.ndarray:
+        if not tenants:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([tenant.positions for tenant in tenants]))
+
+    def compact_if_sparse(self) -> bool:
+        """
+        Rebuilds the index from the used vectors if more than `compact_ratio` of them are unused.
+
+        Returns
+        -------
+        bool
+            Whether the index was rebuilt.
+        """
+        with self._tenants_lock:
+            used = len(self._used_positions(self._kept()))
+        total = self.index.ntotal
+        if not total or (total - used) / total <= self.compact_ratio:
+            return False
+
+        with self._lock.write(), self._tenants_lock:
+            tenants = self._kept()
+            keep = self._used_positions(tenants)
+            total = self.index.ntotal
+            if (total - len(keep)) / max(total, 1) <= self.compact_ratio:
+                return False
+            index = faiss.IndexFlatL2(self.d)
+            if len(keep):
+                index.add(self.index.reconstruct_batch(keep))
+            # Positions keep their order, so every tenant's positions stay sorted.
+            remap = np.full(total, -1, dtype=np.int64)
+            remap[keep] = np.arange(len(keep), dtype=np.int64)
+            self._keys = {key: int(remap[position]) for key, position in self._keys.items()
+                          if remap[position] >= 0}
+            for tenant in tenants:
+                tenant._bind(index, remap[tenant.positions])
+            self.index = index
+            self.compactions += 1
+        logger.info(
+            "[SHARED INDEX] Compacted %s from %d to %d vectors.", self.model_id, total, len(keep)
+        )
+        return True
+
+    def tags(self, position: int) -> dict:
+        """Returns the testsets and chatbots that use the vector at a shared position."""
+        with self._tenants_lock:
+            tenants = [tenant for tenant in self._kept() if tenant.contains(position)]
+        return {
+            "meta_dataset_ids": sorted({tenant.meta_id for tenant in tenants}),
+            "chatbot_ids": sorted(set().union(*(tenant.chatbot_ids for tenant in tenants))),
+        }
+
+    def stats(self) -> dict:
+        """
+        Returns the size and deduplication counters of the index.
+
+        `rows` is the number of questions of all kept tenants; the gap to
+        `used_vectors` is what deduplication saves, the gap between
+        `used_vectors` and `vectors` what the next compaction frees.
+        """
+        with self._tenants_lock:
+            tenants = self._kept()
+            used = len(self._used_positions(tenants))
+        with self._lock.read():
+            vectors, vector_bytes = self.index.ntotal, index_bytes(self.index)
+        return {
+            "vectors": vectors,
+            "used_vectors": used,
+            "bytes": vector_bytes,
+            "tenants": len(tenants),
+            "chatbots": sum(len(tenant.chatbot_ids) for tenant in tenants),
+            "rows": sum(tenant.ntotal for tenant in tenants),
+            "tenant_bytes": sum(tenant.nbytes for tenant in tenants),
+            "compactions": self.compactions,
+        }
+
+
+class SharedChatbotEngine(ChatbotEngine):
+    """
+    Chatbot engine answering from a `Tenant` of a shared index.
+
+    Serves like a `ChatbotEngine` whose index holds the testset's distinct
+    questions. It is read-only: train, save and update dedicated engines.
+
+    Parameters
+    ----------
+    tenant : Tenant
+        The chatbot's testset in the shared index.
+    chatbot_id : UUID or str
+        The chatbot served, detached from the tenant by `close`.
+    """
+
+    def __init__(self, tenant: Tenant, chatbot_id):
+        super().__init__()
+        self.tenant = tenant
+        self.chatbot_id = str(chatbot_id)
+        self.index = tenant
+        self.answers = tenant.answers
+
+    def close(self):
+        """Detaches the chatbot from its tenant, so unused vectors can be reclaimed."""
+        self.tenant.shared.release(self.tenant, self.chatbot_id)
+
+    def save(self, chatbot_id, meta_id):
+        raise ValueError("Engines on the shared index cannot be saved; save a dedicated engine.")
+
+    def apply_changes(self, changed, removed_ids, progress=None) -> int:
+        raise ValueError("Engines on the shared index are read-only; update a dedicated engine.")
+
+    def memory_footprint(self) -> int:
+        """
+        Estimates the bytes held for this chatbot alone: the tenant's filter
+        and answers, and the query embedding cache. The shared vectors are
+        counted by the registry through `shared_index_bytes`.
+        """
+        return self.tenant.nbytes + self.query_cache_bytes()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_index(model_id: str, dimension: int) -> SharedIndex:
+    """
+    Returns the process-wide shared index of an embedding model, creating it on first use.
+    """
+    with _shared_lock:
+        shared = _shared.get(model_id)
+        if shared is None:
+            shared = _shared[model_id] = SharedIndex(model_id, dimension)
+    return shared
+
+
+def _content_key(chatbot_id, manifest: dict) -> str:
+    """Returns the content hash of an artifact; artifacts saved without one are not shared."""
+    return manifest.get("content_hash") or f"{chatbot_id}@{manifest['created_at']}"
+
+
+def load_shared_engine(chatbot_id, meta_id):
+    """
+    Opens a chatbot's engine on the shared index of its embedding model.
+
+    The testset's tenant is reused if it was built from an artifact with
+    the same content; otherwise it is built from the chatbot's artifact.
+
+    Parameters
+    ----------
+    chatbot_id : UUID or str
+        Identifier of the chatbot.
+    meta_id : UUID or str
+        Testset the chatbot was trained on.
+
+    Returns
+    -------
+    SharedChatbotEngine or None
+        None if the artifact's index is not flat; serve a dedicated engine then.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no usable artifact exists, including one built with a different
+        embedding model.
+    """
+    manifest = read_manifest(chatbot_id, meta_id)
+    if manifest is None or manifest.get("format_version") != FORMAT_VERSION:
+        raise FileNotFoundError(
+            f"No index artifact of format {FORMAT_VERSION} for chatbot {chatbot_id}"
+        )
+    if manifest.get("index_type") != "flat":
+        return None
+    model_id = describe_embedding_model(get_embedding_service())
+    if manifest.get("embedding_model") != model_id:
+        raise FileNotFoundError(
+            f"Index artifact for chatbot {chatbot_id} was built with "
+            f"{manifest.get('embedding_model')}, not {model_id}"
+        )
+
+    shared = get_shared_index(model_id, manifest["dimension"])
+    tenant = shared.tenant(meta_id, _content_key(chatbot_id, manifest))
+    if tenant is None or not shared.attach(tenant, chatbot_id):
+        # The artifact may have been replaced since its manifest was read; key the
+        # tenant by what was opened.
+        index, answers, _, manifest = load_artifact(chatbot_id, meta_id)
+        tenant = shared.add_tenant(
+            meta_id, index.reconstruct_n(0, index.ntotal), answers,
+            _content_key(chatbot_id, manifest), manifest["created_at"], chatbot_id=chatbot_id
+        )
+    return SharedChatbotEngine(tenant, chatbot_id)
+
+
+def shared_index_bytes() -> int:
+    """Returns the bytes held by the vectors of every shared index."""
+    with _shared_lock:
+        indexes = list(_shared.values())
+    return sum(index_bytes(shared.index) for shared in indexes)
+
+
+def shared_index_stats() -> dict:
+    """Returns `SharedIndex.stats` of every shared index, by embedding model."""
+    with _shared_lock:
+        indexes = list(_shared.values())
+    return {shared.model_id: shared.stats() for shared in indexes}
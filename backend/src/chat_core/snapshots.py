@@ -0,0 +1,389 @@
+"""
+Columnar snapshots of testsets, so training does not re-read the database.
+
+Training and retraining stream a testset's `Dataset` rows. A snapshot keeps
+them in an uncompressed Arrow IPC file that is memory-mapped when read, so
+the columns are used in place (zero-copy) instead of being fetched over a
+database cursor and converted row by row:
+
+    <SNAPSHOT_DIR>/<meta_id>/v<FORMAT_VERSION>/
+        manifest.json   format version, row count, SHA-256 checksum of the
+                        data file and the testset version it was taken at
+        dataset.arrow   columns id, user_input, reference, changed_at
+
+A snapshot is current while the testset's version matches the manifest
+and the data file matches its checksum. The version is one aggregate
+query: row count, newest write time and, on PostgreSQL, a digest of every
+row's id and texts. Otherwise the snapshot is stale and training streams
+the rows from the database instead, writing a fresh snapshot on the way.
+Where the version cannot see rows edited in place (no `updated_at` column
+and no digest), full retrains always read the database.
+
+Snapshots are published like index artifacts (`publish_directory`): the
+version directory is a link swapped in one rename, so a reader never sees
+a partial or missing snapshot and concurrent writers do not fail each
+other. Writing a snapshot never fails a training; errors are logged and
+the snapshot is dropped.
+
+Functions
+---------
+snapshot_path
+    Returns the snapshot directory of a testset.
+read_manifest
+    Returns the manifest of a snapshot.
+export_snapshot
+    Writes a snapshot of a testset unless a current one exists.
+current_snapshot
+    Opens a testset's snapshot as a memory-mapped Arrow table, if current.
+iter_training_rows
+    Streams a testset's training rows from its snapshot or the database.
+get_dataset_changes
+    Rows changed since a training, from the snapshot or the database.
+"""
+import hashlib
+import json
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from chat_core.config import DB_FETCH_CHUNK_SIZE, SNAPSHOT_DIR
+from chat_core.database.fetch import (
+    dataset_tracks_updates, get_dataset_changes_by_meta_id, get_dataset_version,
+    iter_dataset_by_meta_id
+)
+from chat_core.index_store import publish_directory
+from chat_core.metrics import timed, timer
+from core.commons.log_config import get_logger
+
+logger = get_logger(__name__.rsplit('.', maxsplit=1)[-1])
+
+FORMAT_VERSION = 1
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("user_input", pa.string()),
+    ("reference", pa.string()),
+    ("changed_at", pa.timestamp("us", tz="UTC")),
+])
+
+
+def snapshot_path(meta_id, root: str = None) -> Path:
+    """
+    Returns the directory holding the snapshot of a testset.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        Identifier of the testset (MetaDataset).
+    root : str, optional
+        Snapshot root directory. Defaults to `SNAPSHOT_DIR`.
+    """
+    return Path(root or SNAPSHOT_DIR) / str(meta_id) / f"v{FORMAT_VERSION}"
+
+
+def read_manifest(meta_id, root: str = None):
+    """
+    Returns the manifest of a testset's snapshot, or None if there is none.
+    """
+    return _read_manifest_file(snapshot_path(meta_id, root))
+
+
+def _read_manifest_file(directory: Path):
+    """Returns the manifest in `directory`, or None if there is none."""
+    manifest_file = directory / "manifest.json"
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _version(meta_id) -> dict:
+    """Returns the testset's current version in the form stored in manifests."""
+    rows, changed_at, content = get_dataset_version(meta_id)
+    return {
+        "rows": int(rows),
+        "changed_at": changed_at.isoformat() if changed_at is not None else None,
+        "content": content,
+    }
+
+
+def _detects_edits(version: dict) -> bool:
+    """Whether `version` changes when a row is edited in place."""
+    return version["content"] is not None or dataset_tracks_updates()
+
+
+def _checksum(path: Path) -> str:
+    """Returns the SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _SnapshotWriter:
+    """
+    Writes a snapshot chunk by chunk into a staging directory.
+
+    `commit` checksums the data file, writes the manifest and renames the
+    snapshot into place; `discard` drops the staging directory.
+    """
+
+    def __init__(self, meta_id, version: dict, root: str = None):
+        self.meta_id = meta_id
+        self.version = version
+        self.target = snapshot_path(meta_id, root)
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        self.staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.target.parent))
+        self._sink = pa.OSFile(str(self.staging / "dataset.arrow"), "wb")
+        self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+        self.rows = 0
+
+    def write(self, chunk):
+        """Appends `(id, user_input, reference, changed_at)` rows as one record batch."""
+        if not chunk:
+            return
+        ids, user_inputs, references, changed_at = zip(*chunk)
+        self._writer.write_batch(pa.record_batch([
+            pa.array([str(row_id) for row_id in ids], SCHEMA.field("id").type),
+            pa.array(user_inputs, SCHEMA.field("user_input").type),
+            pa.array(references, SCHEMA.field("reference").type),
+            pa.array(changed_at, SCHEMA.field("changed_at").type),
+        ], schema=SCHEMA))
+        self.rows += len(chunk)
+
+    def commit(self):
+        """
+        Finishes the snapshot and publishes it in place of any previous one.
+
+        Returns
+        -------
+        dict or None
+            The manifest, or None if the snapshot could not be written; the
+            error is logged and the staging directory dropped.
+        """
+        try:
+            self._writer.close()
+            self._sink.close()
+            manifest = {
+                "format_version": FORMAT_VERSION,
+                "meta_id": str(self.meta_id),
+                "rows": self.rows,
+                "checksum": _checksum(self.staging / "dataset.arrow"),
+                "source_version": self.version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            with open(self.staging / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            publish_directory(self.staging, self.target)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(
+                "[SNAPSHOT] Could not write the snapshot of testset %s: %s", self.meta_id, e
+            )
+            shutil.rmtree(self.staging, ignore_errors=True)
+            return None
+        logger.info(
+            "[SNAPSHOT] Wrote %d rows of testset %s to %s.", self.rows, self.meta_id, self.target
+        )
+        return manifest
+
+    def discard(self):
+        """Abandons the snapshot, e.g. when reading the database failed midway."""
+        try:
+            self._writer.close()
+            self._sink.close()
+        except (OSError, pa.ArrowException):
+            pass
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+
+def _stream_from_database(meta_id, chunk_size: int = None, root: str = None, version: dict = None):
+    """
+    Streams `(id, user_input, reference)` chunks from the database while writing a fresh snapshot.
+
+    The snapshot is kept only if the stream is read to the end. Failing to
+    write it stops the snapshot, never the stream.
+    """
+    # Taken before reading, so rows written meanwhile make the snapshot stale rather than wrong.
+    version = version or _version(meta_id)
+    try:
+        writer = _SnapshotWriter(meta_id, version, root)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("[SNAPSHOT] Could not start a snapshot of testset %s: %s", meta_id, e)
+        writer = None
+    try:
+        for chunk in iter_dataset_by_meta_id(meta_id, chunk_size, with_changed_at=True):
+            if writer is not None:
+                try:
+                    writer.write(chunk)
+                except (OSError, pa.ArrowException) as e:
+                    logger.warning(
+                        "[SNAPSHOT] Could not write the snapshot of testset %s: %s", meta_id, e
+                    )
+                    writer.discard()
+                    writer = None
+            yield [row[:3] for row in chunk]
+        if writer is not None:
+            writer.commit()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.discard()
+
+
+@timed("snapshot.export")
+def export_snapshot(meta_id, force: bool = False, root: str = None) -> dict:
+    """
+    Writes a snapshot of a testset's `Dataset` rows, unless a current one exists.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        Identifier of the testset.
+    force : bool, optional
+        Rewrite the snapshot even if it is current.
+    root : str, optional
+        Snapshot root directory. Defaults to `SNAPSHOT_DIR`.
+
+    Returns
+    -------
+    dict
+        Manifest of the current snapshot.
+    """
+    if not force and current_snapshot(meta_id, root=root) is not None:
+        return read_manifest(meta_id, root)
+    for _ in _stream_from_database(meta_id, root=root):
+        pass
+    manifest = read_manifest(meta_id, root)
+    if manifest is None:
+        raise OSError(f"Could not write the snapshot of testset {meta_id}")
+    return manifest
+
+
+def current_snapshot(meta_id, verify: bool = True, root: str = None):
+    """
+    Opens a testset's snapshot if it is still current.
+
+    Parameters
+    ----------
+    meta_id : UUID or str
+        Identifier of the testset.
+    verify : bool, optional
+        Check the data file against the manifest's checksum (one sequential
+        read of the file, which also warms the page cache for the mapping).
+    root : str, optional
+        Snapshot root directory. Defaults to `SNAPSHOT_DIR`.
+
+    Returns
+    -------
+    pyarrow.Table or None
+        The rows, memory-mapped read-only, or None if there is no snapshot
+        or it is stale or damaged.
+    """
+    if not (root or SNAPSHOT_DIR):
+        return None
+    return _open_current(meta_id, _version(meta_id), verify, root)
+
+
+def _open_current(meta_id, version: dict, verify: bool = True, root: str = None):
+    """Opens a testset's snapshot if it was taken at `version`; see `current_snapshot`."""
+    # Resolved once, so the manifest and the data file come from the same snapshot.
+    directory = snapshot_path(meta_id, root).resolve()
+    manifest = _read_manifest_file(directory)
+    if manifest is None or manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    if manifest.get("source_version") != version:
+        logger.info("[SNAPSHOT] Snapshot of testset %s is stale.", meta_id)
+        return None
+
+    data_file = directory / "dataset.arrow"
+    try:
+        if verify:
+            with timer("snapshot.verify"):
+                if _checksum(data_file) != manifest.get("checksum"):
+                    logger.warning(
+                        "[SNAPSHOT] Snapshot of testset %s does not match its checksum.", meta_id
+                    )
+                    return None
+        with timer("snapshot.open"):
+            table = pa.ipc.open_file(pa.memory_map(str(data_file))).read_all()
+    except (OSError, pa.ArrowException) as e:
+        # Replaced by a newer snapshot while it was opened, or unreadable.
+        logger.warning("[SNAPSHOT] Could not open the snapshot of testset %s: %s", meta_id, e)
+        return None
+    if table.num_rows != manifest.get("rows"):
+        logger.warning("[SNAPSHOT] Snapshot of testset %s has %d rows, expected %s.",
+                       meta_id, table.num_rows, manifest.get("rows"))
+        return None
+    return table
+
+
+def iter_training_rows(meta_id, chunk_size: int = None):
+    """
+    Streams the training rows of a testset in chunks, like `iter_dataset_by_meta_id`.
+
+    Rows come from the testset's snapshot when it is current. Otherwise they
+    are streamed from the database and a fresh snapshot is written on the
+    way, for the next training. With snapshots disabled (`SNAPSHOT_DIR` is
+    empty), or where the testset version cannot see rows edited in place,
+    this is `iter_dataset_by_meta_id`.
+
+    Yields
+    ------
+    list of tuple
+        `(id, user_input, reference)` rows.
+    """
+    if not SNAPSHOT_DIR:
+        yield from iter_dataset_by_meta_id(meta_id, chunk_size)
+        return
+    version = _version(meta_id)
+    if not _detects_edits(version):
+        # A snapshot would keep serving rows edited since it was taken.
+        yield from iter_dataset_by_meta_id(meta_id, chunk_size)
+        return
+    table = _open_current(meta_id, version)
+    if table is None:
+        yield from _stream_from_database(meta_id, chunk_size, version=version)
+        return
+
+    logger.info(
+        "[SNAPSHOT] Reading %d rows of testset %s from its snapshot.", table.num_rows, meta_id
+    )
+    for batch in table.to_batches(max_chunksize=chunk_size or DB_FETCH_CHUNK_SIZE):
+        with timer("snapshot.read"):
+            columns = (batch.column(name).to_pylist() for name in ("id", "user_input", "reference"))
+            rows = list(zip(*columns))
+        yield rows
+
+
+def get_dataset_changes(meta_id, since, indexed_ids: set):
+    """
+    Returns the rows that changed since a training, like `get_dataset_changes_by_meta_id`.
+
+    Answered from the testset's snapshot when it is current, from the
+    database otherwise.
+
+    Returns
+    -------
+    tuple
+        `(changed, removed_ids)`: a DataFrame of new or modified rows (columns
+        id, user_input, reference) and the set of deleted row ids.
+    """
+    table = current_snapshot(meta_id) if SNAPSHOT_DIR else None
+    if table is None:
+        return get_dataset_changes_by_meta_id(meta_id, since, indexed_ids)
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    with timer("snapshot.changes"):
+        ids = table.column("id")
+        since = pa.scalar(since, SCHEMA.field("changed_at").type)
+        changed = pc.fill_null(pc.greater(table.column("changed_at"), since), False)
+        unindexed = pc.invert(pc.is_in(ids, value_set=pa.array(sorted(indexed_ids), pa.string())))
+        rows = table.filter(pc.or_(changed, unindexed)).select(["id", "user_input", "reference"])
+        removed_ids = indexed_ids - set(ids.to_pylist())
+    return rows.to_pandas(), removed_ids
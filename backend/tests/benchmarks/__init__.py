@@ -0,0 +1,44 @@
+"""
+Performance benchmarks for the chatbot serving layer.
+
+The suite times the hot paths with local stand-ins, so it needs neither an
+embedding provider nor a PostgreSQL server:
+
+- `ChatbotEngine.train`, `respond` and `respond_batch` at several testset sizes,
+  using a deterministic fake embedding model.
+- Retrieval self-evaluation of a whole testset (with perturbed questions)
+  against one `respond` call per question.
+- Concurrent chat throughput with and without cross-request micro-batching
+  of query embeddings.
+- Memory, load time and query latency of chatbots on overlapping testsets,
+  with dedicated engines and on the shared index.
+- Build time, memory, recall and search latency of each FAISS index type
+  against exact search.
+- `Storage` insert, fetch and update throughput on an ephemeral SQLite file,
+  or on the database in `CHAT_BENCH_DATABASE_URL` (e.g. a throwaway PostgreSQL).
+- Request latency of the API through the Flask test client.
+
+Run it from `backend/`:
+
+    pytest tests/benchmarks
+
+Environment variables
+---------------------
+CHAT_BENCH_SIZES
+    Comma-separated row counts (default "1000,10000,100000").
+CHAT_BENCH_OUT
+    Where the results are written as JSON (default "var/bench/latest.json").
+    Keep a run as a baseline by copying this file.
+CHAT_BENCH_BASELINE
+    Baseline JSON to compare against. Regressions are listed at the end of
+    the run and fail it.
+CHAT_BENCH_TOLERANCE
+    Allowed relative slowdown before a metric counts as a regression
+    (default 0.25).
+CHAT_BENCH_DATABASE_URL
+    SQLAlchemy URL of the database to benchmark instead of SQLite.
+
+Two result files can also be compared directly:
+
+    python -m tests.benchmarks.report var/bench/latest.json baseline.json
+"""
@@ -0,0 +1,128 @@
+"""
+Fixtures for the benchmark suite: local stand-ins and result recording.
+
+The environment is pointed at throwaway locations before `chat_core` is
+imported, because its settings are read at import time.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="chat-bench-"))
+os.environ["CHAT_INDEX_DIR"] = str(_WORKDIR / "indexes")
+os.environ["CHAT_SNAPSHOT_DIR"] = str(_WORKDIR / "snapshots")
+os.environ["CHAT_EMBED_CACHE_PATH"] = ""
+os.environ["CHAT_DATABASE_URL"] = os.getenv(
+    "CHAT_BENCH_DATABASE_URL", f"sqlite:///{_WORKDIR / 'bench.sqlite3'}"
+)
+
+from tests.benchmarks.report import BenchmarkResults, compare, format_regressions  # noqa: E402
+
+SIZES = [
+    int(size) for size in os.getenv("CHAT_BENCH_SIZES", "1000,10000,100000").split(",") if size
+]
+OUT = os.getenv("CHAT_BENCH_OUT", os.path.join("var", "bench", "latest.json"))
+BASELINE = os.getenv("CHAT_BENCH_BASELINE", "")
+TOLERANCE = float(os.getenv("CHAT_BENCH_TOLERANCE", "0.25"))
+
+_results = BenchmarkResults()
+
+
+class FakeEmbeddings:
+    """
+    Deterministic stand-in for an embedding model.
+
+    Each text maps to a fixed unit vector seeded by its hash, so runs are
+    reproducible and the same text always lands on the same index entry.
+    """
+
+    model = "bench-fake"
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_documents(self, texts):
+        return np.stack([self._vector(text) for text in texts])
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class FakeModelClient:
+    """Stand-in for `core.utils.clients.ModelClient` serving `FakeEmbeddings`."""
+
+    @classmethod
+    def load(cls):
+        return cls()
+
+    def get_embeddings(self):
+        return FakeEmbeddings()
+
+
+def make_rows(n: int, seed: int = 0) -> list:
+    """Returns `n` synthetic `(row_id, user_input, reference)` testset rows."""
+    return [
+        (
+            hashlib.md5(f"{seed}-{i}".encode()).hexdigest(),
+            f"adversarial prompt {seed}-{i} about topic {i % 97}",
+            f"reference answer {seed}-{i}",
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_model_client():
+    """Serves every ChatbotEngine from the fake embedding model."""
+    import chat_core.embeddings
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(chat_core.embeddings, "ModelClient", FakeModelClient)
+        patch.setattr(chat_core.embeddings, "_service", None)
+        yield
+
+
+@pytest.fixture(scope="session")
+def storage():
+    """The shared Storage, bootstrapped on the benchmark database."""
+    from chat_core.database import get_storage
+
+    return get_storage()
+
+
+@pytest.fixture(scope="session")
+def bench():
+    """Records metrics for the results file: `bench.record(name, **metrics)`."""
+    return _results
+
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        metafunc.parametrize("rows", SIZES, ids=[f"{size}" for size in SIZES])
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results.results:
+        return
+    path = _results.save(OUT)
+    print(f"\nBenchmark results written to {path}")
+    if BASELINE:
+        baseline = json.loads(Path(BASELINE).read_text(encoding="utf-8"))
+        regressions = compare(_results.to_dict(), baseline, TOLERANCE)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {TOLERANCE:.0%} against {BASELINE}:")
+            print(format_regressions(regressions))
+            session.exitstatus = 1
+        else:
+            print(f"No regressions against {BASELINE}.")
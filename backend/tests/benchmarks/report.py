@@ -0,0 +1,174 @@
+"""
+Recording, persisting and comparing benchmark results.
+
+Results are flat: each benchmark name (e.g. "engine.train[10000]") maps to a
+dict of metrics. The metric name tells which direction is better:
+
+- `*_per_s` (throughput): higher is better.
+- `*_s` and `*_ms` (durations): lower is better.
+- Other metrics (e.g. row counts) are informational and never compared.
+
+Classes
+-------
+BenchmarkResults
+    Collects the metrics of one run and writes them as JSON.
+
+Functions
+---------
+timed
+    Runs a callable and returns its result and duration.
+latency_summary
+    Summarizes latency samples as p50/p95/p99/mean in milliseconds.
+compare
+    Lists the metrics that regressed against a baseline.
+main
+    Command-line comparison of two result files.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from chat_core.evaluation import latency_summary as summarize
+
+# Durations below these floors are dominated by timer noise and never flagged.
+NOISE_FLOOR = {"_s": 0.005, "_ms": 0.5}
+
+
+def timed(fn, *args, **kwargs):
+    """Runs `fn(*args, **kwargs)` and returns `(result, seconds)`."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def latency_summary(samples_ms) -> dict:
+    """Returns p50/p95/p99/mean of latency samples, in milliseconds."""
+    return {f"{name}_ms": value for name, value in summarize(samples_ms).items()}
+
+
+class BenchmarkResults:
+    """
+    Metrics of one benchmark run, keyed by benchmark name.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    def record(self, name: str, **metrics):
+        """Adds (or extends) the metrics of benchmark `name`."""
+        self.results.setdefault(name, {}).update(
+            {key: round(value, 6) if isinstance(value, float) else value
+             for key, value in metrics.items()}
+        )
+
+    def to_dict(self) -> dict:
+        """Returns the run as a JSON-serializable dict with environment metadata."""
+        return {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+            },
+            "results": self.results,
+        }
+
+    def save(self, path) -> Path:
+        """Writes the run to `path` as JSON and returns the path."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2, sort_keys=True), encoding="utf-8")
+        return path
+
+
+def _direction(metric: str):
+    """Returns 1 if higher is better, -1 if lower is better, None if not compared."""
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith("_s") or metric.endswith("_ms"):
+        return -1
+    return None
+
+
+def _below_noise_floor(metric: str, *values) -> bool:
+    suffix = "_ms" if metric.endswith("_ms") else "_s"
+    return all(value < NOISE_FLOOR[suffix] for value in values)
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Lists the metrics of `current` that are worse than `baseline` by more than `tolerance`.
+
+    Parameters
+    ----------
+    current, baseline : dict
+        Result files as written by `BenchmarkResults.save` (or their "results").
+    tolerance : float, optional
+        Allowed relative change in the bad direction, e.g. 0.25 for 25 %.
+
+    Returns
+    -------
+    list of dict
+        One entry per regression: benchmark, metric, baseline and current
+        values and the relative change. Benchmarks or metrics missing from
+        either side are skipped.
+    """
+    current = current.get("results", current)
+    baseline = baseline.get("results", baseline)
+    regressions = []
+    for name, metrics in sorted(current.items()):
+        for metric, value in sorted(metrics.items()):
+            direction = _direction(metric)
+            before = baseline.get(name, {}).get(metric)
+            if direction is None or not isinstance(before, (int, float)) or not before:
+                continue
+            if direction < 0 and _below_noise_floor(metric, before, value):
+                continue
+            change = (value - before) / before
+            if change * direction < -tolerance:
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": value,
+                    "change": round(change, 4),
+                })
+    return regressions
+
+
+def format_regressions(regressions: list) -> str:
+    """Renders regressions as one human-readable line each."""
+    return "\n".join(
+        f"{r['benchmark']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})"
+        for r in regressions
+    )
+
+
+def main(argv=None) -> int:
+    """
+    Compares a result file against a baseline and exits non-zero on regressions.
+    """
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline.")
+    parser.add_argument("current", help="Result JSON of the run to check.")
+    parser.add_argument("baseline", help="Baseline result JSON.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown (default 0.25).")
+    args = parser.parse_args(argv)
+
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+        print(format_regressions(regressions))
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Benchmarks of ChatbotEngine training, persistence and query answering.
+"""
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_core.chatbot import ChatbotEngine
+from chat_core.embeddings import EmbeddingService
+from chat_core.evaluation import PERTURBATIONS
+from chat_core.index_store import AnswerStore
+from chat_core.indexes import index_report
+from chat_core.shared_index import get_shared_index, load_shared_engine
+from tests.benchmarks.conftest import FakeEmbeddings, make_rows
+from tests.benchmarks.report import latency_summary, timed
+
+QUERIES = 500
+BATCH_QUERIES = 1000
+REPORT_QUERIES = 200
+DISTINCT_ANSWERS = 97
+SHARED_TESTSETS = 5
+CHATBOTS_PER_TESTSET = 2
+CONCURRENT_QUERIES = 2000
+CONCURRENT_CLIENTS = 32
+# Fixed cost of one model call (a forward pass or a round-trip), whatever its size.
+MODEL_CALL_SECONDS = 0.002
+
+
+class SingleCopyFakeEmbeddings(FakeEmbeddings):
+    """
+    `FakeEmbeddings` with a fixed per-call cost, serving one call at a time
+    like a single in-process model copy.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._busy = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._busy:
+            time.sleep(MODEL_CALL_SECONDS)
+            return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._busy:
+            time.sleep(MODEL_CALL_SECONDS)
+            return super().embed_query(text)
+
+
+def _trained_engine(rows: int):
+    data = make_rows(rows)
+    engine = ChatbotEngine()
+    _, seconds = timed(
+        engine.train, "bench",
+        dataset=[(user_input, reference) for _, user_input, reference in data],
+        row_ids=[row_id for row_id, _, _ in data]
+    )
+    return engine, data, seconds
+
+
+def test_train(rows, bench):
+    engine, _, seconds = _trained_engine(rows)
+    assert engine.index.ntotal == rows
+    bench.record(f"engine.train[{rows}]", rows=rows, train_s=seconds, rows_per_s=rows / seconds)
+
+
+def test_respond(rows, bench):
+    engine, data, _ = _trained_engine(rows)
+    step = max(len(data) // QUERIES, 1)
+    queries = [user_input for _, user_input, _ in data[::step][:QUERIES]]
+
+    cold, warm = [], []
+    for samples in (cold, warm):
+        # The second pass is answered from the answer cache.
+        for query in queries:
+            start = time.perf_counter()
+            engine.respond(query)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    bench.record(
+        f"engine.respond[{rows}]",
+        queries=len(queries),
+        **{f"cold_{key}": value for key, value in latency_summary(cold).items()},
+        **{f"cached_{key}": value for key, value in latency_summary(warm).items()},
+    )
+
+
+def test_respond_batch(rows, bench):
+    engine, data, _ = _trained_engine(rows)
+    queries = [f"unseen probe {i}" for i in range(BATCH_QUERIES)]
+    results, seconds = timed(engine.respond_batch, queries, k=5)
+    assert len(results) == BATCH_QUERIES
+    bench.record(
+        f"engine.respond_batch[{rows}]",
+        queries=BATCH_QUERIES, batch_s=seconds, queries_per_s=BATCH_QUERIES / seconds
+    )
+
+
+def test_evaluate(rows, bench):
+    """Self-evaluation of the whole testset in batches versus one `respond` per question."""
+    engine, data, _ = _trained_engine(rows)
+    chunks = [data[start:start + 5000] for start in range(0, rows, 5000)]
+    report, seconds = timed(engine.evaluate, chunks, k=10, perturbations=PERTURBATIONS)
+    assert report["rows"] == rows
+    assert report["original"]["top1_accuracy"] == 1.0
+    assert report["perturbed"]["queries"] == rows * len(PERTURBATIONS)
+
+    engine.clear_caches()
+    sample = data[::max(rows // QUERIES, 1)][:QUERIES]
+    _, respond_seconds = timed(lambda: [engine.respond(user_input) for _, user_input, _ in sample])
+    bench.record(
+        f"engine.evaluate[{rows}]",
+        queries=rows * (len(PERTURBATIONS) + 1),
+        evaluate_s=seconds,
+        queries_per_s=rows * (len(PERTURBATIONS) + 1) / seconds,
+        respond_queries_per_s=len(sample) / respond_seconds,
+        perturbed_top1_accuracy=report["perturbed"]["top1_accuracy"],
+        original_mrr=report["original"]["mrr"],
+        **{f"{variant}_mrr": scores["mrr"] for variant, scores in report["variants"].items()},
+    )
+
+
+def test_save_and_load(rows, bench):
+    engine, _, _ = _trained_engine(rows)
+    chatbot_id, meta_id = uuid.uuid4(), uuid.uuid4()
+    _, save_seconds = timed(engine.save, chatbot_id, meta_id)
+    loaded, load_seconds = timed(ChatbotEngine.load, chatbot_id, meta_id)
+    assert loaded.index.ntotal == rows
+    bench.record(f"engine.artifact[{rows}]", save_s=save_seconds, load_s=load_seconds)
+
+
+def test_index_types(rows, bench):
+    vectors = FakeEmbeddings().embed_documents([user_input for _, user_input, _ in make_rows(rows)])
+    report = index_report(vectors, k=10, queries=REPORT_QUERIES)
+    for index_type, result in report["indexes"].items():
+        bench.record(
+            f"index.{index_type}[{rows}]",
+            built_as=result["built_as"],
+            build_s=result["build_s"],
+            bytes=result["bytes"],
+            recall_at_k=result["recall_at_k"],
+            **{f"search_{key}_ms": value for key, value in result["latency_ms"].items()},
+        )
+
+
+def test_concurrent_respond(rows, bench):
+    """Concurrent single-query chat with and without cross-request micro-batching."""
+    engine, _, _ = _trained_engine(rows)
+    for mode, max_wait in (("unbatched", 0.0), ("microbatched", 0.005)):
+        service = EmbeddingService(SingleCopyFakeEmbeddings(), max_wait=max_wait)
+        engine.embedding_model = service
+        engine.clear_caches()
+        queries = [f"concurrent probe {mode} {i}" for i in range(CONCURRENT_QUERIES)]
+        with ThreadPoolExecutor(CONCURRENT_CLIENTS) as pool:
+            _, seconds = timed(lambda: list(pool.map(engine.respond, queries)))
+        stats = service.stats()
+        assert stats["requests"] == CONCURRENT_QUERIES
+        bench.record(
+            f"engine.respond_concurrent[{rows}]",
+            **{
+                f"{mode}_queries_per_s": CONCURRENT_QUERIES / seconds,
+                f"{mode}_model_calls": stats["model_calls"],
+            }
+        )
+
+
+def test_answer_store(rows, bench):
+    """Bytes per row of the answers: a list of dataset tuples versus the deduplicated store."""
+    # Red-team testsets mostly map many prompts to a few reference answers (refusals).
+    dataset = [
+        (user_input, "I can't help with that. This request falls under policy topic "
+                     f"{i % DISTINCT_ANSWERS}, which this assistant is not allowed to discuss.")
+        for i, (_, user_input, _) in enumerate(make_rows(rows))
+    ]
+    answers = [reference for _, reference in dataset]
+    list_bytes = sys.getsizeof(dataset) + sys.getsizeof(answers) + sum(
+        sys.getsizeof(row) + sys.getsizeof(row[0]) + sys.getsizeof(row[1]) for row in dataset
+    )
+    store, seconds = timed(AnswerStore.build, answers)
+    assert list(store) == answers
+    bench.record(
+        f"engine.answers[{rows}]",
+        unique=store.unique,
+        list_bytes_per_row=list_bytes / rows,
+        store_bytes_per_row=store.nbytes / rows,
+        build_s=seconds,
+    )
+
+
+def test_shared_index(rows, bench):
+    """Memory, load time and query latency of chatbots on overlapping testsets, shared or not."""
+    # Testsets of rows / 4 questions, each overlapping the next by half.
+    size = max(rows // 4, 2)
+    pool = make_rows(size * (SHARED_TESTSETS + 1) // 2 + size)
+    chatbots = []
+    for t in range(SHARED_TESTSETS):
+        data = pool[t * size // 2:t * size // 2 + size]
+        engine = ChatbotEngine(index_type="flat")
+        engine.train(
+            "bench", dataset=[(q, a) for _, q, a in data], row_ids=[row_id for row_id, _, _ in data]
+        )
+        meta_id = uuid.uuid4()
+        for _ in range(CHATBOTS_PER_TESTSET):
+            chatbot_id = uuid.uuid4()
+            engine.save(chatbot_id, meta_id)
+            chatbots.append((chatbot_id, meta_id))
+
+    dedicated = [ChatbotEngine.load(chatbot_id, meta_id) for chatbot_id, meta_id in chatbots]
+    # Index memory only: every engine has its own query embedding cache in both modes.
+    dedicated_bytes = sum(
+        engine.memory_footprint() - engine.query_cache_bytes() for engine in dedicated
+    )
+
+    load_ms, shared = [], []
+    for chatbot_id, meta_id in chatbots:
+        start = time.perf_counter()
+        shared.append(load_shared_engine(chatbot_id, meta_id))
+        load_ms.append((time.perf_counter() - start) * 1000)
+    stats = get_shared_index(shared[0].embedding_model_id, shared[0].index.d).stats()
+    shared_bytes = stats["bytes"] + sum(
+        engine.memory_footprint() - engine.query_cache_bytes()
+        for engine in shared[::CHATBOTS_PER_TESTSET]
+    )
+
+    queries = [user_input for _, user_input, _ in pool[::max(len(pool) // QUERIES, 1)][:QUERIES]]
+    for engine, reference in zip(shared[::CHATBOTS_PER_TESTSET], dedicated[::CHATBOTS_PER_TESTSET]):
+        sample = queries[:20]
+        assert [engine.respond(q) for q in sample] == [reference.respond(q) for q in sample]
+    # The same chatbot's latency on its dedicated index and on the shared index, which
+    # filters every tenant's vectors.
+    latencies = {}
+    for mode, engine in (("dedicated", dedicated[-1]), ("shared", shared[-1])):
+        latencies[mode] = []
+        for query in queries:
+            start = time.perf_counter()
+            engine.respond(query)
+            latencies[mode].append((time.perf_counter() - start) * 1000)
+
+    bench.record(
+        f"engine.shared_index[{rows}]",
+        chatbots=len(chatbots),
+        testset_rows=size,
+        dedicated_bytes=dedicated_bytes,
+        shared_bytes=shared_bytes,
+        shared_vectors=stats["vectors"],
+        new_testset_load_ms=sum(load_ms[::CHATBOTS_PER_TESTSET]) / SHARED_TESTSETS,
+        known_testset_load_ms=sum(load_ms[1::CHATBOTS_PER_TESTSET]) / SHARED_TESTSETS,
+        **{
+            f"{mode}_respond_{key}": value
+            for mode, samples in latencies.items()
+            for key, value in latency_summary(samples).items()
+        },
+    )
@@ -0,0 +1,90 @@
+"""
+Benchmarks of Storage insert, fetch and update throughput.
+
+Each size works on its own slice of the `chatbots` table, tagged through the
+`description` column, and removes it afterwards.
+"""
+import uuid
+
+import pandas as pd
+import pytest
+
+from chat_core.database.models import Chatbots
+from tests.benchmarks.report import timed
+
+# The ORM insert path builds one object per row; larger sizes only add minutes.
+ORM_INSERT_MAX_ROWS = 10000
+
+
+def _frame(rows: int, tag: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(rows)],
+        "name": [f"bench bot {i}" for i in range(rows)],
+        "description": tag,
+        "deployment_url": "",
+        "meta_dataset_id": [str(uuid.uuid4()) for _ in range(rows)],
+        "status": ["inactive", "trained", "active"] * (rows // 3) + ["inactive"] * (rows % 3),
+    })
+
+
+@pytest.fixture
+def tag(storage, rows):
+    tag = f"bench-{rows}-{uuid.uuid4().hex[:8]}"
+    yield tag
+    storage.delete("chatbots", f"description = '{tag}'")
+
+
+def test_bulk_insert(storage, rows, tag, bench):
+    stats, seconds = timed(storage.insert, _frame(rows, tag), "chatbots", Chatbots, bulk=True)
+    assert stats["rows"] == rows
+    bench.record(
+        f"storage.bulk_insert[{rows}]", method=stats["method"], insert_s=seconds,
+        rows_per_s=rows / seconds
+    )
+
+
+def test_orm_insert(storage, rows, tag, bench):
+    rows = min(rows, ORM_INSERT_MAX_ROWS)
+    _, seconds = timed(storage.insert, _frame(rows, tag), "chatbots", Chatbots)
+    bench.record(f"storage.orm_insert[{rows}]", insert_s=seconds, rows_per_s=rows / seconds)
+
+
+def test_fetch(storage, rows, tag, bench):
+    storage.insert(_frame(rows, tag), "chatbots", Chatbots, bulk=True)
+    filters = {"description": tag}
+
+    orm_frame, orm_seconds = timed(storage.fetch, orm_class=Chatbots, filters=filters)
+    tuples, tuple_seconds = timed(
+        storage.fetch, orm_class=Chatbots, filters=filters, columns=["id", "name"],
+        row_format="tuple"
+    )
+    streamed, stream_seconds = timed(
+        lambda: sum(
+            len(chunk) for chunk in storage.iter_fetch(Chatbots, filters, columns=["id", "name"])
+        )
+    )
+    assert len(orm_frame) == len(tuples) == streamed == rows
+    bench.record(
+        f"storage.fetch[{rows}]",
+        orm_s=orm_seconds, orm_rows_per_s=rows / orm_seconds,
+        tuples_s=tuple_seconds, tuples_rows_per_s=rows / tuple_seconds,
+        stream_s=stream_seconds, stream_rows_per_s=rows / stream_seconds,
+    )
+
+
+def test_update(storage, rows, tag, bench):
+    storage.insert(_frame(rows, tag), "chatbots", Chatbots, bulk=True)
+    ids = storage.fetch(
+        orm_class=Chatbots, filters={"description": tag}, columns=["id"], row_format="tuple"
+    )
+    changed = pd.DataFrame({
+        "id": [str(row_id) for (row_id,) in ids[::10]],
+        "status": "active",
+        "deployment_url": "http://bench/chat",
+    })
+    updated, seconds = timed(storage.update, changed, "chatbots", "id")
+    assert updated == len(changed)
+    bench.record(
+        f"storage.update[{rows}]", rows=len(changed), update_s=seconds,
+        rows_per_s=len(changed) / seconds
+    )
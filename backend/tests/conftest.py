@@ -0,0 +1,13 @@
+"""
+Collection settings shared by the unit tests and the benchmarks.
+
+`chat_core` imports the platform's `core` package (logging, storage base
+classes, the model client), which is installed with the platform rather
+than with this backend. Without it nothing under `tests/` can be imported,
+so collection is skipped instead of failing with import errors.
+"""
+import importlib.util
+
+collect_ignore = []
+if importlib.util.find_spec("core") is None:
+    collect_ignore = ["benchmarks", "unit"]
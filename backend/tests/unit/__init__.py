@@ -0,0 +1,10 @@
+"""
+Unit tests for the chatbot serving layer.
+
+Like the benchmarks, they run on local stand-ins: the deterministic fake
+embedding model of `tests.benchmarks.conftest` and a throwaway SQLite
+database per test, so they need neither an embedding provider nor a
+PostgreSQL server. Run them from `backend/`:
+
+    pytest tests/unit
+"""
@@ -0,0 +1,42 @@
+"""
+Fixtures for the unit tests: the benchmark stand-ins and a fresh database per test.
+
+Importing `tests.benchmarks.conftest` points the environment at throwaway
+locations before `chat_core` is imported, as for the benchmarks.
+"""
+import pytest
+
+from tests.benchmarks.conftest import FakeModelClient
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_model_client():
+    """Serves every ChatbotEngine from the fake embedding model."""
+    import chat_core.embeddings
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(chat_core.embeddings, "ModelClient", FakeModelClient)
+        patch.setattr(chat_core.embeddings, "_service", None)
+        yield
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """A Storage on an empty SQLite file, served by `get_storage` for the test."""
+    import chat_core.database
+    from chat_core.database import Storage
+
+    storage = Storage(None, url=f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    monkeypatch.setattr(chat_core.database, "_storage", storage)
+    yield storage
+    storage.engine.dispose()
+
+
+@pytest.fixture
+def client(storage):
+    """Flask test client of the API, on the test's database."""
+    from chat_core import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
@@ -0,0 +1,20 @@
+import json
+
+import chat_core.campaign
+from chat_core.campaign import main
+
+
+def test_main_prints_report_and_exits_successfully(monkeypatch, capsys):
+    calls = []
+
+    def run_campaign(meta_id, chatbot_ids, workers, rate_limit):
+        calls.append((meta_id, chatbot_ids, workers, rate_limit))
+        return {"campaign_id": "c1", "chatbots": {}}
+
+    monkeypatch.setattr(chat_core.campaign, "run_campaign", run_campaign)
+
+    status = main(["--meta-id", "m1", "--chatbot", "b1", "--chatbot", "b2", "--workers", "2"])
+
+    assert status == 0
+    assert json.loads(capsys.readouterr().out) == {"campaign_id": "c1", "chatbots": {}}
+    assert calls == [("m1", ["b1", "b2"], 2, chat_core.campaign.CAMPAIGN_RATE_LIMIT)]
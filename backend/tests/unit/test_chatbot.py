@@ -0,0 +1,83 @@
+import uuid
+
+import pytest
+
+from chat_core.chatbot import ChatbotEngine
+from tests.benchmarks.conftest import make_rows
+
+
+def _engine(rows, index_type="flat"):
+    engine = ChatbotEngine(index_type=index_type)
+    engine.train_from_chunks([rows[:len(rows) // 2], rows[len(rows) // 2:]])
+    return engine
+
+
+def _assert_aligned(engine, rows):
+    """Every indexed row answers its own question, and the position tables agree."""
+    assert engine.index.ntotal == len(engine.row_ids) == len(engine.answers) == len(rows)
+    assert sorted(engine.row_ids) == sorted(row_id for row_id, _, _ in rows)
+    answers = engine.respond_batch([user_input for _, user_input, _ in rows])
+    assert [result["answer"] for result in answers] == [reference for _, _, reference in rows]
+
+
+def test_train_from_chunks_keeps_row_order():
+    rows = make_rows(50)
+
+    engine = _engine(rows)
+
+    assert engine.row_ids == [row_id for row_id, _, _ in rows]
+    _assert_aligned(engine, rows)
+
+
+def test_apply_changes_keeps_positions_aligned():
+    rows = make_rows(50)
+    engine = _engine(rows)
+    edited = (rows[3][0], "a reworded question", "an edited answer")
+    added = [(f"new-{i}", f"a new question {i}", f"a new answer {i}") for i in range(3)]
+    removed = [rows[0][0], rows[10][0], rows[49][0]]
+
+    total = engine.apply_changes([edited, *added], removed)
+
+    expected = [row for row in rows if row[0] not in {*removed, edited[0]}] + [edited, *added]
+    assert total == len(expected)
+    _assert_aligned(engine, expected)
+    assert engine.respond(rows[3][1]) != rows[3][2]
+
+
+def test_apply_changes_clears_query_caches():
+    rows = make_rows(20)
+    engine = _engine(rows)
+    engine.respond(rows[5][1])
+
+    engine.apply_changes([(rows[5][0], rows[5][1], "a corrected answer")], [])
+
+    assert engine.respond(rows[5][1]) == "a corrected answer"
+
+
+def test_apply_changes_needs_row_ids():
+    engine = ChatbotEngine(index_type="flat")
+    engine.train("meta", [(user_input, reference) for _, user_input, reference in make_rows(10)])
+
+    with pytest.raises(ValueError, match="row ids"):
+        engine.apply_changes([], ["anything"])
+
+
+def test_apply_changes_rejects_read_only_engine():
+    rows = make_rows(10)
+    chatbot_id, meta_id = uuid.uuid4(), uuid.uuid4()
+    _engine(rows).save(chatbot_id, meta_id)
+
+    with pytest.raises(ValueError, match="read-only"):
+        ChatbotEngine.load(chatbot_id, meta_id).apply_changes([], [rows[0][0]])
+
+    engine = ChatbotEngine.load(chatbot_id, meta_id, mmap=False)
+    engine.apply_changes([], [rows[0][0]])
+    _assert_aligned(engine, rows[1:])
+
+
+def test_apply_changes_rejects_removal_from_hnsw():
+    rows = make_rows(50)
+    engine = _engine(rows, index_type="hnsw")
+
+    with pytest.raises(ValueError, match="cannot remove"):
+        engine.apply_changes([], [rows[0][0]])
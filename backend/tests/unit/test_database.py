@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from chat_core.database import Storage
+from chat_core.database.models import Chatbots, StatusEnum
+
+
+def _frame(**columns) -> pd.DataFrame:
+    base = {"name": ["a", "b"], "deployment_url": ["", ""], "status": ["active", "INACTIVE"]}
+    return pd.DataFrame({**base, **columns})
+
+
+def test_df_to_orm_coerces_columns():
+    chatbot_id, meta_id = uuid.uuid4(), uuid.uuid4()
+    frame = _frame(
+        id=[str(chatbot_id), chatbot_id],
+        meta_dataset_id=[str(meta_id), None],
+        created_at=["2024-05-01T10:00:00+00:00", "2024-05-02T12:30:00+00:00"],
+        status=["active", StatusEnum.TRAINED],
+    )
+
+    first, second = Storage.df_to_orm(frame, Chatbots)
+
+    assert first.id == second.id == chatbot_id
+    assert first.meta_dataset_id == meta_id
+    assert (first.status, second.status) == (StatusEnum.ACTIVE, StatusEnum.TRAINED)
+    assert first.created_at == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+
+
+def test_df_to_orm_accepts_enum_names():
+    instances = Storage.df_to_orm(_frame(), Chatbots)
+
+    assert [chatbot.status for chatbot in instances] == [StatusEnum.ACTIVE, StatusEnum.INACTIVE]
+
+
+def test_df_to_orm_leaves_null_cells_unset():
+    instances = Storage.df_to_orm(_frame(description=["kept", np.nan]), Chatbots)
+
+    assert [chatbot.description for chatbot in instances] == ["kept", None]
+    assert all(chatbot.meta_dataset_id is None for chatbot in instances)
+
+
+def test_df_to_orm_skips_rows_with_invalid_values():
+    frame = _frame(id=[str(uuid.uuid4()), "not-a-uuid"])
+    frame.loc[2] = ["c", "", "no-such-status", str(uuid.uuid4())]
+
+    instances = Storage.df_to_orm(frame, Chatbots)
+
+    assert [chatbot.name for chatbot in instances] == ["a"]
+
+
+def test_df_to_orm_applies_fixed_fields_and_ignores_unknown_columns():
+    meta_id = uuid.uuid4()
+
+    instances = Storage.df_to_orm(
+        _frame(unknown=[1, 2]), Chatbots, fixed_fields={"meta_dataset_id": str(meta_id)}
+    )
+
+    assert [chatbot.meta_dataset_id for chatbot in instances] == [meta_id, meta_id]
+    assert not hasattr(instances[0], "unknown")
+
+
+def test_df_to_orm_instances_insert(storage):
+    storage.session.add_all(Storage.df_to_orm(_frame(), Chatbots))
+    storage.session.commit()
+
+    rows = storage.fetch(orm_class=Chatbots, columns=["name", "status"], row_format="tuple")
+
+    assert sorted(rows) == [("a", StatusEnum.ACTIVE), ("b", StatusEnum.INACTIVE)]
@@ -0,0 +1,178 @@
+import sqlite3
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import chat_core.embeddings
+from chat_core.embeddings import EmbeddingCache, EmbeddingService
+from tests.benchmarks.conftest import FakeEmbeddings
+
+
+class RecordingEmbeddings(FakeEmbeddings):
+    """
+    Fake model that records which thread made each call.
+
+    With `query_prefix`, queries are embedded differently from documents,
+    like instruction-tuned models do.
+    """
+
+    def __init__(self, query_prefix: str = "", delay: float = 0.0):
+        super().__init__()
+        self.query_prefix = query_prefix
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, kind: str, count: int):
+        with self._lock:
+            self.calls.append((kind, count, threading.current_thread().name))
+
+    def embed_documents(self, texts):
+        self._record("documents", len(texts))
+        time.sleep(self.delay)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self._record("query", 1)
+        time.sleep(self.delay)
+        return self._vector(self.query_prefix + text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the wall clock the embedding cache stamps entries with."""
+    now = [1000.0]
+    monkeypatch.setattr(
+        chat_core.embeddings, "time",
+        types.SimpleNamespace(time=lambda: now[0], monotonic=time.monotonic)
+    )
+    return now
+
+
+def _vectors(*texts):
+    return dict(zip(texts, FakeEmbeddings().embed_documents(list(texts))))
+
+
+def test_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    vectors = _vectors("a", "b")
+
+    cache.put_many(vectors)
+
+    found = cache.get_many(["a", "b", "missing"])
+    assert set(found) == {"a", "b"}
+    np.testing.assert_array_equal(found["a"], vectors["a"])
+    assert found["a"].dtype == np.float32
+
+
+def test_cache_evicts_least_recently_used(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    for i in range(10):
+        clock[0] += 100
+        cache.put_many(_vectors(f"k{i}"))
+    clock[0] += 100
+    cache.get_many(["k0"])
+
+    clock[0] += 100
+    cache.put_many(_vectors("k10"))
+
+    # 11 entries over a cap of 10: down to 90%, dropping the two least recently used.
+    assert len(cache) == 9
+    kept = {"k0", "k10", *(f"k{i}" for i in range(3, 10))}
+    assert set(cache.get_many([f"k{i}" for i in range(11)])) == kept
+
+
+def test_cache_refreshes_recency_at_most_once_per_resolution(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_entries=10)
+    cache.put_many(_vectors("a"))
+
+    def last_used():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT last_used FROM embeddings WHERE key = 'a'").fetchone()[0]
+
+    clock[0] += chat_core.embeddings._RECENCY_RESOLUTION / 2
+    cache.get_many(["a"])
+    assert last_used() == 1000.0
+
+    clock[0] += chat_core.embeddings._RECENCY_RESOLUTION
+    cache.get_many(["a"])
+    assert last_used() == clock[0]
+
+
+def test_small_requests_go_through_the_dispatchers():
+    model = RecordingEmbeddings()
+    service = EmbeddingService(model, max_batch=8, max_wait=0.01)
+
+    service.embed_documents(["a", "b"])
+    assert model.calls == [("documents", 2, "embedding-service")]
+
+    service.embed_queries(["c"])
+    # The probe by the caller, then the query merged like a document, on the query dispatcher.
+    caller = threading.current_thread().name
+    assert model.calls[1:] == [
+        ("query", 1, caller),
+        ("documents", 1, caller),
+        ("documents", 1, "embedding-service-queries"),
+    ]
+
+
+def test_large_requests_are_embedded_by_the_caller():
+    model = RecordingEmbeddings()
+    service = EmbeddingService(model, max_batch=4, max_wait=0.01)
+
+    vectors = service.embed_documents([f"t{i}" for i in range(4)])
+
+    assert vectors.shape == (4, 64)
+    assert model.calls == [("documents", 4, threading.current_thread().name)]
+
+
+def test_queries_embedded_differently_are_not_merged_with_documents():
+    model = RecordingEmbeddings(query_prefix="query: ")
+    service = EmbeddingService(model, max_batch=8, max_wait=0.01)
+
+    vectors = service.embed_queries(["a", "b"])
+
+    np.testing.assert_allclose(vectors, [model._vector("query: a"), model._vector("query: b")])
+    # The probe, then one embed_query call per text, all by the caller.
+    caller = threading.current_thread().name
+    assert model.calls == [(kind, 1, caller) for kind in ("query", "documents", "query", "query")]
+    np.testing.assert_allclose(service.embed_documents(["a"]), [model._vector("a")])
+
+
+def test_concurrent_queries_embedded_differently_do_not_wait_on_each_other():
+    model = RecordingEmbeddings(query_prefix="query: ", delay=0.05)
+    service = EmbeddingService(model, max_batch=64, max_wait=0.01)
+    service.embed_query("warm up the probe")
+    texts = [f"question {i}" for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        started = time.perf_counter()
+        vectors = list(pool.map(service.embed_query, texts))
+        elapsed = time.perf_counter() - started
+
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_allclose(vector, model._vector("query: " + text))
+    # Serialized, the 16 calls would take 0.8 s.
+    assert elapsed < 0.4
+    assert service.stats()["merged_requests"] == 0
+
+
+def test_concurrent_queries_share_model_calls():
+    model = RecordingEmbeddings(delay=0.02)
+    service = EmbeddingService(model, max_batch=64, max_wait=0.01)
+    texts = [f"question {i}" for i in range(32)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        vectors = list(pool.map(service.embed_query, texts))
+
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_allclose(vector, model._vector(text))
+    stats = service.stats()
+    assert stats["requests"] == 32
+    assert stats["merged_requests"] > 0
+    assert stats["model_calls"] < 32
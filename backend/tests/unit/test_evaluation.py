@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from chat_core.evaluation import PERTURBATIONS, RetrievalScores, latency_summary, perturb
+
+
+def test_retrieval_scores():
+    scores = RetrievalScores(k=3)
+
+    scores.add(
+        np.array([[7, 1, 2], [1, 7, 2], [1, 2, 7], [1, 2, -1]]),
+        np.array([7, 7, 7, 7]),
+    )
+
+    assert scores.to_dict() == {
+        "queries": 4,
+        "top1_accuracy": 0.25,
+        "topk_accuracy": 0.75,
+        "mrr": round((1 + 1 / 2 + 1 / 3) / 4, 4),
+    }
+
+
+def test_retrieval_scores_accumulate_batches():
+    scores = RetrievalScores(k=2)
+
+    scores.add(np.array([[3, 4]]), np.array([3]))
+    scores.add(np.array([[4, 3]]), np.array([3]))
+
+    assert scores.to_dict()["queries"] == 2
+    assert scores.to_dict()["mrr"] == 0.75
+
+
+def test_retrieval_scores_ignore_missing_results():
+    scores = RetrievalScores(k=2)
+
+    scores.add(np.array([[-1, -1]]), np.array([-1]))
+
+    assert scores.to_dict()["topk_accuracy"] == 0.0
+
+
+def test_retrieval_scores_empty():
+    assert RetrievalScores(k=1).to_dict() == {
+        "queries": 0, "top1_accuracy": 0.0, "topk_accuracy": 0.0, "mrr": 0.0
+    }
+
+
+@pytest.mark.parametrize("kind", PERTURBATIONS)
+def test_perturb_is_deterministic(kind):
+    text = "how do I reset my password"
+
+    first = perturb(text, kind, np.random.default_rng(1))
+
+    assert first == perturb(text, kind, np.random.default_rng(1))
+    assert first != text
+    assert perturb("a", kind, np.random.default_rng(1)) == "a"
+
+
+def test_perturb_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        perturb("text", "shout", np.random.default_rng(0))
+
+
+def test_latency_summary():
+    summary = latency_summary(range(1, 101))
+
+    assert summary["p50"] == 50.5 and summary["mean"] == 50.5
+    assert latency_summary([]) == {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
@@ -0,0 +1,65 @@
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+import chat_core.database.fetch
+from chat_core.database.fetch import get_dataset_changes_by_meta_id
+from core.commons.storage.database.models import Dataset
+
+
+def _insert_rows(storage, meta_id, texts) -> list:
+    ids = [str(uuid.uuid4()) for _ in texts]
+    storage.insert(pd.DataFrame({
+        "id": ids,
+        "meta_dataset_id": str(meta_id),
+        "user_input": texts,
+        "reference": [f"answer to {text}" for text in texts],
+    }), "dataset", Dataset, bulk=True)
+    return ids
+
+
+@pytest.fixture
+def trained(storage):
+    """A testset with three rows, trained (indexed) just after they were written."""
+    meta_id = uuid.uuid4()
+    ids = _insert_rows(storage, meta_id, ["a", "b", "c"])
+    time.sleep(0.01)
+    return meta_id, ids, datetime.now(timezone.utc)
+
+
+def test_no_changes(trained):
+    meta_id, ids, trained_at = trained
+
+    changed, removed = get_dataset_changes_by_meta_id(meta_id, trained_at, set(ids))
+
+    assert changed.empty and list(changed.columns) == ["id", "user_input", "reference"]
+    assert removed == set()
+
+
+def test_added_and_removed_rows(storage, trained):
+    meta_id, ids, trained_at = trained
+    added = _insert_rows(storage, meta_id, ["d"])
+    _insert_rows(storage, uuid.uuid4(), ["other testset"])
+    storage.delete("dataset", "user_input = 'b'")
+
+    changed, removed = get_dataset_changes_by_meta_id(meta_id, trained_at, set(ids))
+
+    assert changed.to_dict("records") == [
+        {"id": added[0], "user_input": "d", "reference": "answer to d"}
+    ]
+    assert removed == {ids[1]}
+
+
+def test_unindexed_rows_are_read_in_chunks(storage, trained, monkeypatch):
+    monkeypatch.setattr(chat_core.database.fetch, "_ID_CHUNK", 2)
+    meta_id, ids, trained_at = trained
+
+    # Nothing is indexed: every row is unindexed, whatever its write time.
+    changed, removed = get_dataset_changes_by_meta_id(meta_id, trained_at, set())
+
+    assert sorted(changed["id"]) == sorted(ids)
+    assert sorted(changed["user_input"]) == ["a", "b", "c"]
+    assert removed == set()
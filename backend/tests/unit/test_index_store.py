@@ -0,0 +1,93 @@
+import json
+import uuid
+
+import faiss
+import pytest
+
+from chat_core.index_store import (
+    FORMAT_VERSION, AnswerStore, MappedStrings, artifact_path, load_artifact, read_manifest,
+    save_artifact
+)
+from tests.benchmarks.conftest import FakeEmbeddings
+
+
+def _index(texts):
+    vectors = FakeEmbeddings().embed_documents(texts)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+@pytest.fixture
+def saved(tmp_path):
+    chatbot_id, meta_id = uuid.uuid4(), uuid.uuid4()
+    texts = ["reset password", "delete account", "change email"]
+    answers = ["See settings.", None, "See settings."]
+    save_artifact(
+        chatbot_id, meta_id, _index(texts), answers, ["r1", "r2", "r3"], "fake", "auto",
+        root=tmp_path
+    )
+    return chatbot_id, meta_id, texts, answers
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_artifact_round_trip(tmp_path, saved, mmap):
+    chatbot_id, meta_id, texts, answers = saved
+
+    index, stored, row_ids, manifest = load_artifact(chatbot_id, meta_id, mmap=mmap, root=tmp_path)
+
+    assert index.ntotal == len(texts)
+    _, found = index.search(FakeEmbeddings().embed_documents(texts), 1)
+    assert found[:, 0].tolist() == [0, 1, 2]
+    assert list(stored) == answers and stored.unique == 2
+    assert list(row_ids) == ["r1", "r2", "r3"]
+    assert manifest["format_version"] == FORMAT_VERSION
+    assert manifest["rows"] == 3
+    assert (manifest["index_type"], manifest["index_config"]) == ("flat", "auto")
+    assert read_manifest(chatbot_id, meta_id, root=tmp_path) == manifest
+
+
+def test_save_replaces_previous_artifact(tmp_path, saved):
+    chatbot_id, meta_id, _, _ = saved
+
+    save_artifact(chatbot_id, meta_id, _index(["only"]), ["one"], ["r9"], "fake", root=tmp_path)
+
+    index, answers, row_ids, _ = load_artifact(chatbot_id, meta_id, root=tmp_path)
+    assert index.ntotal == 1 and list(answers) == ["one"] and list(row_ids) == ["r9"]
+
+
+def test_other_format_version_is_rejected(tmp_path, saved):
+    chatbot_id, meta_id, _, _ = saved
+    manifest_file = artifact_path(chatbot_id, meta_id, root=tmp_path) / "manifest.json"
+    manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    manifest["format_version"] = FORMAT_VERSION - 1
+    manifest_file.write_text(json.dumps(manifest), encoding="utf-8")
+
+    with pytest.raises(FileNotFoundError, match="format"):
+        load_artifact(chatbot_id, meta_id, root=tmp_path)
+
+
+def test_missing_artifact(tmp_path):
+    assert read_manifest(uuid.uuid4(), uuid.uuid4(), root=tmp_path) is None
+    with pytest.raises(FileNotFoundError):
+        load_artifact(uuid.uuid4(), uuid.uuid4(), root=tmp_path)
+
+
+def test_mapped_strings_round_trip(tmp_path):
+    strings = ["", "é", None, "a" * 1000]
+    MappedStrings.write(tmp_path, "strings", strings)
+
+    mapped = MappedStrings.open(tmp_path, "strings")
+
+    assert list(mapped) == strings and mapped[-1] == strings[-1]
+    with pytest.raises(IndexError):
+        mapped[len(strings)]
+
+
+def test_answer_store_delete_and_extend_keep_positions():
+    store = AnswerStore.build(["a", "b", "a", "c"])
+
+    store = store.delete([1]).extend(["b", "d"])
+
+    assert list(store) == ["a", "a", "c", "b", "d"]
+    assert store.unique == 4
@@ -0,0 +1,109 @@
+import pytest
+
+from chat_core.registry import EngineRegistry
+
+
+class FakeEngine:
+    """Engine stand-in with a fixed footprint that records being closed."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.closed = False
+
+    def memory_footprint(self) -> int:
+        return self.size
+
+    def close(self):
+        self.closed = True
+
+    def cache_stats(self) -> dict:
+        return {}
+
+
+def _registry(memory_budget=100, max_engines=0, external_bytes=None, sizes=None):
+    sizes = sizes or {}
+    return EngineRegistry(
+        lambda chatbot_id: FakeEngine(sizes.get(chatbot_id, 10)), memory_budget,
+        max_engines=max_engines, external_bytes=external_bytes
+    )
+
+
+def test_get_loads_once_then_hits():
+    registry = _registry()
+
+    engine = registry.get("a")
+
+    assert registry.get("a") is engine
+    assert (registry.misses, registry.hits) == (1, 1)
+
+
+def test_loader_errors_propagate_and_nothing_is_kept():
+    def loader(chatbot_id):
+        raise LookupError("not deployed")
+
+    registry = EngineRegistry(loader, memory_budget=100)
+
+    with pytest.raises(LookupError):
+        registry.get("a")
+    assert "a" not in registry
+
+
+def test_evicts_least_recently_used_over_budget():
+    registry = _registry(memory_budget=100, sizes={"a": 40, "b": 40, "c": 40})
+    a = registry.get("a")
+    b = registry.get("b")
+    registry.get("a")
+
+    registry.get("c")
+
+    assert "b" not in registry and b.closed
+    assert "a" in registry and not a.closed
+    assert registry.evictions == 1
+    assert registry.stats()["bytes"] == 80
+
+
+def test_keeps_most_recent_engine_above_budget():
+    registry = _registry(memory_budget=100, sizes={"a": 10, "big": 500})
+    registry.get("a")
+
+    registry.get("big")
+
+    assert len(registry) == 1 and "big" in registry
+
+
+def test_max_engines_limits_count():
+    registry = _registry(memory_budget=10 ** 9, max_engines=2)
+    for chatbot_id in ("a", "b", "c"):
+        registry.get(chatbot_id)
+
+    assert "a" not in registry and len(registry) == 2
+
+
+def test_external_bytes_count_against_budget():
+    registry = _registry(memory_budget=100, external_bytes=lambda: 70, sizes={"a": 20, "b": 20})
+    registry.get("a")
+
+    registry.get("b")
+
+    assert "a" not in registry
+    assert registry.stats()["bytes"] == 90
+    assert registry.stats()["external_bytes"] == 70
+
+
+def test_put_replaces_and_closes_previous_engine():
+    registry = _registry()
+    old, new = FakeEngine(10), FakeEngine(20)
+    registry.put("a", old)
+
+    registry.put("a", new)
+
+    assert old.closed and registry.get("a") is new
+    assert registry.stats()["bytes"] == 20
+
+
+def test_evict_closes_engine():
+    registry = _registry()
+    engine = registry.get("a")
+
+    assert registry.evict("a") and engine.closed
+    assert not registry.evict("a")
@@ -0,0 +1,157 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+import chat_core.routes
+from chat_core.database.models import Chatbots
+
+
+def _insert_chatbots(storage, count: int, status: str = "inactive") -> list:
+    """Inserts chatbots, some created at the same time, and returns their ids in list order."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    frame = pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(count)],
+        "name": [f"bot {i}" for i in range(count)],
+        "deployment_url": "",
+        "status": status,
+        "created_at": [start + timedelta(minutes=i // 3) for i in range(count)],
+    })
+    storage.insert(frame, "chatbots", Chatbots, bulk=True)
+    return [row_id for _, row_id in sorted(zip(frame["created_at"], frame["id"]))]
+
+
+def _wait(client, job_id: str) -> dict:
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_list_chatbots_pages_by_keyset(client, storage):
+    ids = _insert_chatbots(storage, 8)
+
+    listed, pages = [], 0
+    query = {"limit": 3, "fields": "id"}
+    while True:
+        response = client.get("/api/chatbots", query_string=query)
+        assert response.status_code == 200
+        listed += [row["id"] for row in response.get_json()]
+        pages += 1
+        if "X-Next-Cursor" not in response.headers:
+            break
+        query["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert listed == ids
+    assert pages == 3
+
+
+def test_list_chatbots_rejects_bad_parameters(client, storage):
+    assert client.get("/api/chatbots?limit=0").status_code == 400
+    assert client.get("/api/chatbots?cursor=garbage").status_code == 400
+    assert client.get("/api/chatbots?fields=password").status_code == 400
+    assert client.get("/api/chatbots?status=deleted").status_code == 400
+
+
+def test_list_chatbots_filters_by_status(client, storage):
+    _insert_chatbots(storage, 2, status="inactive")
+    active = _insert_chatbots(storage, 2, status="active")
+
+    response = client.get("/api/chatbots?status=ACTIVE,active&fields=id,status")
+
+    assert sorted(row["id"] for row in response.get_json()) == sorted(active)
+    assert {row["status"] for row in response.get_json()} == {"active"}
+
+
+def test_list_chatbots_not_modified(client, storage):
+    ids = _insert_chatbots(storage, 2)
+    etag = client.get("/api/chatbots").headers["ETag"]
+
+    response = client.get("/api/chatbots", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.get_data() == b""
+
+    other_query = client.get("/api/chatbots?limit=1", headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    storage.update(
+        pd.DataFrame([{"id": ids[0], "name": "renamed"}]), name="chatbots", key_column="id"
+    )
+    changed = client.get("/api/chatbots", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_unknown_job_is_not_found(client):
+    response = client.get(f"/api/jobs/{uuid.uuid4().hex}")
+
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def blocked_training(monkeypatch):
+    """Replaces training with a job that runs until the returned event is set."""
+    release = threading.Event()
+
+    def run_training(job, chatbot, meta_id, incremental, index_type=None):
+        release.wait(10)
+        return {"mode": "full", "index_type": index_type}
+
+    monkeypatch.setattr(chat_core.routes, "_run_training", run_training)
+    yield release
+    release.set()
+
+
+def test_training_twice_conflicts(client, storage, blocked_training):
+    chatbot_id = _insert_chatbots(storage, 1)[0]
+    body = {"meta_id": str(uuid.uuid4())}
+
+    started = client.post(f"/api/chatbots/{chatbot_id}/train", json=body)
+    conflict = client.post(f"/api/chatbots/{chatbot_id}/train", json=body)
+
+    assert started.status_code == 202
+    assert conflict.status_code == 409
+    assert conflict.get_json()["job_id"] == started.get_json()["job_id"]
+
+    blocked_training.set()
+    assert _wait(client, started.get_json()["job_id"])["status"] == "succeeded"
+    assert client.post(f"/api/chatbots/{chatbot_id}/train", json=body).status_code == 202
+
+
+def test_trained_chatbot_retrains_only_incrementally_or_with_index_type(
+        client, storage, blocked_training):
+    blocked_training.set()
+    chatbot_id = _insert_chatbots(storage, 1, status="trained")[0]
+    body = {"meta_id": str(uuid.uuid4())}
+
+    assert client.post(f"/api/chatbots/{chatbot_id}/train", json=body).status_code == 400
+    unknown_type = {**body, "index_type": "nope"}
+    assert client.post(f"/api/chatbots/{chatbot_id}/train", json=unknown_type).status_code == 400
+
+    response = client.post(f"/api/chatbots/{chatbot_id}/train", json={**body, "index_type": "hnsw"})
+    assert response.status_code == 202
+    assert _wait(client, response.get_json()["job_id"])["result"]["index_type"] == "hnsw"
+
+    response = client.post(f"/api/chatbots/{chatbot_id}/train", json={**body, "incremental": True})
+    assert response.status_code == 202
+    _wait(client, response.get_json()["job_id"])
+
+
+def test_chat_without_artifact_trains_in_background(client, storage, blocked_training):
+    chatbot_id = _insert_chatbots(storage, 1, status="active")[0]
+    storage.update(
+        pd.DataFrame([{"id": chatbot_id, "meta_dataset_id": str(uuid.uuid4())}]),
+        name="chatbots", key_column="id"
+    )
+
+    first = client.post(f"/api/chat/{chatbot_id}", json={"message": "hello"})
+    again = client.post(f"/api/chat/{chatbot_id}", json={"message": "hello"})
+
+    assert first.status_code == again.status_code == 503
+    assert "Retry-After" in first.headers
+    assert again.get_json()["job_id"] == first.get_json()["job_id"]
+    blocked_training.set()
+    assert _wait(client, first.get_json()["job_id"])["status"] == "succeeded"
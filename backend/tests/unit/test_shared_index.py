@@ -0,0 +1,68 @@
+import numpy as np
+
+from chat_core.index_store import AnswerStore
+from chat_core.shared_index import SharedIndex
+from tests.benchmarks.conftest import FakeEmbeddings
+
+_embeddings = FakeEmbeddings()
+
+
+def _add_tenant(shared, meta_id, questions, chatbot_id=None, created_at="2024-01-01T00:00:00"):
+    answers = AnswerStore.build(f"answer to {question}" for question in questions)
+    return shared.add_tenant(
+        meta_id, _embeddings.embed_documents(questions), answers, f"hash-{meta_id}-{created_at}",
+        created_at, chatbot_id=chatbot_id
+    )
+
+
+def _answers(tenant, questions, k=1):
+    _, local = tenant.search(_embeddings.embed_documents(questions), k)
+    return local, [tenant.answers[position] for position in local[:, 0]]
+
+
+def test_tenant_search_returns_local_positions():
+    shared = SharedIndex("fake", _embeddings.dim, compact_ratio=1.0)
+    first = _add_tenant(shared, "m1", ["a", "b", "c", "d"], chatbot_id="bot1")
+    second = _add_tenant(shared, "m2", ["x", "c", "y", "a"], chatbot_id="bot2")
+
+    local, answers = _answers(second, ["x", "c", "y", "a"])
+
+    assert len(shared) == 6
+    assert second.ntotal == 4
+    assert ((local >= 0) & (local < second.ntotal)).all()
+    assert answers == ["answer to x", "answer to c", "answer to y", "answer to a"]
+    assert _answers(first, ["a", "b", "c", "d"])[1] == [f"answer to {q}" for q in "abcd"]
+
+
+def test_tenant_search_only_sees_its_testset():
+    shared = SharedIndex("fake", _embeddings.dim, compact_ratio=1.0)
+    _add_tenant(shared, "m1", ["a", "b", "c"], chatbot_id="bot1")
+    second = _add_tenant(shared, "m2", ["x", "y"], chatbot_id="bot2")
+
+    local, answers = _answers(second, ["a"], k=5)
+
+    assert sorted(local[0, :2]) == [0, 1]
+    assert (local[0, 2:] == -1).all()
+    assert answers[0] in ("answer to x", "answer to y")
+
+
+def test_duplicate_questions_are_indexed_once_per_testset():
+    shared = SharedIndex("fake", _embeddings.dim, compact_ratio=1.0)
+
+    tenant = _add_tenant(shared, "m1", ["a", "b", "a"], chatbot_id="bot1")
+
+    assert tenant.ntotal == 2 and len(shared) == 2
+    assert _answers(tenant, ["a", "b"])[1] == ["answer to a", "answer to b"]
+
+
+def test_compaction_keeps_local_positions():
+    shared = SharedIndex("fake", _embeddings.dim, compact_ratio=0.3)
+    first = _add_tenant(shared, "m1", ["a", "b", "c", "d"], chatbot_id="bot1")
+    second = _add_tenant(shared, "m2", ["d", "e", "f"], chatbot_id="bot2")
+
+    shared.release(first, "bot1")
+
+    assert shared.compactions == 1
+    assert len(shared) == 3
+    np.testing.assert_array_equal(second.positions, [0, 1, 2])
+    assert _answers(second, ["d", "e", "f"])[1] == ["answer to d", "answer to e", "answer to f"]
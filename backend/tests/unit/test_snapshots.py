@@ -0,0 +1,76 @@
+import uuid
+
+import pandas as pd
+import pytest
+
+from chat_core.snapshots import current_snapshot, export_snapshot, snapshot_path
+from core.commons.storage.database.models import Dataset
+
+
+@pytest.fixture
+def testset(storage):
+    meta_id = uuid.uuid4()
+    _insert_rows(storage, meta_id, 5)
+    return meta_id
+
+
+def _insert_rows(storage, meta_id, count: int, start: int = 0):
+    storage.insert(pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(count)],
+        "meta_dataset_id": str(meta_id),
+        "user_input": [f"question {i}" for i in range(start, start + count)],
+        "reference": [f"answer {i}" for i in range(start, start + count)],
+    }), "dataset", Dataset, bulk=True)
+
+
+def test_export_then_current(tmp_path, testset):
+    manifest = export_snapshot(testset, root=tmp_path)
+
+    table = current_snapshot(testset, root=tmp_path)
+
+    assert manifest["rows"] == table.num_rows == 5
+    assert sorted(table.column("user_input").to_pylist()) == [f"question {i}" for i in range(5)]
+
+
+def test_export_keeps_current_snapshot(tmp_path, testset):
+    manifest = export_snapshot(testset, root=tmp_path)
+
+    assert export_snapshot(testset, root=tmp_path) == manifest
+    forced = export_snapshot(testset, force=True, root=tmp_path)
+    assert forced["created_at"] != manifest["created_at"]
+
+
+def test_added_rows_make_snapshot_stale(tmp_path, storage, testset):
+    export_snapshot(testset, root=tmp_path)
+
+    _insert_rows(storage, testset, 1, start=5)
+
+    assert current_snapshot(testset, root=tmp_path) is None
+    assert export_snapshot(testset, root=tmp_path)["rows"] == 6
+    assert current_snapshot(testset, root=tmp_path).num_rows == 6
+
+
+def test_deleted_rows_make_snapshot_stale(tmp_path, storage, testset):
+    export_snapshot(testset, root=tmp_path)
+
+    storage.delete("dataset", "user_input = 'question 0'")
+
+    assert current_snapshot(testset, root=tmp_path) is None
+
+
+def test_other_testsets_do_not_make_snapshot_stale(tmp_path, storage, testset):
+    export_snapshot(testset, root=tmp_path)
+
+    _insert_rows(storage, uuid.uuid4(), 3)
+
+    assert current_snapshot(testset, root=tmp_path) is not None
+
+
+def test_damaged_snapshot_is_not_current(tmp_path, testset):
+    export_snapshot(testset, root=tmp_path)
+    data_file = snapshot_path(testset, root=tmp_path) / "dataset.arrow"
+    data = bytearray(data_file.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    data_file.write_bytes(bytes(data))
+
+    assert current_snapshot(testset, root=tmp_path) is None